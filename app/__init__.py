@@ -1,6 +1,7 @@
 from flask import Flask
 from app.api.routes import api
 from app.docs.swagger_ui import create_swagger_blueprint
+from app.middleware.compression import configure_compression
 from config.config import Config
 from flask_cors import CORS
 
@@ -21,6 +22,9 @@ def create_app(config_class=Config):
     # 配置速率限制
     # configure_rate_limits(app)
 
+    # 大响应按 Accept-Encoding 压缩
+    configure_compression(app)
+
     # 添加安全headers
     @app.after_request
     def add_security_headers(response):
@@ -1,14 +1,21 @@
 from flask import Blueprint, jsonify, request, current_app
+from marshmallow import ValidationError as SchemaValidationError
 from sqlalchemy.exc import SQLAlchemyError
 from app.models.database import get_db
+from app.models.models import DataScope
 from app.services.database_service import DatabaseService
+from app.middleware.cache import cached_response, conditional_response
 from app.middleware.error_handler import handle_exceptions
+from app.services.cache_service import CHANNELS_SCOPE
 from app.validators.schemas import (
     ChannelCreateSchema,
     ChannelUpdateSchema,
-    ChannelDeleteSchema
+    ChannelDeleteSchema,
+    StatsBatchSchema
 )
+from config.config import Config
 from utils.exceptions import ValidationError
+from utils.helpers import dumps_json
 from utils.logger import Logger
 
 api = Blueprint('api', __name__)
@@ -17,7 +24,26 @@ logger = Logger('api')
 db_service = DatabaseService()
 
 
+def history_scope(channel_id: str):
+    """互动历史依赖的数据版本: 指定频道时为该频道, 否则为全部互动"""
+    return (DataScope.CHANNEL, channel_id) if channel_id else (DataScope.INTERACTIONS, 0)
+
+
+def json_response(payload, status: int = 200):
+    """大响应 (历史分页) 使用的 JSON 编码, 比 jsonify 快且中文直接输出 UTF-8"""
+    return current_app.response_class(dumps_json(payload), status=status, mimetype='application/json')
+
+
+def use_epoch_time() -> bool:
+    """time_format=epoch 时时间以秒级时间戳返回, 默认 'Sat, 01 Jun 2024 12:03:04 -0000'"""
+    return request.args.get('time_format', default='rfc', type=str) == 'epoch'
+
+
 @api.route('/channels/<channel_id>/total', methods=['GET'])
+# 按过期时间截止统计, 数据不变时结果也会随时间变化
+@conditional_response(lambda channel_id: [(DataScope.CHANNEL, channel_id), (DataScope.RETENTION, 0)],
+                      max_age=Config.ETAG_MAX_AGE)
+@cached_response(lambda channel_id: [f'channel:{channel_id}'])
 @handle_exceptions
 def get_channel_interactions(channel_id: int):
     """
@@ -71,6 +97,9 @@ def get_channel_interactions(channel_id: int):
 
 
 @api.route('/users/<user_id>/interactions', methods=['GET'])
+@conditional_response(lambda user_id: [(DataScope.CHANNELS, 0), (DataScope.USER, user_id), (DataScope.RETENTION, 0)])
+@cached_response(lambda user_id: [CHANNELS_SCOPE, f'user:{user_id}'],
+                 params={'start_time': int, 'end_time': int})
 @handle_exceptions
 def get_user_interactions(user_id: str):
     """
@@ -135,6 +164,7 @@ def get_user_interactions(user_id: str):
 
 
 @api.route('/users/<user_id>/interactions_history', methods=['GET'])
+@conditional_response(lambda user_id: [(DataScope.USER, user_id), (DataScope.RETENTION, 0)])
 @handle_exceptions
 def get_user_interactions_history(user_id: str):
     """
@@ -161,6 +191,11 @@ def get_user_interactions_history(user_id: str):
         type: integer
         required: false
         description: 分页大小
+      - name: time_format
+        in: query
+        type: string
+        required: false
+        description: 时间格式, epoch 返回秒级时间戳 (默认 RFC 1123 字符串)
     responses:
       200:
         description: 成功返回用户互动历史
@@ -176,7 +211,7 @@ def get_user_interactions_history(user_id: str):
     db = next(get_db())
     try:
         message_count, messages = DatabaseService.get_user_interaction_history(
-            db, user_id, channel_id, offset, limit
+            db, user_id, channel_id, offset, limit, use_epoch_time()
         )
 
         if message_count == 0:
@@ -185,7 +220,7 @@ def get_user_interactions_history(user_id: str):
                 'user_id': user_id
             }), 404
 
-        return jsonify({
+        return json_response({
             'user_id': user_id,
             'message_count': message_count,
             'messages': messages
@@ -433,6 +468,7 @@ def ping():
     })
 
 @api.route('/users/interactions_history', methods=['GET'])
+@conditional_response(lambda: [history_scope(request.args.get('channel_id')), (DataScope.RETENTION, 0)])
 @handle_exceptions
 def get_interactions_history():
     """
@@ -464,6 +500,11 @@ def get_interactions_history():
         type: long
         required: false
         description: 结束时间
+      - name: time_format
+        in: query
+        type: string
+        required: false
+        description: 时间格式, epoch 返回秒级时间戳 (默认 RFC 1123 字符串)
     responses:
       200:
         description: 成功返回用户互动历史
@@ -481,7 +522,7 @@ def get_interactions_history():
     db = next(get_db())
     try:
         message_count, messages = DatabaseService.get_interaction_history(
-            db, channel_id, offset, limit, start_time, end_time
+            db, channel_id, offset, limit, start_time, end_time, use_epoch_time()
         )
 
         if message_count == 0:
@@ -489,7 +530,7 @@ def get_interactions_history():
                 'error': 'No interactions found',
             }), 404
 
-        return jsonify({
+        return json_response({
             'message_count': message_count,
             'messages': messages
         })
@@ -508,3 +549,63 @@ def get_interactions_history():
         }), 500
     finally:
         db.close()
+
+
+@api.route('/stats/batch', methods=['POST'])
+@handle_exceptions
+def get_batch_stats():
+    """
+    批量获取用户和频道互动统计
+    ---
+    requestBody:
+      required: true
+      content:
+        application/json:
+          schema:
+            $ref: '#/components/schemas/StatsBatch'
+    responses:
+      200:
+        description: 成功返回统计数据, 不存在的频道为 null, 没有互动的用户总数为 0
+      400:
+        description: 参数验证错误
+      500:
+        description: 服务器错误
+    """
+    db = next(get_db())
+    try:
+        # 验证请求数据
+        schema = StatsBatchSchema()
+        validated_data = schema.load(request.json or {})
+
+        user_stats, channel_counts = DatabaseService.get_batch_interaction_stats(
+            db, validated_data['user_ids'], validated_data['channel_ids'],
+            validated_data['start_time'], validated_data['end_time']
+        )
+
+        return json_response({
+            'users': {str(user_id): stats for user_id, stats in user_stats.items()},
+            'channels': {
+                str(channel_id): None if count is None else {'total_interactions': count}
+                for channel_id, count in channel_counts.items()
+            }
+        })
+
+    except SchemaValidationError as e:
+        return jsonify({
+            'error': 'Validation error',
+            'message': str(e.messages)
+        }), 400
+    except SQLAlchemyError as e:
+        logger.error(f"Database error when getting batch stats: {str(e)}")
+        return jsonify({
+            'error': 'Database error',
+            'message': 'Error accessing database'
+        }), 500
+    except Exception as e:
+        logger.error(f"Unexpected error in get_batch_stats: {str(e)}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': 'An unexpected error occurred'
+        }), 500
+    finally:
+        db.close()
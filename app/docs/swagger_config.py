@@ -1,7 +1,7 @@
 from apispec import APISpec
 from apispec.ext.marshmallow import MarshmallowPlugin
 from flask import json
-from app.validators.schemas import BaseChannelSchema
+from app.validators.schemas import BaseChannelSchema, StatsBatchSchema
 
 
 class SwaggerDocs:
@@ -33,6 +33,7 @@ class SwaggerDocs:
     def register_schemas(self):
         # 注册请求/响应模型
         self.spec.components.schema("Channel", schema=BaseChannelSchema)
+        self.spec.components.schema("StatsBatch", schema=StatsBatchSchema)
 
     def register_paths(self):
         # 频道统计接口
@@ -213,6 +214,47 @@ class SwaggerDocs:
             }
         )
 
+        # 批量统计接口
+        self.spec.path(
+            path="/api/stats/batch",
+            operations={
+                "post": {
+                    "tags": ["stats"],
+                    "summary": "Get interaction statistics for multiple users and channels",
+                    "requestBody": {
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/StatsBatch"}
+                            }
+                        }
+                    },
+                    "responses": {
+                        "200": {
+                            "description": "Successful operation",
+                            "content": {
+                                "application/json": {
+                                    "schema": {
+                                        "type": "object",
+                                        "properties": {
+                                            "users": {
+                                                "type": "object",
+                                                "description": "用户ID -> {total_interactions, per_channel}"
+                                            },
+                                            "channels": {
+                                                "type": "object",
+                                                "description": "频道ID -> {total_interactions}, 频道不存在时为 null"
+                                            }
+                                        }
+                                    }
+                                }
+                            }
+                        },
+                        "400": {"description": "Validation error"}
+                    }
+                }
+            }
+        )
+
         # 频道管理接口
         self.spec.path(
             path="/api/channels",
@@ -0,0 +1,111 @@
+import hashlib
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, List, Tuple
+
+from flask import current_app, g, make_response, request
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.models.database import get_db
+from app.models.models import DataScope
+from app.services.cache_service import response_cache
+from app.services.database_service import DatabaseService
+from utils.logger import Logger
+
+logger = Logger('cache')
+
+# 只缓存成功和"未找到"的响应, 出错时下次请求重新计算
+CACHEABLE_STATUS = (200, 404)
+
+
+def cached_response(scopes: Callable[..., List[str]], params: Dict[str, type] = None):
+    """
+    缓存 GET 接口的响应, 响应头 X-Cache 标记 HIT/MISS
+
+    Args:
+        scopes: 根据路径参数返回响应依赖的作用域, 如 channel:<id>、user:<id>
+        params: 参与缓存键的查询参数及类型, 按类型解析后拼入缓存键; 其他参数 (如防缓存的时间戳) 被忽略
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not response_cache.enabled:
+                return f(*args, **kwargs)
+
+            key_args = {name: str(value) for name, value in kwargs.items()}
+            for name, value_type in (params or {}).items():
+                value = request.args.get(name, default=None, type=value_type)
+                if value is not None:
+                    key_args[name] = value
+            # 外层 conditional_response 读到的数据版本, 其他进程写入的数据也能使缓存失效
+            if g.get('data_versions'):
+                key_args['#versions'] = g.data_versions
+            key = response_cache.make_key(request.endpoint, key_args, scopes(**kwargs))
+
+            cached = response_cache.get(key) if key else None
+            if cached:
+                status, mimetype, body = cached
+                response = current_app.response_class(body, status=status, mimetype=mimetype)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = make_response(f(*args, **kwargs))
+            if key and response.status_code in CACHEABLE_STATUS:
+                response_cache.set(key, (response.status_code, response.mimetype, response.get_data()))
+            response.headers['X-Cache'] = 'MISS'
+            return response
+
+        return decorated_function
+
+    return decorator
+
+
+def conditional_response(scopes: Callable[..., List[Tuple[DataScope, Any]]], max_age: int = None):
+    """
+    弱 ETag 与条件请求
+
+    先按主键读取响应依赖的数据版本生成 ETag, If-None-Match 匹配时直接返回 304, 不执行统计/分页查询.
+    版本在查询之前读取: 查询期间有新数据时, 响应带旧 ETag, 客户端下次请求会重新获取.
+    只给 200 响应设置 ETag, 并要求客户端每次重新验证 (Cache-Control: no-cache).
+
+    Args:
+        scopes: 根据路径参数返回响应依赖的作用域 [(DataScope, 频道Id/用户Id, 全局为 0)]
+        max_age: 结果会随时间变化 (而数据版本不变) 的接口, ETag 每 max_age 秒更换一次
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            try:
+                keys = [(scope.value, int(scope_id)) for scope, scope_id in scopes(**kwargs)]
+            except (TypeError, ValueError):
+                # 非数字的ID查不到数据, 不做条件请求
+                return f(*args, **kwargs)
+
+            db = next(get_db())
+            try:
+                versions = DatabaseService.get_data_versions(db, keys)
+            except SQLAlchemyError as e:
+                logger.error(f"Database error when reading data versions: {str(e)}")
+                return f(*args, **kwargs)
+            finally:
+                db.close()
+
+            g.data_versions = ','.join(f'{scope_type}:{scope_id}={versions.get((scope_type, scope_id), 0)}'
+                                       for scope_type, scope_id in keys)
+            if max_age:
+                g.data_versions += f'@{int(time.time() // max_age)}'
+            etag = hashlib.sha1(f'{request.full_path}#{g.data_versions}'.encode()).hexdigest()[:20]
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+
+        return decorated_function
+
+    return decorator
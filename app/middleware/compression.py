@@ -0,0 +1,54 @@
+import gzip
+from typing import Optional
+
+from flask import request
+
+from config.config import Config
+
+try:
+    import brotli
+except ImportError:  # 可选依赖, 没有安装时只支持 gzip
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript')
+
+
+def choose_encoding() -> Optional[str]:
+    """按请求的 Accept-Encoding 选择压缩方式, 优先 br"""
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    """响应体超过 RESPONSE_COMPRESS_MIN_SIZE 字节时按客户端支持的方式压缩"""
+    min_size = Config.RESPONSE_COMPRESS_MIN_SIZE
+    if (not min_size or response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    if not encoding:
+        return response
+
+    if encoding == 'br':
+        data = brotli.compress(data, quality=Config.RESPONSE_BROTLI_QUALITY)
+    else:
+        data = gzip.compress(data, compresslevel=Config.RESPONSE_GZIP_LEVEL, mtime=0)
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    # 压缩后字节不同, 强 ETag 改为弱 ETag
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def configure_compression(app):
+    app.after_request(compress_response)
@@ -5,7 +5,15 @@ from config.config import Config
 
 SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{Config.DB_USER}:{Config.DB_PASSWORD}@{Config.DB_HOST}:{Config.DB_PORT}/{Config.DB_NAME}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# 每个进程各自的连接池; gunicorn worker fork 后在 post_fork 中丢弃继承的连接 (见 wsgi_server.py)
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    pool_size=Config.DB_POOL_SIZE,
+    max_overflow=Config.DB_MAX_OVERFLOW,
+    pool_timeout=Config.DB_POOL_TIMEOUT,
+    pool_recycle=Config.DB_POOL_RECYCLE,
+    pool_pre_ping=Config.DB_POOL_PRE_PING
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -1,10 +1,30 @@
 from enum import Enum
 
-from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Text, SmallInteger, Index
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Text, SmallInteger, Index, BINARY
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from sqlalchemy.types import TypeDecorator
 from app.models.database import Base
 
 
+class HexBinary(TypeDecorator):
+    """以 BINARY 存储的定长十六进制值 (如 Nostr 事件ID), 应用层读写仍为 hex 字符串"""
+    impl = BINARY
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if not value:
+            return None
+        if isinstance(value, bytes):
+            return value
+        return bytes.fromhex(value)
+
+    def process_result_value(self, value, dialect):
+        if not value:
+            return None
+        return value.hex()
+
+
 class Channel(Base):
     """频道表"""
     __tablename__ = "discord_channel"
@@ -25,8 +45,58 @@ class Channel(Base):
         return f"<Channel(id={self.id}, channel_id={self.channel_id})>"
 
 
+class User(Base):
+    """Discord用户维度表"""
+    __tablename__ = "discord_user"
+
+    user_id = Column(BigInteger, primary_key=True, autoincrement=False, comment='用户Id')
+    username = Column(String(256), nullable=False, comment='当前用户名')
+    first_seen_at = Column(DateTime, nullable=False, server_default=func.now(), comment='首次出现时间')
+    last_seen_at = Column(DateTime, nullable=False, server_default=func.now(), comment='最近出现时间')
+
+    __table_args__ = (
+        {
+            'mysql_engine': 'InnoDB',
+            'mysql_charset': 'utf8mb4',
+            'mysql_collate': 'utf8mb4_unicode_ci',
+            'comment': 'Discord用户表'
+        },
+    )
+
+    def __repr__(self):
+        return f"<User(user_id={self.user_id}, username={self.username})>"
+
+
+class UserNameHistory(Base):
+    """用户名历史表, 互动记录通过 username_id 引用发言时的用户名"""
+    __tablename__ = "discord_user_name_history"
+
+    id = Column(Integer, primary_key=True, autoincrement=True, comment='主键')
+    user_id = Column(BigInteger, nullable=False, comment='用户Id')
+    # 二进制排序规则: 仅大小写或重音不同的用户名是不同的记录
+    username = Column(String(256, collation='utf8mb4_bin'), nullable=False, comment='用户名 (区分大小写和重音)')
+    first_seen_at = Column(DateTime, nullable=False, server_default=func.now(), comment='首次出现时间')
+
+    __table_args__ = (
+        Index('uk_userId_username', 'user_id', 'username', unique=True),
+        {
+            'mysql_engine': 'InnoDB',
+            'mysql_charset': 'utf8mb4',
+            'mysql_collate': 'utf8mb4_unicode_ci',
+            'comment': '用户名历史表'
+        }
+    )
+
+    def __repr__(self):
+        return f"<UserNameHistory(id={self.id}, user_id={self.user_id}, username={self.username})>"
+
+
 class Interaction(Base):
-    """发言消息表"""
+    """发言消息表
+
+    表按 collect_time 做月度 RANGE 分区 (见 sql/discord.sql), 物理主键为
+    (interaction_id, collect_time); ORM 中仍以 interaction_id 作为标识.
+    """
     __tablename__ = "discord_interaction"
 
     interaction_id = Column(Integer, primary_key=True, autoincrement=True,
@@ -34,22 +104,36 @@ class Interaction(Base):
     message_id = Column(BigInteger, nullable=False, comment='消息Id')
     channel_id = Column(BigInteger, nullable=False, comment='频道Id')
     user_id = Column(BigInteger, nullable=False, comment='用户Id')
-    username = Column(String(256), nullable=False, comment='用户名')
+    username_id = Column(Integer, nullable=True, comment='用户名Id (discord_user_name_history.id)')
     interaction_content = Column(Text, nullable=False, comment='发言内容')
     interaction_time = Column(DateTime, nullable=False, comment='发言时间')
     post_time = Column(DateTime, nullable=False, comment='帖子发布时间')
     collect_time = Column(DateTime, nullable=False, server_default=func.now(),
                           comment='采集时间')
-    note = Column(String(256), nullable=True, comment='备注')
+    note = Column(String(256), nullable=True, comment='备注 (已废弃, 由 ref_* 字段替代)')
+    ref_message_id = Column(BigInteger, nullable=True, comment='引用消息Id (回复/转发/点赞的目标消息)')
+    ref_channel_id = Column(BigInteger, nullable=True, comment='引用消息所在频道Id')
+    reaction_emoji = Column(String(64), nullable=True, comment='点赞表情')
     type = Column(SmallInteger, nullable=False,
                   comment='发言类型 (1:文字 | 2:点赞 ｜ 3:转发 | 4:回复)')
     is_published = Column(Boolean, nullable=False, default=False,
                           comment='是否已发布 (1:已发布 | 0:未发布)')
-    nostr_event_id = Column(String(256), nullable=True, comment='Nostr事件ID', default='')
+    nostr_event_id = Column(HexBinary(32), nullable=True, comment='Nostr事件ID')
+
+    # 每批结果只发起一次 IN 查询加载用户名, 避免 N+1
+    username_record = relationship(
+        UserNameHistory,
+        primaryjoin='foreign(Interaction.username_id) == UserNameHistory.id',
+        lazy='selectin',
+        viewonly=True
+    )
 
     __table_args__ = (
         # 复合索引
         Index('idx_channelId_userId', 'channel_id', 'user_id'),
+        Index('idx_channelId_collectTime', 'channel_id', 'collect_time'),
+        Index('idx_refChannelId_refMessageId', 'ref_channel_id', 'ref_message_id'),
+        Index('idx_channelId_messageId', 'channel_id', 'message_id'),
         {
             'mysql_engine': 'InnoDB',
             'mysql_charset': 'utf8mb4',
@@ -58,10 +142,147 @@ class Interaction(Base):
         }
     )
 
+    @property
+    def username(self):
+        """发言时的用户名; 尚未入库的记录返回构造时传入的用户名"""
+        if self.username_record is not None:
+            return self.username_record.username
+        return getattr(self, '_username', None)
+
+    @username.setter
+    def username(self, value: str):
+        self._username = value
+
     def __repr__(self):
         return f"<Interaction(id={self.interaction_id}, message_id={self.message_id})>"
 
 
+class NostrOutbox(Base):
+    """Nostr 待发布队列 (transactional outbox), 与互动记录在同一事务中写入, 发布确认后删除"""
+    __tablename__ = "discord_nostr_outbox"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True, comment='主键')
+    interaction_id = Column(Integer, nullable=False, comment='互动记录Id')
+    available_at = Column(DateTime, nullable=False, server_default=func.now(), comment='可领取时间')
+    lease_owner = Column(String(64), nullable=True, comment='领取者')
+    lease_expires_at = Column(DateTime, nullable=True, comment='租约过期时间')
+    attempts = Column(Integer, nullable=False, default=0, comment='领取次数')
+    create_at = Column(DateTime, nullable=False, server_default=func.now(), comment='创建时间')
+
+    __table_args__ = (
+        Index('uk_interactionId', 'interaction_id', unique=True),
+        Index('idx_availableAt', 'available_at'),
+        {
+            'mysql_engine': 'InnoDB',
+            'mysql_charset': 'utf8mb4',
+            'mysql_collate': 'utf8mb4_unicode_ci',
+            'comment': 'Nostr待发布队列'
+        }
+    )
+
+    def __repr__(self):
+        return f"<NostrOutbox(id={self.id}, interaction_id={self.interaction_id})>"
+
+
+class NostrDeadLetter(Base):
+    """重试次数耗尽或被中继永久拒绝的 Nostr 发布记录"""
+    __tablename__ = "discord_nostr_dead_letter"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True, comment='主键')
+    interaction_id = Column(Integer, nullable=False, comment='互动记录Id')
+    attempts = Column(Integer, nullable=False, default=0, comment='领取次数')
+    last_error = Column(String(512), nullable=True, comment='最后一次失败原因')
+    create_at = Column(DateTime, nullable=False, server_default=func.now(), comment='创建时间')
+
+    __table_args__ = (
+        Index('uk_interactionId', 'interaction_id', unique=True),
+        {
+            'mysql_engine': 'InnoDB',
+            'mysql_charset': 'utf8mb4',
+            'mysql_collate': 'utf8mb4_unicode_ci',
+            'comment': 'Nostr发布死信表'
+        }
+    )
+
+    def __repr__(self):
+        return f"<NostrDeadLetter(id={self.id}, interaction_id={self.interaction_id})>"
+
+
+class NostrRelayDelivery(Base):
+    """互动在各中继上的投递记录, 有记录即表示该中继已确认 (OK true)"""
+    __tablename__ = "discord_nostr_relay_delivery"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True, comment='主键')
+    relay_url = Column(String(255), nullable=False, comment='中继地址')
+    interaction_id = Column(Integer, nullable=False, comment='互动记录Id')
+    nostr_event_id = Column(HexBinary(32), nullable=True, comment='Nostr事件ID')
+    delivered_at = Column(DateTime, nullable=False, server_default=func.now(), comment='确认时间')
+
+    __table_args__ = (
+        Index('uk_relayUrl_interactionId', 'relay_url', 'interaction_id', unique=True),
+        # 过期数据清理按 interaction_id 删除
+        Index('idx_interactionId', 'interaction_id'),
+        {
+            'mysql_engine': 'InnoDB',
+            'mysql_charset': 'utf8mb4',
+            'mysql_collate': 'utf8mb4_unicode_ci',
+            'comment': 'Nostr中继投递记录'
+        }
+    )
+
+    def __repr__(self):
+        return f"<NostrRelayDelivery(relay_url={self.relay_url}, interaction_id={self.interaction_id})>"
+
+
+class NostrRepublishCheckpoint(Base):
+    """向单个中继批量补发历史数据的进度"""
+    __tablename__ = "discord_nostr_republish_checkpoint"
+
+    id = Column(Integer, primary_key=True, autoincrement=True, comment='主键')
+    relay_url = Column(String(255), nullable=False, comment='中继地址')
+    last_interaction_id = Column(Integer, nullable=False, default=0, comment='已处理到的互动记录Id')
+    delivered = Column(BigInteger, nullable=False, default=0, comment='累计确认数')
+    failed = Column(BigInteger, nullable=False, default=0, comment='累计失败数')
+    update_at = Column(DateTime, nullable=False, server_default=func.now(),
+                       onupdate=func.now(), comment='更新时间')
+
+    __table_args__ = (
+        Index('uk_relayUrl', 'relay_url', unique=True),
+        {
+            'mysql_engine': 'InnoDB',
+            'mysql_charset': 'utf8mb4',
+            'mysql_collate': 'utf8mb4_unicode_ci',
+            'comment': 'Nostr中继补发进度'
+        }
+    )
+
+    def __repr__(self):
+        return f"<NostrRepublishCheckpoint(relay_url={self.relay_url}, last={self.last_interaction_id})>"
+
+
+class DataVersion(Base):
+    """数据版本: 互动写入、过期数据清理、频道配置变化时递增, 读接口据此生成 ETag"""
+    __tablename__ = "discord_data_version"
+
+    scope_type = Column(String(16), primary_key=True, comment='作用域类型 (见 DataScope)')
+    scope_id = Column(BigInteger, primary_key=True, default=0, comment='频道Id/用户Id, 全局作用域为 0')
+    version = Column(BigInteger, nullable=False, default=0, comment='版本号')
+    update_at = Column(DateTime, nullable=False, server_default=func.now(),
+                       onupdate=func.now(), comment='更新时间')
+
+    __table_args__ = (
+        {
+            'mysql_engine': 'InnoDB',
+            'mysql_charset': 'utf8mb4',
+            'mysql_collate': 'utf8mb4_unicode_ci',
+            'comment': '数据版本'
+        },
+    )
+
+    def __repr__(self):
+        return f"<DataVersion({self.scope_type}:{self.scope_id}, version={self.version})>"
+
+
 class ChannelCollectLog(Base):
     """频道消息采集日志表"""
     __tablename__ = "discord_channel_collect_log"
@@ -108,3 +329,12 @@ class CollectStatus(Enum):
     FAILED = 0  # 失败
     SUCCESS = 1  # 成功
     IN_PROGRESS = 2  # 进行中
+
+
+class DataScope(Enum):
+    """数据版本的作用域类型"""
+    CHANNEL = 'channel'  # 单个频道的互动或配置
+    USER = 'user'  # 单个用户的互动
+    CHANNELS = 'channels'  # 频道配置 (增删改)
+    INTERACTIONS = 'interactions'  # 全部互动
+    RETENTION = 'retention'  # 过期数据清理
@@ -0,0 +1,181 @@
+import time
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config.config import Config
+from utils.helpers import LRUCache
+from utils.logger import Logger
+
+logger = Logger('cache_service')
+
+# 频道配置的作用域, 增删改频道时失效 (用户统计按全部频道汇总)
+CHANNELS_SCOPE = 'channels'
+
+# 缓存的响应: (状态码, mimetype, 响应体)
+CachedResponse = Tuple[int, str, bytes]
+
+
+class MemoryCacheBackend:
+    """
+    进程内缓存: 带过期时间的 LRU
+
+    代数只在本进程内有效: 同一 worker 中的频道修改立即失效, 采集进程和其他 worker 的写入要等缓存过期.
+    """
+
+    def __init__(self, max_entries: int):
+        self.entries = LRUCache(max_entries)
+        self.generations: Dict[str, Tuple[int, float]] = {}
+        self.counter = 0
+        self.next_prune = 0.0
+        self.lock = Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self.entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key: str, value: CachedResponse, ttl: int) -> None:
+        self.entries.put(key, (time.monotonic() + ttl, value))
+
+    def get_generations(self, scopes: List[str]) -> List[int]:
+        now = time.monotonic()
+        result = []
+        with self.lock:
+            for scope in scopes:
+                generation, expires_at = self.generations.get(scope, (0, 0.0))
+                result.append(generation if expires_at > now else 0)
+        return result
+
+    def bump(self, scopes: List[str], ttl: int) -> None:
+        now = time.monotonic()
+        with self.lock:
+            self.counter += 1
+            for scope in scopes:
+                self.generations[scope] = (self.counter, now + ttl)
+            if now >= self.next_prune:
+                self.generations = {scope: value for scope, value in self.generations.items() if value[1] > now}
+                self.next_prune = now + ttl
+
+
+class RedisCacheBackend:
+    """Redis 缓存, 各进程共享: 采集进程写入互动后, 所有 API worker 中相关的缓存立即失效"""
+
+    prefix = 'discord_nostr:response:'
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        header, body = value.split(b'\n', 1)
+        status, mimetype = header.decode().split(' ', 1)
+        return int(status), mimetype, body
+
+    def set(self, key: str, value: CachedResponse, ttl: int) -> None:
+        status, mimetype, body = value
+        self.client.set(self.prefix + key, f'{status} {mimetype}\n'.encode() + body, ex=ttl)
+
+    def get_generations(self, scopes: List[str]) -> List[int]:
+        values = self.client.mget([f'{self.prefix}gen:{scope}' for scope in scopes])
+        return [int(value) if value else 0 for value in values]
+
+    def bump(self, scopes: List[str], ttl: int) -> None:
+        generation = self.client.incr(self.prefix + 'generation')
+        pipe = self.client.pipeline(transaction=False)
+        for scope in scopes:
+            pipe.set(f'{self.prefix}gen:{scope}', generation, ex=ttl)
+        pipe.execute()
+
+
+def create_cache_backend():
+    if Config.REDIS_URL:
+        try:
+            import redis
+            return RedisCacheBackend(redis.Redis.from_url(Config.REDIS_URL, socket_timeout=0.5))
+        except ImportError:
+            logger.warning("redis is not installed, falling back to in-process response cache")
+    return MemoryCacheBackend(Config.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+class ResponseCache:
+    """
+    统计接口的响应缓存
+
+    缓存键由接口、路径参数、规范化后的查询参数以及响应依赖的作用域 (channel:<id>、user:<id>、channels)
+    的当前代数组成. 写入互动或修改频道配置后提升相关作用域的代数, 旧缓存不再被命中, 到期后自然淘汰,
+    不需要枚举缓存键. 作用域代数与缓存的过期时间相同, 代数过期时用它写入的缓存也都已过期;
+    每次提升都取一个新的全局代数, 过期后重新提升不会与旧缓存重合. 缓存读写失败时按未命中处理.
+    """
+
+    def __init__(self):
+        self._backend = None
+        self._lock = Lock()
+
+    @property
+    def ttl(self) -> int:
+        return Config.RESPONSE_CACHE_TTL
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = create_cache_backend()
+        return self._backend
+
+    def reset(self) -> None:
+        """丢弃后端, 下次使用时按当前配置重新创建"""
+        self._backend = None
+
+    def make_key(self, endpoint: str, args: Dict[str, Any], scopes: List[str]) -> Optional[str]:
+        try:
+            generations = self.backend.get_generations(scopes)
+        except Exception as e:
+            logger.warning(f"Response cache unavailable: {str(e)}")
+            return None
+        params = '&'.join(f'{name}={args[name]}' for name in sorted(args))
+        versions = ','.join(f'{scope}={generation}' for scope, generation in zip(scopes, generations))
+        return f'{endpoint}?{params}#{versions}'
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Response cache get failed: {str(e)}")
+            return None
+
+    def set(self, key: str, value: CachedResponse) -> None:
+        try:
+            self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            logger.warning(f"Response cache set failed: {str(e)}")
+
+    def invalidate(self, channel_ids: Iterable = (), user_ids: Iterable = (), channels: bool = False) -> None:
+        """
+        Args:
+            channel_ids: 有新互动或配置变化的频道
+            user_ids: 有新互动的用户
+            channels: 频道配置 (增删改) 是否变化
+        """
+        if not self.enabled:
+            return
+        scopes = {f'channel:{channel_id}' for channel_id in channel_ids}
+        scopes.update(f'user:{user_id}' for user_id in user_ids)
+        if channels:
+            scopes.add(CHANNELS_SCOPE)
+        if not scopes:
+            return
+        try:
+            self.backend.bump(sorted(scopes), self.ttl)
+        except Exception as e:
+            logger.warning(f"Response cache invalidation failed: {str(e)}")
+
+
+response_cache = ResponseCache()
@@ -1,16 +1,52 @@
 import pytz
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from collections import defaultdict
+from sqlalchemy import func, tuple_, or_, and_, text, case, type_coerce
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session, Query
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, Iterator, Iterable
 
-from app.models.models import Channel, Interaction, ChannelCollectLog
+from app.models.models import Channel, Interaction, InteractionType, ChannelCollectLog, User, UserNameHistory, NostrOutbox, NostrDeadLetter, NostrRelayDelivery, NostrRepublishCheckpoint, HexBinary, DataVersion, DataScope
+from app.services.cache_service import response_cache
+from config.config import Config
+from utils.helpers import LRUCache, TimestampFormatter
+
+# (user_id, username) -> discord_user_name_history.id
+_username_id_cache = LRUCache(Config.USERNAME_ID_CACHE_SIZE)
 
 
 class DatabaseService:
     @staticmethod
-    def get_active_channels(db: Session) -> List[Channel]:
-        return db.query(Channel).all()
+    def iter_chunks(query: Query, key_column, chunk_size: int = None) -> Iterator[List[Any]]:
+        """
+        按 key_column (唯一且递增的主键) 做 keyset 分块, 流式遍历查询结果
+
+        每块单独查询并通过服务端游标读取, 块读取完毕后才交给调用方, 调用方可以在两块之间
+        执行其他查询或提交事务. 峰值内存只与 chunk_size 有关, 与结果集大小无关.
+        """
+        chunk_size = chunk_size or Config.DB_CHUNK_SIZE
+        last_key = None
+        while True:
+            chunk_query = query if last_key is None else query.filter(key_column > last_key)
+            chunk = list(
+                chunk_query.order_by(key_column)
+                .limit(chunk_size)
+                .execution_options(stream_results=True)
+                .yield_per(chunk_size)
+            )
+            if not chunk:
+                return
+
+            yield chunk
+
+            if len(chunk) < chunk_size:
+                return
+            last_key = getattr(chunk[-1], key_column.key)
+
+    @staticmethod
+    def iter_active_channels(db: Session, chunk_size: int = None) -> Iterator[Channel]:
+        for chunk in DatabaseService.iter_chunks(db.query(Channel), Channel.id, chunk_size):
+            yield from chunk
 
     @staticmethod
     def select_max_interaction_id(db: Session, channel_id: int) -> Optional[int]:
@@ -21,12 +57,44 @@ class DatabaseService:
         return result[0] if result else None
 
     @staticmethod
-    def get_interaction_nostr_event_id(db: Session, channel_id: int, message_id: int) -> Optional[str]:
-        result = db.query(Interaction.nostr_event_id) \
+    def get_ref_interactions(db: Session, refs: Iterable[Tuple[int, int]],
+                             chunk_size: int = None) -> Dict[Tuple[int, int], Interaction]:
+        """
+        批量查询被引用的消息记录 (不论是否已发布)
+
+        点赞记录的 message_id 与被点赞消息相同, 需要排除; 走 idx_channelId_messageId 索引.
+        同一消息重复入库时取 interaction_id 最小的一条.
+
+        Args:
+            refs: [(channel_id, message_id)]
+
+        Returns:
+            {(channel_id, message_id): Interaction}, 只包含已入库的消息
+        """
+        refs = list(set(refs))
+        chunk_size = chunk_size or Config.DB_CHUNK_SIZE
+        result = {}
+        for start in range(0, len(refs), chunk_size):
+            rows = db.query(Interaction) \
+                .filter(tuple_(Interaction.channel_id, Interaction.message_id).in_(refs[start:start + chunk_size])) \
+                .filter(Interaction.type != InteractionType.LIKE.value) \
+                .order_by(Interaction.interaction_id) \
+                .all()
+            for row in rows:
+                result.setdefault((row.channel_id, row.message_id), row)
+        return result
+
+    @staticmethod
+    def get_digest_chunk_event_ids(db: Session, channel_id: int, start: datetime, end: datetime) -> List[str]:
+        """汇总频道在 [start, end) 内已发布的汇总块事件ID (汇总模式下互动记录的 nostr_event_id 即所在块的事件ID)"""
+        rows = db.query(Interaction.nostr_event_id) \
             .filter(Interaction.channel_id == channel_id) \
-            .filter(Interaction.message_id == message_id) \
-            .first()
-        return result[0] if result else None
+            .filter(Interaction.interaction_time >= start) \
+            .filter(Interaction.interaction_time < end) \
+            .filter(Interaction.nostr_event_id.isnot(None)) \
+            .distinct() \
+            .all()
+        return [row[0] for row in rows]
 
     @staticmethod
     def update_interaction_published_status(db: Session, interaction_id: int, nostr_event_id: str) -> bool:
@@ -47,6 +115,144 @@ class DatabaseService:
             db.rollback()
             raise
 
+    @staticmethod
+    def _insert_relay_deliveries(db: Session, deliveries: Dict[Tuple[int, str], str]) -> None:
+        """写入中继投递记录 (不提交事务), 已存在的记录更新事件ID"""
+        if not deliveries:
+            return
+        insert_stmt = mysql_insert(NostrRelayDelivery).values([
+            {'interaction_id': interaction_id, 'relay_url': relay_url, 'nostr_event_id': event_id}
+            for (interaction_id, relay_url), event_id in deliveries.items()
+        ])
+        db.execute(insert_stmt.on_duplicate_key_update(nostr_event_id=insert_stmt.inserted.nostr_event_id))
+
+    @staticmethod
+    def save_relay_deliveries(db: Session, deliveries: Dict[Tuple[int, str], str]) -> None:
+        """写入已发布互动的中继投递记录 (发布返回后才确认的慢中继)"""
+        if not deliveries:
+            return
+        try:
+            DatabaseService._insert_relay_deliveries(db, deliveries)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    @staticmethod
+    def mark_interactions_published(db: Session, worker_id: Optional[str], published: Dict[int, str],
+                                    deliveries: Dict[Tuple[int, str], str] = None) -> int:
+        """
+        批量标记互动已发布并删除对应的 outbox 记录, 在一个事务中提交
+
+        Args:
+            worker_id: 只删除该发布进程持有租约的 outbox 记录; None 表示不论租约全部删除 (对账)
+            published: {interaction_id: nostr_event_id}
+            deliveries: {(interaction_id, relay_url): nostr_event_id}, 同时写入中继投递记录
+
+        Returns:
+            更新的互动记录数
+        """
+        if not published:
+            return 0
+
+        table = Interaction.__table__
+        interaction_ids = list(published)
+        try:
+            updated = db.execute(
+                table.update()
+                .where(table.c.interaction_id.in_(interaction_ids))
+                .values(
+                    is_published=True,
+                    nostr_event_id=case(
+                        {interaction_id: type_coerce(event_id, HexBinary(32))
+                         for interaction_id, event_id in published.items()},
+                        value=table.c.interaction_id
+                    )
+                )
+            ).rowcount
+            outbox_query = db.query(NostrOutbox).filter(NostrOutbox.interaction_id.in_(interaction_ids))
+            if worker_id is not None:
+                outbox_query = outbox_query.filter(NostrOutbox.lease_owner == worker_id)
+            outbox_query.delete(synchronize_session=False)
+            DatabaseService._insert_relay_deliveries(db, deliveries)
+            db.commit()
+            return updated
+        except Exception:
+            db.rollback()
+            raise
+
+    @staticmethod
+    def attach_usernames(db: Session, interactions: List[Interaction]) -> None:
+        """
+        维护用户维度表和用户名历史, 并为互动记录填充 username_id (不提交事务)
+        """
+        latest_usernames = {}
+        for interaction in interactions:
+            if interaction.username:
+                latest_usernames[int(interaction.user_id)] = interaction.username
+        if not latest_usernames:
+            return
+
+        statement = mysql_insert(User.__table__).values([
+            {'user_id': user_id, 'username': username}
+            for user_id, username in latest_usernames.items()
+        ])
+        db.execute(statement.on_duplicate_key_update(
+            username=statement.inserted.username,
+            last_seen_at=func.now()
+        ))
+
+        pairs = {(int(item.user_id), item.username) for item in interactions if item.username}
+        username_ids = _username_id_cache.get_many(pairs)
+        missing = [pair for pair in pairs if pair not in username_ids]
+        if missing:
+            db.execute(mysql_insert(UserNameHistory.__table__).prefix_with('IGNORE').values([
+                {'user_id': user_id, 'username': username} for user_id, username in missing
+            ]))
+            rows = db.query(UserNameHistory.id, UserNameHistory.user_id, UserNameHistory.username) \
+                .filter(tuple_(UserNameHistory.user_id, UserNameHistory.username).in_(missing)) \
+                .all()
+            # username 列为二进制排序规则, 查询结果与 (user_id, username) 精确对应
+            resolved = {(row.user_id, row.username): row.id for row in rows}
+            _username_id_cache.put_many(resolved)
+            username_ids.update(resolved)
+
+        for interaction in interactions:
+            if interaction.username:
+                interaction.username_id = username_ids.get((int(interaction.user_id), interaction.username))
+
+    @staticmethod
+    def bump_data_versions(db: Session, channel_ids: Iterable = (), user_ids: Iterable = (),
+                           scopes: Iterable[DataScope] = ()) -> None:
+        """
+        递增数据版本 (不提交事务), 与数据修改在同一事务中提交, 读到新版本时一定能读到新数据
+
+        Args:
+            channel_ids / user_ids: 数据变化的频道 / 用户
+            scopes: 变化的全局作用域
+        """
+        keys = {(DataScope.CHANNEL.value, int(channel_id)) for channel_id in channel_ids}
+        keys.update((DataScope.USER.value, int(user_id)) for user_id in user_ids)
+        keys.update((scope.value, 0) for scope in scopes)
+        if not keys:
+            return
+        # 固定加锁顺序, 避免并发写入时死锁
+        insert_stmt = mysql_insert(DataVersion).values([
+            {'scope_type': scope_type, 'scope_id': scope_id, 'version': 1}
+            for scope_type, scope_id in sorted(keys)
+        ])
+        db.execute(insert_stmt.on_duplicate_key_update(version=DataVersion.version + 1))
+
+    @staticmethod
+    def get_data_versions(db: Session, keys: List[Tuple[str, int]]) -> Dict[Tuple[str, int], int]:
+        """按主键读取数据版本, 没有记录的作用域不在结果中 (视为 0)"""
+        if not keys:
+            return {}
+        rows = db.query(DataVersion.scope_type, DataVersion.scope_id, DataVersion.version) \
+            .filter(tuple_(DataVersion.scope_type, DataVersion.scope_id).in_(keys)) \
+            .all()
+        return {(scope_type, scope_id): version for scope_type, scope_id, version in rows}
+
     @staticmethod
     def save_interactions_batch(db: Session, interactions: List[Dict[str, Any]]) -> int:
         interaction_objects = []
@@ -59,17 +265,31 @@ class DatabaseService:
                 interaction_content=item['interaction_content'],
                 interaction_time=item['interaction_time'],
                 post_time=item['post_time'],
-                note=item['note'],
+                note=item.get('note'),
+                ref_message_id=item.get('ref_message_id'),
+                ref_channel_id=item.get('ref_channel_id'),
+                reaction_emoji=item.get('reaction_emoji'),
                 type=item['type']
             )
             interaction_objects.append(interaction)
 
         try:
-            db.bulk_save_objects(interaction_objects)
+            DatabaseService.attach_usernames(db, interaction_objects)
+            db.add_all(interaction_objects)
+            # flush 获取自增主键, outbox 记录与互动记录在同一事务中提交
+            db.flush()
+            DatabaseService.enqueue_outbox(db, [item.interaction_id for item in interaction_objects])
+            DatabaseService.bump_data_versions(db, {item['channel_id'] for item in interactions},
+                                               {item['user_id'] for item in interactions},
+                                               [DataScope.INTERACTIONS])
             db.commit()
+            response_cache.invalidate(channel_ids={item['channel_id'] for item in interactions},
+                                      user_ids={item['user_id'] for item in interactions})
             return len(interaction_objects)
         except Exception as e:
             db.rollback()
+            # 回滚后新插入的用户名记录不存在, 缓存中的 id 可能失效
+            _username_id_cache.clear()
             raise e
 
     @staticmethod
@@ -117,6 +337,65 @@ class DatabaseService:
 
         return total, result
 
+    @staticmethod
+    def get_batch_interaction_stats(db: Session, user_ids: List[int], channel_ids: List[int],
+                                    start_time: int = None,
+                                    end_time: int = None) -> Tuple[Dict[int, Dict], Dict[int, Optional[int]]]:
+        """
+        批量获取用户和频道的互动统计, 用户和频道各一次 GROUP BY 查询
+
+        口径与单个接口一致: 用户只统计已配置的频道 (get_user_interaction_stats), 配置了过期时间的频道只统计
+        未过期的数据 (get_channel_interaction_count); start_time/end_time 对两者都生效.
+
+        Returns:
+            ({user_id: {'total_interactions': 总数, 'per_channel': [{'channel_id', 'count'}]}},
+             {channel_id: 互动数, 频道不存在时为 None})
+        """
+        time_filters = []
+        if start_time:
+            time_filters.append(Interaction.collect_time > datetime.fromtimestamp(start_time, pytz.UTC))
+        if end_time:
+            time_filters.append(Interaction.collect_time < datetime.fromtimestamp(end_time, pytz.UTC))
+        channels = {int(channel.channel_id): channel for channel in db.query(Channel).all()}
+
+        user_stats = {user_id: {'total_interactions': 0, 'per_channel': []} for user_id in user_ids}
+        if user_stats and channels:
+            # 走 (channel_id, user_id) 索引
+            rows = db.query(Interaction.user_id, Interaction.channel_id, func.count(Interaction.interaction_id)) \
+                .filter(Interaction.channel_id.in_(list(channels)),
+                        Interaction.user_id.in_(list(user_stats)),
+                        *time_filters) \
+                .group_by(Interaction.user_id, Interaction.channel_id) \
+                .order_by(Interaction.user_id, Interaction.channel_id) \
+                .all()
+            for user_id, channel_id, count in rows:
+                stats = user_stats[user_id]
+                stats['total_interactions'] += count
+                stats['per_channel'].append({'channel_id': channel_id, 'count': count})
+
+        channel_counts: Dict[int, Optional[int]] = {channel_id: None for channel_id in channel_ids}
+        # 过期时间相同的频道截止时间相同, 合并成一个 IN 条件
+        by_expiration = defaultdict(list)
+        for channel_id in channel_counts:
+            if channel_id in channels:
+                channel_counts[channel_id] = 0
+                by_expiration[channels[channel_id].expiration_time].append(channel_id)
+        if by_expiration:
+            conditions = []
+            for expiration_time, ids in by_expiration.items():
+                condition = Interaction.channel_id.in_(ids)
+                if expiration_time:
+                    cutoff_time = DatabaseService.parse_expiration_time(expiration_time)
+                    condition = and_(condition, Interaction.collect_time > cutoff_time)
+                conditions.append(condition)
+            rows = db.query(Interaction.channel_id, func.count(Interaction.interaction_id)) \
+                .filter(or_(*conditions), *time_filters) \
+                .group_by(Interaction.channel_id) \
+                .all()
+            channel_counts.update((int(channel_id), count) for channel_id, count in rows)
+
+        return user_stats, channel_counts
+
     @staticmethod
     def get_channel_last_collect_time(db: Session, channel_id: int) -> Optional[datetime]:
         result = db.query(func.max(ChannelCollectLog.collect_time)) \
@@ -141,11 +420,225 @@ class DatabaseService:
         return log.id
 
     @staticmethod
-    def get_unsynced_interactions(db: Session) -> Tuple[int, List[Interaction]]:
+    def iter_unsynced_interactions_by_messages(db: Session, messages: Iterable[Tuple[int, int]],
+                                               chunk_size: int = None) -> Iterator[List[Interaction]]:
+        """
+        按 (channel_id, message_id) 分块查询未发布的互动记录 (对账), 走 idx_channelId_messageId 索引,
+        只读取与中继事件可能匹配的行
+
+        Args:
+            messages: [(channel_id, message_id)]
+        """
+        messages = sorted(set(messages))
+        chunk_size = chunk_size or Config.DB_CHUNK_SIZE
+        for start in range(0, len(messages), chunk_size):
+            rows = db.query(Interaction) \
+                .filter(tuple_(Interaction.channel_id, Interaction.message_id).in_(messages[start:start + chunk_size])) \
+                .filter(Interaction.is_published == False) \
+                .order_by(Interaction.interaction_id) \
+                .all()
+            if rows:
+                yield rows
+
+    @staticmethod
+    def iter_undelivered_interactions(db: Session, relay_url: str, after_id: int = 0,
+                                      chunk_size: int = None) -> Iterator[List[Interaction]]:
+        """按 interaction_id 分块遍历已发布但尚未投递到指定中继的互动记录 (补发历史数据)"""
+        query = db.query(Interaction) \
+            .outerjoin(NostrRelayDelivery, and_(NostrRelayDelivery.interaction_id == Interaction.interaction_id,
+                                                NostrRelayDelivery.relay_url == relay_url)) \
+            .filter(NostrRelayDelivery.id.is_(None)) \
+            .filter(Interaction.is_published == True) \
+            .filter(Interaction.interaction_id > after_id)
+        return DatabaseService.iter_chunks(query, Interaction.interaction_id, chunk_size)
+
+    @staticmethod
+    def count_published_interactions(db: Session, after_id: int = 0) -> int:
+        """interaction_id 大于 after_id 的已发布互动数, 作为补发任务的总量上限"""
+        return db.query(func.count(Interaction.interaction_id)) \
+            .filter(Interaction.is_published == True) \
+            .filter(Interaction.interaction_id > after_id) \
+            .scalar() or 0
+
+    @staticmethod
+    def get_republish_checkpoint(db: Session, relay_url: str) -> Optional[NostrRepublishCheckpoint]:
+        return db.query(NostrRepublishCheckpoint) \
+            .filter(NostrRepublishCheckpoint.relay_url == relay_url) \
+            .first()
+
+    @staticmethod
+    def save_republish_progress(db: Session, relay_url: str, last_interaction_id: int,
+                                deliveries: Dict[Tuple[int, str], str], failed: int) -> None:
+        """
+        写入一块的投递记录并更新补发进度, 在一个事务中提交; 中断后从 last_interaction_id 继续
+
+        检查点取本次补发的进度, 从更早的位置重新扫描时可能低于原检查点, 之后的失败记录不会被跳过.
+        """
+        try:
+            DatabaseService._insert_relay_deliveries(db, deliveries)
+            insert_stmt = mysql_insert(NostrRepublishCheckpoint).values(
+                relay_url=relay_url, last_interaction_id=last_interaction_id,
+                delivered=len(deliveries), failed=failed
+            )
+            db.execute(insert_stmt.on_duplicate_key_update(
+                last_interaction_id=insert_stmt.inserted.last_interaction_id,
+                delivered=NostrRepublishCheckpoint.delivered + insert_stmt.inserted.delivered,
+                failed=NostrRepublishCheckpoint.failed + insert_stmt.inserted.failed
+            ))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    @staticmethod
+    def reset_republish_checkpoint(db: Session, relay_url: str) -> None:
+        try:
+            db.query(NostrRepublishCheckpoint) \
+                .filter(NostrRepublishCheckpoint.relay_url == relay_url) \
+                .delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    @staticmethod
+    def enqueue_outbox(db: Session, interaction_ids: List[int]) -> None:
+        """写入 Nostr 待发布队列 (不提交事务, 由调用方与互动记录一起提交)"""
+        if interaction_ids:
+            db.execute(NostrOutbox.__table__.insert(),
+                       [{'interaction_id': interaction_id} for interaction_id in interaction_ids])
+
+    @staticmethod
+    def claim_outbox_batch(db: Session, worker_id: str, limit: int, lease_seconds: int) -> List[Interaction]:
+        """
+        按 id 顺序领取一批可发布的 outbox 记录并加租约
+
+        SKIP LOCKED 保证多个发布进程并发领取时互不阻塞、不重复; 租约过期未确认的记录会被重新领取.
+
+        Returns:
+            领取到的互动记录, 按 interaction_id 排序
+        """
+        now = func.now()
+        try:
+            entries = db.query(NostrOutbox.id, NostrOutbox.interaction_id) \
+                .filter(NostrOutbox.available_at <= now) \
+                .filter(or_(NostrOutbox.lease_expires_at.is_(None), NostrOutbox.lease_expires_at < now)) \
+                .order_by(NostrOutbox.id) \
+                .limit(limit) \
+                .with_for_update(skip_locked=True) \
+                .all()
+            if not entries:
+                db.commit()
+                return []
+
+            outbox_ids = [entry.id for entry in entries]
+            db.query(NostrOutbox) \
+                .filter(NostrOutbox.id.in_(outbox_ids)) \
+                .update({
+                    NostrOutbox.lease_owner: worker_id,
+                    NostrOutbox.lease_expires_at: func.timestampadd(text('SECOND'), lease_seconds, now),
+                    NostrOutbox.attempts: NostrOutbox.attempts + 1
+                }, synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        interaction_ids = [entry.interaction_id for entry in entries]
         interactions = db.query(Interaction) \
-            .filter(Interaction.is_published == False) \
+            .filter(Interaction.interaction_id.in_(interaction_ids)) \
+            .order_by(Interaction.interaction_id) \
             .all()
-        return len(interactions), interactions
+
+        # 互动记录已被保留策略清理的 outbox 记录直接删除
+        found = {interaction.interaction_id for interaction in interactions}
+        orphans = [interaction_id for interaction_id in interaction_ids if interaction_id not in found]
+        if orphans:
+            DatabaseService.ack_outbox_entries(db, worker_id, orphans)
+
+        return interactions
+
+    @staticmethod
+    def ack_outbox_entries(db: Session, worker_id: str, interaction_ids: List[int]) -> int:
+        """确认发布成功, 删除本进程持有租约的 outbox 记录"""
+        if not interaction_ids:
+            return 0
+        try:
+            deleted = db.query(NostrOutbox) \
+                .filter(NostrOutbox.interaction_id.in_(interaction_ids)) \
+                .filter(NostrOutbox.lease_owner == worker_id) \
+                .delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        except Exception:
+            db.rollback()
+            raise
+
+    @staticmethod
+    def release_outbox_entries(db: Session, worker_id: str, failures: Dict[int, str],
+                               permanent: Iterable[int] = ()) -> Tuple[int, int]:
+        """
+        发布失败, 释放租约并按带抖动的指数退避延迟重新领取
+
+        领取次数达到 NOSTR_MAX_ATTEMPTS 或被中继永久拒绝 (permanent) 的记录转入死信表.
+
+        Args:
+            failures: {interaction_id: 失败原因}
+
+        Returns:
+            (释放数, 转入死信表数)
+        """
+        if not failures:
+            return 0, 0
+        permanent = set(permanent)
+        try:
+            entries = db.query(NostrOutbox.interaction_id, NostrOutbox.attempts) \
+                .filter(NostrOutbox.interaction_id.in_(list(failures))) \
+                .filter(NostrOutbox.lease_owner == worker_id) \
+                .all()
+            dead = [entry for entry in entries
+                    if entry.attempts >= Config.NOSTR_MAX_ATTEMPTS or entry.interaction_id in permanent]
+            retry_ids = [entry.interaction_id for entry in entries if entry not in dead]
+
+            if dead:
+                insert_stmt = mysql_insert(NostrDeadLetter).values([
+                    {
+                        'interaction_id': entry.interaction_id,
+                        'attempts': entry.attempts,
+                        'last_error': (failures[entry.interaction_id] or '')[:512]
+                    }
+                    for entry in dead
+                ])
+                db.execute(insert_stmt.on_duplicate_key_update(
+                    attempts=insert_stmt.inserted.attempts,
+                    last_error=insert_stmt.inserted.last_error
+                ))
+                db.query(NostrOutbox) \
+                    .filter(NostrOutbox.interaction_id.in_([entry.interaction_id for entry in dead])) \
+                    .filter(NostrOutbox.lease_owner == worker_id) \
+                    .delete(synchronize_session=False)
+
+            if retry_ids:
+                # delay = min(max, base * 2^(attempts-1)), 实际取 [delay/2, delay], 避免失败的批次同时重试
+                delay = func.least(
+                    Config.NOSTR_RETRY_MAX_DELAY_SECONDS,
+                    Config.NOSTR_RETRY_DELAY_SECONDS * func.pow(2, func.least(NostrOutbox.attempts - 1, 20))
+                )
+                db.query(NostrOutbox) \
+                    .filter(NostrOutbox.interaction_id.in_(retry_ids)) \
+                    .filter(NostrOutbox.lease_owner == worker_id) \
+                    .update({
+                        NostrOutbox.lease_owner: None,
+                        NostrOutbox.lease_expires_at: None,
+                        NostrOutbox.available_at: func.timestampadd(
+                            text('SECOND'), func.floor(delay * (0.5 + func.rand() * 0.5)), func.now()
+                        )
+                    }, synchronize_session=False)
+            db.commit()
+            return len(retry_ids), len(dead)
+        except Exception:
+            db.rollback()
+            raise
 
     @classmethod
     @staticmethod
@@ -168,8 +661,10 @@ class DatabaseService:
 
         try:
             db.add(channel)
+            DatabaseService.bump_data_versions(db, [channel.channel_id], scopes=[DataScope.CHANNELS])
             db.commit()
             db.refresh(channel)
+            response_cache.invalidate(channel_ids=[channel.channel_id], channels=True)
             return channel.id
         except Exception as e:
             db.rollback()
@@ -198,7 +693,9 @@ class DatabaseService:
                 setattr(channel, field_name, validated_data[key])
 
         try:
+            DatabaseService.bump_data_versions(db, [channel.channel_id], scopes=[DataScope.CHANNELS])
             db.commit()
+            response_cache.invalidate(channel_ids=[validated_data['channel_id']], channels=True)
             return True
         except Exception as e:
             db.rollback()
@@ -215,7 +712,9 @@ class DatabaseService:
 
         try:
             db.delete(channel)
+            DatabaseService.bump_data_versions(db, [channel.channel_id], scopes=[DataScope.CHANNELS])
             db.commit()
+            response_cache.invalidate(channel_ids=[validated_data['channel_id']], channels=True)
             return True
         except Exception as e:
             db.rollback()
@@ -244,10 +743,17 @@ class DatabaseService:
     @staticmethod
     def save_channel_interaction(db: Session, interaction: Interaction):
         try:
+            DatabaseService.attach_usernames(db, [interaction])
             db.add(interaction)
+            db.flush()
+            DatabaseService.enqueue_outbox(db, [interaction.interaction_id])
+            DatabaseService.bump_data_versions(db, [interaction.channel_id], [interaction.user_id],
+                                               [DataScope.INTERACTIONS])
             db.commit()
+            response_cache.invalidate(channel_ids=[interaction.channel_id], user_ids=[interaction.user_id])
         except Exception as e:
             db.rollback()
+            _username_id_cache.clear()
             raise e
 
     @staticmethod
@@ -290,7 +796,8 @@ class DatabaseService:
                                    user_id: str, 
                                    channel_id: str = None, 
                                    offset: int = 0, 
-                                   limit: int = 10) -> Tuple[int, List[Dict[str, Any]]]:
+                                   limit: int = 10,
+                                   epoch: bool = False) -> Tuple[int, List[Dict[str, Any]]]:
         """
         获取用户互动历史
         
@@ -300,11 +807,14 @@ class DatabaseService:
             channel_id: 频道ID (可选)
             offset: 分页偏移量
             limit: 分页大小
+            epoch: 时间以秒级时间戳返回
             
         Returns:
             Tuple[消息数量, 消息列表]
         """
-        query = db.query(Interaction)\
+        # 只查询返回的列, 不构造 ORM 对象
+        query = db.query(Interaction.channel_id, Interaction.interaction_content,
+                         Interaction.interaction_time, Interaction.collect_time)\
             .filter(Interaction.user_id == user_id)\
             .order_by(Interaction.interaction_time.desc())
 
@@ -318,11 +828,12 @@ class DatabaseService:
         messages = query.offset(offset).limit(limit).all()
 
         # 格式化返回数据
+        format_time = TimestampFormatter(epoch)
         formatted_messages = [{
             'channel_id': msg.channel_id,
             'message': msg.interaction_content,
-            'timestamp': msg.interaction_time.strftime('%a, %d %b %Y %H:%M:%S -0000'),
-            'collect_time': msg.collect_time.strftime('%a, %d %b %Y %H:%M:%S -0000')
+            'timestamp': format_time(msg.interaction_time),
+            'collect_time': format_time(msg.collect_time)
         } for msg in messages]
 
         return total_count, formatted_messages
@@ -333,7 +844,8 @@ class DatabaseService:
                                    offset: int = 0,
                                    limit: int = 10,
                                    start_time: int = None,
-                                   end_time: int = None
+                                   end_time: int = None,
+                                   epoch: bool = False
                                 ) -> Tuple[int, List[Dict[str, Any]]]:
         """
         获取用户互动历史
@@ -343,11 +855,14 @@ class DatabaseService:
             channel_id: 频道ID (可选)
             offset: 分页偏移量
             limit: 分页大小
+            epoch: 时间以秒级时间戳返回
 
         Returns:
             Tuple[消息数量, 消息列表]
         """
-        query = db.query(Interaction)\
+        # 只查询返回的列, 不构造 ORM 对象
+        query = db.query(Interaction.user_id, Interaction.channel_id, Interaction.interaction_content,
+                         Interaction.interaction_time, Interaction.collect_time)\
             .order_by(Interaction.interaction_time.desc())
 
         if channel_id:
@@ -366,12 +881,13 @@ class DatabaseService:
         messages = query.offset(offset).limit(limit).all()
 
         # 格式化返回数据
+        format_time = TimestampFormatter(epoch)
         formatted_messages = [{
             'user_id': msg.user_id,
             'channel_id': msg.channel_id,
             'message': msg.interaction_content,
-            'timestamp': msg.interaction_time.strftime('%a, %d %b %Y %H:%M:%S -0000'),
-            'collect_time': msg.collect_time.strftime('%a, %d %b %Y %H:%M:%S -0000')
+            'timestamp': format_time(msg.interaction_time),
+            'collect_time': format_time(msg.collect_time)
 
         } for msg in messages]
 
@@ -10,6 +10,7 @@ from app.models.database import get_db
 from app.models.models import InteractionType, Interaction
 from app.services.database_service import DatabaseService
 from app.services.pynostr_sync import NostrSync
+from app.services.retention_service import RetentionService
 from config.config import Config
 from utils.logger import Logger
 import pytz
@@ -23,13 +24,26 @@ class DiscordCollector(discord.Client):
         self.batch_size = 100
         self.batch_timeout = 10  # 秒
         self.message_queue = None
+        self.publish_wakeup = None
+        self.publish_task = None
         self.nostr_sync = NostrSync(Config.NOSTR_RELAY_URLS, Config.NOSTR_PRIVATE_KEY)
+        self.retention_service = RetentionService()
 
     async def setup_hook(self) -> None:
         """这个方法会在客户端初始化时被调用，在正确的事件循环中设置"""
         self.message_queue = asyncio.Queue()
+        self.publish_wakeup = asyncio.Event()
         self.loop.create_task(self.process_message_queue())
+        self.publish_task = self.loop.create_task(self.nostr_publish())
         self.collect_messages.start()
+        self.enforce_retention.start()
+
+    async def close(self) -> None:
+        if self.publish_task is not None:
+            self.publish_task.cancel()
+            await asyncio.gather(self.publish_task, return_exceptions=True)
+        await self.nostr_sync.close()
+        await super().close()
 
     async def on_ready(self):
         """当 Discord 客户端准备就绪时触发"""
@@ -70,7 +84,6 @@ class DiscordCollector(discord.Client):
                     'username': message.author.name,
                     'interaction_content': message.content,
                     'interaction_time': message.created_at,
-                    'note': '',
                     'type': InteractionType.MESSAGE.value,
                     'post_time': message.created_at
                 }
@@ -78,11 +91,8 @@ class DiscordCollector(discord.Client):
 
                 # 判断消息是否为回复
                 if message.reference and message.reference.message_id:
-                    info = {
-                        'message_id': message.reference.message_id,
-                        'channel_id': message.reference.channel_id
-                    }
-                    interaction_data['note'] = str(info)
+                    interaction_data['ref_message_id'] = message.reference.message_id
+                    interaction_data['ref_channel_id'] = message.reference.channel_id
                     interaction_data[
                         'type'] = InteractionType.REPLY.value if message.reference.channel_id == message.channel.id else InteractionType.RETWEET.value
 
@@ -106,6 +116,8 @@ class DiscordCollector(discord.Client):
             if interactions_data:
                 saved_count = self.db_service.save_interactions_batch(db, interactions_data)
                 self.logger.info(f"Saved {saved_count} messages successfully")
+                if saved_count:
+                    self.notify_publisher()
 
         except Exception as e:
             self.logger.error(f"Error saving message batch: {str(e)}")
@@ -118,9 +130,7 @@ class DiscordCollector(discord.Client):
         db = next(get_db())
         try:
             self.logger.info("Starting message collection task")
-            channels = self.db_service.get_active_channels(db)
-
-            for channel in channels:
+            for channel in self.db_service.iter_active_channels(db):
                 channel_id = int(channel.channel_id)
                 discord_channel = self.get_channel(channel_id)
 
@@ -236,21 +246,47 @@ class DiscordCollector(discord.Client):
         finally:
             db.close()
 
-    @tasks.loop(hours=24)
+    def notify_publisher(self) -> None:
+        """新的互动已提交到数据库 (outbox 同事务写入), 唤醒发布任务"""
+        if self.publish_wakeup is not None:
+            self.publish_wakeup.set()
+
     async def nostr_publish(self):
-        """定时发布消息到 Nostr"""
-        db = next(get_db())
-        try:
-            self.logger.info("Starting Nostr publish task")
-            unsynced_interactions = self.db_service.get_unsynced_interactions(db)
-            total, interactions = unsynced_interactions
-            self.logger.info(f"Found {total} unsynced interactions")
+        """
+        持续发布 outbox 中的互动到 Nostr
+
+        入库后被唤醒, 稍等 NOSTR_PUBLISH_LINGER_SECONDS 合并连续写入的批次后按小批量发布;
+        没有唤醒时每 NOSTR_PUBLISH_MAX_DELAY 秒检查一次, 处理延迟重试和其他进程写入的数据.
+        """
+        self.logger.info("Starting Nostr publish task")
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self.publish_wakeup.wait(), Config.NOSTR_PUBLISH_MAX_DELAY)
+                    await asyncio.sleep(Config.NOSTR_PUBLISH_LINGER_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                # 发布过程中入库的数据会再次设置事件, 下一轮立即处理
+                self.publish_wakeup.clear()
+                published = await self.nostr_sync.publish_outbox()
+                if published:
+                    self.logger.info(f"Published {published} interactions to Nostr")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Error in nostr_publish task: {str(e)}")
+                await asyncio.sleep(1)
 
-            self.nostr_sync.sync_interactions(interactions)
+    @tasks.loop(hours=Config.RETENTION_INTERVAL_HOURS)
+    async def enforce_retention(self):
+        """定时清理过期的互动数据"""
+        try:
+            self.logger.info("Starting retention task")
+            # 分区维护和批量删除都是阻塞的数据库操作, 放到线程中执行避免阻塞采集
+            result = await asyncio.to_thread(self.retention_service.run)
+            self.logger.info(f"Retention task finished: {result}")
         except Exception as e:
-            self.logger.error(f"Error in nostr_publish task: {str(e)}")
-        finally:
-            db.close()
+            self.logger.error(f"Error in enforce_retention task: {str(e)}")
 
     async def on_raw_reaction_add(self, payload):
         """
@@ -272,13 +308,6 @@ class DiscordCollector(discord.Client):
                     message = await channel.fetch_message(payload.message_id)
                     user = await self.fetch_user(payload.user_id)
 
-                    info = {
-                        'emoji': payload.emoji,
-                        'user': user.name,
-                        'message_id': message.id,
-                        'channel_id': message.channel.id
-                    }
-
                     # 创建交互记录
                     interaction = Interaction(
                         message_id=message.id,
@@ -289,10 +318,13 @@ class DiscordCollector(discord.Client):
                         interaction_time=message.created_at,
                         post_time=message.created_at,
                         type=InteractionType.LIKE.value,
-                        note=str(info)
+                        ref_message_id=message.id,
+                        ref_channel_id=message.channel.id,
+                        reaction_emoji=str(payload.emoji)
                     )
 
                     self.db_service.save_channel_interaction(db, interaction)
+                    self.notify_publisher()
                     self.logger.info(
                         f"Saved reaction: {user.name} reacted to message {message.id} with {payload.emoji}")
             except Exception as e:
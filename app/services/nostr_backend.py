@@ -0,0 +1,80 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from config.config import Config
+
+# NIP-01 OK 消息中表示重试也不会成功的拒绝前缀
+PERMANENT_REJECTIONS = ('invalid', 'blocked', 'pow', 'restricted')
+
+
+@dataclass
+class PublishResult:
+    """单个事件在单个中继上的发布结果"""
+    event_id: str
+    relay_url: str
+    accepted: bool
+    message: str = ''
+
+    @property
+    def permanent(self) -> bool:
+        """中继明确拒绝且重试无意义 (格式错误、被屏蔽等)"""
+        return not self.accepted and self.message.split(':', 1)[0].strip() in PERMANENT_REJECTIONS
+
+
+class NostrBackend(ABC):
+    """
+    中继传输后端接口
+
+    NostrSync 只通过该接口发送已签名的 EVENT 帧和查询事件, 具体实现由 Config.NOSTR_BACKEND 选择:
+      - asyncio: AsyncNostrPublisher, 每个中继一条持久连接, 流水线发送 (默认)
+      - pynostr: PynostrBackend, pynostr RelayManager, 每批建立连接并逐条等待 OK
+    """
+
+    name = ''
+
+    def __init__(self, relay_urls: List[str]):
+        self.relay_urls = list(relay_urls)
+
+    async def start(self) -> None:
+        """在当前事件循环中初始化 (可重复调用)"""
+
+    @abstractmethod
+    async def close(self) -> None:
+        ...
+
+    @abstractmethod
+    async def publish_events(self, events: List[Tuple[str, str]]) -> Dict[str, List[PublishResult]]:
+        """
+        Args:
+            events: [(事件ID, EVENT 帧)]
+
+        Returns:
+            {事件ID: [各中继的发布结果]}
+        """
+
+    @abstractmethod
+    async def query(self, filters: Dict, timeout: float = None) -> List[Dict]:
+        """发送 REQ, 返回 EOSE 之前各中继返回的事件 (按事件ID去重)"""
+
+    def pop_late_results(self) -> List[PublishResult]:
+        """publish_events 返回后才收到的确认 (慢中继), 取出后清空; 不支持的后端返回空列表"""
+        return []
+
+    def relay_health(self) -> List[Dict]:
+        return []
+
+    def ok_latencies(self) -> List[float]:
+        """最近的 OK 延迟样本(秒), 不支持的后端返回空列表"""
+        return []
+
+
+def create_backend(relay_urls: List[str], name: str = None) -> NostrBackend:
+    name = name or Config.NOSTR_BACKEND
+    if name == 'asyncio':
+        from app.services.nostr_publisher import AsyncNostrPublisher
+        return AsyncNostrPublisher(relay_urls)
+    if name == 'pynostr':
+        from app.services.pynostr_backend import PynostrBackend
+        return PynostrBackend(relay_urls)
+    raise ValueError(f"Unknown Nostr backend: {name}")
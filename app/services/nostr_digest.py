@@ -0,0 +1,141 @@
+import hashlib
+import json
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+from app.models.models import Interaction
+from config.config import Config
+
+# 汇总块中每行的字段顺序
+DIGEST_FIELDS = ['message_id', 'type', 'user_id', 'username', 'created_at', 'content',
+                 'ref_channel_id', 'ref_message_id', 'reaction']
+
+
+@dataclass
+class DigestChunk:
+    """一个汇总块: 未签名事件及其包含的互动"""
+    chunk_hash: str
+    event: Dict[str, Any]
+    interaction_ids: List[int] = field(default_factory=list)
+
+
+class DigestBuilder:
+    """
+    按频道和时间窗口汇总互动, 生成 NIP-33 参数化可替换事件 (kind 30000-39999, 用 d 标签区分)
+
+    - 汇总块: 窗口内的互动按内容切分成若干块, 每块一个事件, d 标签带块内容的 sha256, 同样的内容
+      总是得到同一个事件 (重试不会产生新事件); 切分点由每行内容的哈希决定 (内容定义分块), 前面增删
+      几行不会改变后面块的边界, 每块的行数据不超过 NOSTR_DIGEST_CHUNK_BYTES
+    - 窗口索引: d 标签为 discord-digest:<频道ID>:<窗口开始>, 用 e 标签列出窗口内所有汇总块,
+      同一窗口有新块时重新发布, 中继只保留最新版本
+    """
+
+    def __init__(self, window_seconds: int = None, chunk_bytes: int = None, kind: int = None):
+        self.window_seconds = window_seconds or Config.NOSTR_DIGEST_WINDOW_SECONDS
+        self.chunk_bytes = chunk_bytes or Config.NOSTR_DIGEST_CHUNK_BYTES
+        self.kind = kind or Config.NOSTR_DIGEST_KIND
+
+    @staticmethod
+    def _epoch(value: datetime) -> int:
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+
+    @staticmethod
+    def _encode(value: Any) -> str:
+        return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+    def window_start(self, interaction: Interaction) -> int:
+        created_at = self._epoch(interaction.interaction_time)
+        return created_at - created_at % self.window_seconds
+
+    def _row(self, interaction: Interaction) -> List:
+        return [
+            str(interaction.message_id),
+            int(interaction.type),
+            str(interaction.user_id),
+            interaction.username or '',
+            self._epoch(interaction.interaction_time),
+            interaction.interaction_content or '',
+            str(interaction.ref_channel_id) if interaction.ref_channel_id else '',
+            str(interaction.ref_message_id) if interaction.ref_message_id else '',
+            interaction.reaction_emoji or ''
+        ]
+
+    def _is_boundary(self, encoded_row: str) -> bool:
+        """按行内容哈希决定是否在该行后切分, 平均块大小约为 chunk_bytes 的一半"""
+        digest = int.from_bytes(hashlib.sha256(encoded_row.encode()).digest()[:4], 'big')
+        return digest < len(encoded_row.encode()) * 2 * (1 << 32) // self.chunk_bytes
+
+    def _chunk_event(self, channel_id: int, window_start: int, rows: List[Tuple[str, List]]) -> Tuple[str, Dict]:
+        content = '{"fields":%s,"rows":[%s]}' % (self._encode(DIGEST_FIELDS), ','.join(row for row, _ in rows))
+        chunk_hash = hashlib.sha256(content.encode()).hexdigest()
+        return chunk_hash, {
+            'content': content,
+            'kind': self.kind,
+            'tags': [
+                ['d', f'discord-digest:{channel_id}:{window_start}:{chunk_hash}'],
+                ['t', 'discord'],
+                ['channel_id', str(channel_id)],
+                ['window', str(window_start), str(window_start + self.window_seconds)],
+                ['x', chunk_hash]
+            ],
+            # 取块内最晚的互动时间, 内容相同时事件ID相同
+            'created_at': max(row[4] for _, row in rows)
+        }
+
+    def build_chunks(self, interactions: List[Interaction]) -> Dict[Tuple[int, int], List[DigestChunk]]:
+        """
+        Returns:
+            {(channel_id, 窗口开始): [汇总块]}
+        """
+        windows = defaultdict(list)
+        for interaction in interactions:
+            windows[(interaction.channel_id, self.window_start(interaction))].append(interaction)
+
+        result = {}
+        for (channel_id, window_start), members in windows.items():
+            rows = sorted(((self._row(interaction), interaction.interaction_id) for interaction in members),
+                          key=lambda item: (item[0][4], item[0][0], item[0][1], item[0][2], item[0][8]))
+            chunks = []
+            current: List[Tuple[str, List]] = []
+            current_ids: List[int] = []
+            size = 0
+            for row, interaction_id in rows:
+                encoded = self._encode(row)
+                if current and size + len(encoded.encode()) + 1 > self.chunk_bytes:
+                    chunks.append((current, current_ids))
+                    current, current_ids, size = [], [], 0
+                current.append((encoded, row))
+                current_ids.append(interaction_id)
+                size += len(encoded.encode()) + 1
+                if self._is_boundary(encoded):
+                    chunks.append((current, current_ids))
+                    current, current_ids, size = [], [], 0
+            if current:
+                chunks.append((current, current_ids))
+
+            result[(channel_id, window_start)] = [
+                DigestChunk(*self._chunk_event(channel_id, window_start, chunk_rows), interaction_ids=chunk_ids)
+                for chunk_rows, chunk_ids in chunks
+            ]
+        return result
+
+    def build_index(self, channel_id: int, window_start: int, chunk_event_ids: List[str],
+                    created_at: int) -> Dict[str, Any]:
+        """窗口索引事件, created_at 需要比上一版本新, 中继才会替换"""
+        tags = [
+            ['d', f'discord-digest:{channel_id}:{window_start}'],
+            ['t', 'discord'],
+            ['channel_id', str(channel_id)],
+            ['window', str(window_start), str(window_start + self.window_seconds)]
+        ]
+        tags.extend(['e', event_id] for event_id in sorted(set(chunk_event_ids)))
+        return {
+            'content': '',
+            'kind': self.kind,
+            'tags': tags,
+            'created_at': created_at
+        }
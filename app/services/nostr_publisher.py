@@ -0,0 +1,579 @@
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from collections import Counter, defaultdict, deque
+from typing import Dict, List, Optional, Set, Tuple
+
+import aiohttp
+
+from app.services.nostr_backend import NostrBackend, PublishResult
+from config.config import Config
+
+log = logging.getLogger(__name__)
+
+# NIP-01 中继限流时 OK 消息使用的前缀
+RATE_LIMITED = 'rate-limited'
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """带抖动的指数退避: 在 [d/2, d] 内随机取值, d = min(cap, base * 2^attempt)"""
+    delay = min(cap, base * (2 ** min(attempt, 32)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class RelayHealth:
+    """单个中继的健康状态: 连接状态、滚动 OK 延迟、拒绝原因统计和重连退避"""
+
+    CONNECTED = 'connected'
+    DEGRADED = 'degraded'
+    DOWN = 'down'
+
+    def __init__(self, url: str, latency_window: int = None, degraded_latency: float = None):
+        self.url = url
+        self.degraded_latency = degraded_latency or Config.NOSTR_RELAY_DEGRADED_LATENCY
+        self.latencies = deque(maxlen=latency_window or Config.NOSTR_RELAY_LATENCY_WINDOW)
+        self.rejections = Counter()
+        self.connected = False
+        self.connect_failures = 0
+        self.consecutive_timeouts = 0
+        self.retry_at = 0.0
+        self.last_error = ''
+        self.state = self.DOWN
+
+    def _update_state(self) -> None:
+        if not self.connected:
+            state = self.DOWN
+        elif self.consecutive_timeouts or self.latency_avg > self.degraded_latency:
+            state = self.DEGRADED
+        else:
+            state = self.CONNECTED
+        if state != self.state:
+            log.warning(f"Relay {self.url} state {self.state} -> {state}"
+                        + (f" ({self.last_error})" if self.last_error else ''))
+            self.state = state
+
+    @property
+    def latency_avg(self) -> float:
+        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    @property
+    def latency_p95(self) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def can_attempt(self) -> bool:
+        """断开的中继在退避时间内不再尝试, 避免每个事件都重连一次"""
+        return self.connected or time.monotonic() >= self.retry_at
+
+    def record_connected(self) -> None:
+        self.connected = True
+        self.connect_failures = 0
+        self.last_error = ''
+        self._update_state()
+
+    def record_disconnected(self, reason: str) -> None:
+        self.connected = False
+        self.last_error = reason
+        self._update_state()
+
+    def record_connect_failure(self, reason: str) -> None:
+        self.connected = False
+        self.last_error = reason
+        self.retry_at = time.monotonic() + backoff_delay(
+            self.connect_failures, Config.NOSTR_RELAY_BACKOFF_BASE, Config.NOSTR_RELAY_BACKOFF_MAX
+        )
+        self.connect_failures += 1
+        self._update_state()
+
+    def record_ok(self, latency: float, result: PublishResult) -> None:
+        self.latencies.append(latency)
+        self.consecutive_timeouts = 0
+        if not result.accepted:
+            self.rejections[result.message.split(':', 1)[0].strip() or 'unknown'] += 1
+        self._update_state()
+
+    def record_timeout(self) -> None:
+        self.consecutive_timeouts += 1
+        self._update_state()
+
+    def snapshot(self) -> Dict:
+        return {
+            'url': self.url,
+            'state': self.state,
+            'latency_avg': round(self.latency_avg, 3),
+            'latency_p95': round(self.latency_p95, 3),
+            'rejections': dict(self.rejections),
+            'connect_failures': self.connect_failures,
+            'last_error': self.last_error
+        }
+
+
+def is_rate_limit_notice(message: str) -> bool:
+    text = message.lower()
+    return text.startswith(RATE_LIMITED) or ('rate' in text and 'limit' in text) or 'too many' in text or 'slow down' in text
+
+
+class RateMeter:
+    """按秒统计的事件速率"""
+
+    def __init__(self):
+        self._count = 0
+        self._start = time.monotonic()
+        self._last_rate = 0.0
+
+    def add(self, now: float = None) -> None:
+        now = now or time.monotonic()
+        self._count += 1
+        elapsed = now - self._start
+        if elapsed >= 1:
+            self._last_rate = self._count / elapsed
+            self._count, self._start = 0, now
+
+    @property
+    def rate(self) -> float:
+        """上一个完整秒的速率; 当前这一秒已超过 0.2 秒时取两者较大值"""
+        elapsed = time.monotonic() - self._start
+        current = self._count / elapsed if elapsed >= 0.2 else 0.0
+        return max(self._last_rate, current)
+
+
+class TokenBucket:
+    """令牌桶, rate <= 0 表示不限速; 等待按 FIFO 顺序"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.sent = RateMeter()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate: float) -> None:
+        now = time.monotonic()
+        if self.rate > 0:
+            self._refill(now)
+        else:
+            self.tokens, self.updated = min(self.tokens, self.burst), now
+        self.rate = rate
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            self.sent.add()
+            return
+        async with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                now = time.monotonic()
+                self._refill(now)
+            self.tokens -= 1
+            self.sent.add(now)
+
+
+class AimdController:
+    """
+    单个中继的发送速率控制: 在途窗口 + 令牌桶, 按 AIMD 调整
+
+    - 窗口: 慢启动阶段每个 OK 加 1, 之后每个窗口的 OK 加 1; OK 延迟超过目标值、超时或断开时减半
+    - 速率: 默认不限, 中继回 "rate-limited:" 或限流 NOTICE 时降到 min(发送速率的一半, 中继实际接受速率的 0.8),
+      之后每秒加 NOSTR_RELAY_RATE_INCREASE, 直到再次被限流
+    同一批在途事件会连续收到限流回复, 减小操作之间至少间隔 decrease_interval 秒, 避免一次限流被重复计算.
+    """
+
+    decrease_interval = 1.0
+
+    def __init__(self, max_window: int, initial_window: int = None, min_window: int = None,
+                 target_latency: float = None, max_rate: float = None):
+        self.max_window = max_window
+        self.min_window = min(min_window or Config.NOSTR_PUBLISH_MIN_WINDOW, max_window)
+        initial = initial_window or Config.NOSTR_PUBLISH_INITIAL_WINDOW
+        self.window = float(max(self.min_window, min(initial, max_window)))
+        self.ssthresh = float(max_window)
+        self.target_latency = target_latency or Config.NOSTR_RELAY_TARGET_LATENCY
+        self.max_rate = Config.NOSTR_RELAY_MAX_RATE if max_rate is None else max_rate
+        self.bucket = TokenBucket(self.max_rate, burst=max(1, self.min_window))
+        self.in_flight = 0
+        self.rate_limited = 0
+        self.accepted = RateMeter()
+        self._waiters = deque()
+        self._last_decrease = 0.0
+
+    async def acquire(self) -> None:
+        if self.in_flight >= int(self.window) or self._waiters:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future in self._waiters:
+                    self._waiters.remove(future)
+                else:
+                    # 已被唤醒但没有使用名额, 交给下一个等待者
+                    self.in_flight -= 1
+                    self._wake()
+                raise
+        else:
+            self.in_flight += 1
+        try:
+            await self.bucket.acquire()
+        except BaseException:
+            self.release()
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.window):
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def _decrease(self, factor: float) -> bool:
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_interval:
+            return False
+        self._last_decrease = now
+        self.window = max(float(self.min_window), self.window * factor)
+        self.ssthresh = self.window
+        return True
+
+    def on_ok(self, latency: float) -> None:
+        self.accepted.add()
+        if latency > self.target_latency:
+            self._decrease(0.5)
+            return
+        if self.window < self.ssthresh:
+            self.window = min(float(self.max_window), self.window + 1)
+        else:
+            self.window = min(float(self.max_window), self.window + 1 / self.window)
+        if self.bucket.rate > 0:
+            rate = self.bucket.rate + Config.NOSTR_RELAY_RATE_INCREASE / self.bucket.rate
+            self.bucket.rate = min(self.max_rate, rate) if self.max_rate > 0 else rate
+        self._wake()
+
+    def on_congestion(self) -> None:
+        """超时或连接断开"""
+        self._decrease(0.5)
+
+    def on_rate_limited(self) -> bool:
+        """返回本次是否实际降速"""
+        self.rate_limited += 1
+        if not self._decrease(0.5):
+            return False
+        sent = self.bucket.sent.rate or self.bucket.rate or self.window
+        rate = sent * 0.5
+        if self.accepted.rate:
+            rate = min(rate, self.accepted.rate * 0.8)
+        self.bucket.set_rate(max(Config.NOSTR_RELAY_MIN_RATE, rate))
+        return True
+
+    def snapshot(self) -> Dict:
+        return {
+            'window': int(self.window),
+            'in_flight': self.in_flight,
+            'rate': round(self.bucket.rate, 1) if self.bucket.rate > 0 else None,
+            'rate_limited': self.rate_limited
+        }
+
+
+class RelayConnection:
+    """
+    与单个中继保持一条持久 websocket 连接
+
+    多个事件在窗口内连续发送 EVENT 帧, 不等待前一个的 OK; 读协程按事件ID将收到的 OK
+    关联回等待中的发送方.
+    """
+
+    def __init__(self, url: str, session: aiohttp.ClientSession, window: int,
+                 ok_timeout: float, connect_timeout: float):
+        self.url = url
+        self.session = session
+        self.ok_timeout = ok_timeout
+        self.connect_timeout = connect_timeout
+        self.health = RelayHealth(url)
+        self.control = AimdController(window)
+        # 窗口满后排队的事件数上限, 超出的事件直接跳过该中继, 慢中继不会无限堆积
+        self.max_backlog = window * 2
+        self.backlog = 0
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._subscriptions: Dict[str, asyncio.Queue] = {}
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
+
+    @property
+    def is_connected(self) -> bool:
+        return self._ws is not None and not self._ws.closed
+
+    def accepting(self) -> bool:
+        return self.health.can_attempt() and self.backlog < self.max_backlog
+
+    async def connect(self) -> None:
+        async with self._connect_lock:
+            if self.is_connected:
+                return
+            if not self.health.can_attempt():
+                raise ConnectionError(f"relay down, retry later: {self.health.last_error}")
+            try:
+                # 握手超时由会话的 ClientTimeout(connect=...) 控制
+                self._ws = await self.session.ws_connect(self.url, heartbeat=30, max_msg_size=0)
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                self.health.record_connect_failure(f"connect failed: {str(e) or type(e).__name__}")
+                raise ConnectionError(self.health.last_error) from e
+            self._reader_task = asyncio.create_task(self._read_loop(self._ws))
+            self.health.record_connected()
+            log.info(f"Connected to relay {self.url}")
+
+    async def close(self) -> None:
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader_task is not None:
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+
+    async def _read_loop(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        try:
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    self._handle_message(msg.data)
+                elif msg.type == aiohttp.WSMsgType.ERROR:
+                    log.warning(f"Relay {self.url} websocket error: {ws.exception()}")
+                    break
+        finally:
+            self.health.record_disconnected('connection closed')
+            self._fail_pending('connection closed')
+            for queue in self._subscriptions.values():
+                queue.put_nowait(ConnectionError('connection closed'))
+
+    def _handle_message(self, data: str) -> None:
+        try:
+            message = json.loads(data)
+        except ValueError:
+            log.warning(f"Invalid message from relay {self.url}: {data[:200]}")
+            return
+        if not isinstance(message, list) or not message:
+            return
+
+        if message[0] == 'OK' and len(message) >= 3:
+            future = self._pending.pop(message[1], None)
+            if future is not None and not future.done():
+                future.set_result(PublishResult(
+                    event_id=message[1],
+                    relay_url=self.url,
+                    accepted=bool(message[2]),
+                    message=message[3] if len(message) > 3 else ''
+                ))
+        elif message[0] == 'EVENT' and len(message) >= 3:
+            queue = self._subscriptions.get(message[1])
+            if queue is not None:
+                queue.put_nowait(message[2])
+        elif message[0] in ('EOSE', 'CLOSED') and len(message) >= 2:
+            queue = self._subscriptions.get(message[1])
+            if queue is not None:
+                queue.put_nowait(None)
+        elif message[0] == 'NOTICE' and len(message) >= 2:
+            log.info(f"Notice from relay {self.url}: {message[1]}")
+            if isinstance(message[1], str) and is_rate_limit_notice(message[1]):
+                self._on_rate_limited()
+
+    def _on_rate_limited(self) -> None:
+        if self.control.on_rate_limited():
+            log.warning(f"Relay {self.url} rate limited, window -> {int(self.control.window)}, "
+                        f"rate -> {self.control.bucket.rate:.0f}/s")
+
+    def _fail_pending(self, reason: str) -> None:
+        pending, self._pending = self._pending, {}
+        for event_id, future in pending.items():
+            if not future.done():
+                future.set_result(PublishResult(event_id, self.url, False, reason))
+
+    async def query(self, filters: Dict, timeout: float) -> List[Dict]:
+        """发送 REQ 并收集 EOSE 之前返回的所有事件 (存量数据), 完成后 CLOSE 订阅"""
+        await self.connect()
+        subscription_id = uuid.uuid4().hex
+        queue = asyncio.Queue()
+        self._subscriptions[subscription_id] = queue
+        try:
+            await self._ws.send_str(json.dumps(['REQ', subscription_id, filters]))
+            events = []
+            while True:
+                item = await asyncio.wait_for(queue.get(), timeout)
+                if item is None:
+                    return events
+                if isinstance(item, Exception):
+                    raise item
+                events.append(item)
+        finally:
+            self._subscriptions.pop(subscription_id, None)
+            if self.is_connected:
+                await self._ws.send_str(json.dumps(['CLOSE', subscription_id]))
+
+    async def publish(self, event_id: str, frame: str) -> PublishResult:
+        """发送一个 EVENT 帧并等待对应的 OK"""
+        self.backlog += 1
+        try:
+            await self.control.acquire()
+            try:
+                await self.connect()
+                future = asyncio.get_running_loop().create_future()
+                self._pending[event_id] = future
+                sent_at = time.monotonic()
+                await self._ws.send_str(frame)
+                result = await asyncio.wait_for(future, self.ok_timeout)
+                latency = time.monotonic() - sent_at
+                if result.message == 'connection closed':
+                    self.control.on_congestion()
+                else:
+                    self.health.record_ok(latency, result)
+                    if not result.accepted and result.message.startswith(RATE_LIMITED):
+                        self._on_rate_limited()
+                    else:
+                        self.control.on_ok(latency)
+                return result
+            except asyncio.TimeoutError:
+                self._pending.pop(event_id, None)
+                self.health.record_timeout()
+                self.control.on_congestion()
+                return PublishResult(event_id, self.url, False, 'timeout')
+            except (aiohttp.ClientError, ConnectionError, RuntimeError) as e:
+                self._pending.pop(event_id, None)
+                return PublishResult(event_id, self.url, False, f"error: {str(e)}")
+            finally:
+                self.control.release()
+        finally:
+            self.backlog -= 1
+
+
+class AsyncNostrPublisher(NostrBackend):
+    """
+    asyncio 多中继发布器, 每个中继一条持久连接, 事件以流水线方式发送
+
+    一个事件只要有一个中继确认就立即返回, 其余中继的发送在后台继续完成, 慢中继不会拖住
+    整批发布; 断开的中继按退避时间重连, 期间直接跳过.
+    """
+
+    name = 'asyncio'
+
+    def __init__(self, relay_urls: List[str], window: int = None,
+                 ok_timeout: float = None, connect_timeout: float = None):
+        super().__init__(relay_urls)
+        self.window = window or Config.NOSTR_PUBLISH_WINDOW
+        self.ok_timeout = ok_timeout or Config.NOSTR_OK_TIMEOUT
+        self.connect_timeout = connect_timeout or Config.NOSTR_CONNECT_TIMEOUT
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._background: Set[asyncio.Task] = set()
+        # 后台等待的中继在发布返回后才回的确认, 由 pop_late_results 取出
+        self._late_results: List[PublishResult] = []
+        self.connections: List[RelayConnection] = []
+
+    async def start(self) -> None:
+        """在当前事件循环中创建会话和中继连接对象 (连接在首次发送时建立)"""
+        if self._session is not None:
+            return
+        self._session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=self.connect_timeout, connect=self.connect_timeout)
+        )
+        self.connections = [
+            RelayConnection(url, self._session, self.window, self.ok_timeout, self.connect_timeout)
+            for url in self.relay_urls
+        ]
+
+    async def close(self) -> None:
+        for task in self._background:
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        await asyncio.gather(*(connection.close() for connection in self.connections),
+                             return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+        self._session = None
+        self.connections = []
+
+    def relay_health(self) -> List[Dict]:
+        return [{**connection.health.snapshot(), **connection.control.snapshot()} for connection in self.connections]
+
+    def ok_latencies(self) -> List[float]:
+        return [latency for connection in self.connections for latency in connection.health.latencies]
+
+    async def query(self, filters: Dict, timeout: float = None) -> List[Dict]:
+        """向所有可用中继发送同一个 REQ, 按事件ID合并结果; 单个中继失败只记录日志"""
+        await self.start()
+        connections = [connection for connection in self.connections if connection.health.can_attempt()]
+        results = await asyncio.gather(*(
+            connection.query(filters, timeout or self.ok_timeout) for connection in connections
+        ), return_exceptions=True)
+
+        if not any(isinstance(result, list) for result in results):
+            raise ConnectionError('no relay answered the query')
+
+        merged = {}
+        for connection, result in zip(connections, results):
+            if isinstance(result, BaseException):
+                log.warning(f"Query to relay {connection.url} failed: {str(result) or type(result).__name__}")
+                continue
+            for event in result:
+                merged.setdefault(event.get('id'), event)
+        return list(merged.values())
+
+    async def _publish_one(self, event_id: str, frame: str) -> List[PublishResult]:
+        results = []
+        tasks = set()
+        for connection in self.connections:
+            if connection.accepting():
+                tasks.add(asyncio.ensure_future(connection.publish(event_id, frame)))
+            else:
+                results.append(PublishResult(event_id, connection.url, False,
+                                             f"skipped: relay {connection.health.state}"))
+
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            results.extend(task.result() for task in done)
+            if any(result.accepted for result in results):
+                break
+
+        # 已有中继确认, 其余中继的 OK 在后台等待, 晚到的确认暂存后另行写入投递记录
+        for task in tasks:
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            task.add_done_callback(self._collect_late_result)
+        return results
+
+    def _collect_late_result(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is None and task.result().accepted:
+            self._late_results.append(task.result())
+
+    def pop_late_results(self) -> List[PublishResult]:
+        results, self._late_results = self._late_results, []
+        return results
+
+    async def publish_events(self, events: List[Tuple[str, str]]) -> Dict[str, List[PublishResult]]:
+        """
+        将一批事件发送到所有中继
+
+        Args:
+            events: [(事件ID, EVENT 帧)]
+
+        Returns:
+            {事件ID: [已返回的各中继发布结果]}
+        """
+        await self.start()
+        results = await asyncio.gather(*(
+            self._publish_one(event_id, frame) for event_id, frame in events
+        ))
+
+        grouped = defaultdict(list)
+        for (event_id, _), relay_results in zip(events, results):
+            grouped[event_id].extend(relay_results)
+        return grouped
@@ -0,0 +1,49 @@
+import json
+from hashlib import sha256
+from typing import List, Tuple
+
+import coincurve
+
+# NIP-01 规定的序列化方式: 无多余空白, 非 ASCII 字符原样输出 (UTF-8)
+_encode = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+
+
+class EventSerializer:
+    """
+    NIP-01 事件的精简序列化和签名
+
+    私钥和公钥只解析一次; tags 和 content 各编码一次, 同时用于计算事件ID的 preimage 和
+    发送的 EVENT 帧, 不经过 pynostr 的 Event 对象 (后者每次签名都会重新推导公钥并编码两遍).
+    事件ID与 pynostr 逐字节一致.
+    """
+
+    def __init__(self, private_key_hex: str):
+        self._private_key = coincurve.PrivateKey(bytes.fromhex(private_key_hex))
+        self.pubkey = self._private_key.public_key_xonly.format().hex()
+        self._preimage_prefix = f'[0,"{self.pubkey}",'
+
+    def serialize(self, created_at: int, kind: int, tags: List[List[str]], content: str) -> Tuple[bytes, str, str]:
+        """
+        Returns:
+            (事件ID preimage, tags JSON, content JSON)
+        """
+        tags_json = _encode(tags)
+        content_json = _encode(content)
+        preimage = f'{self._preimage_prefix}{created_at},{kind},{tags_json},{content_json}]'.encode()
+        return preimage, tags_json, content_json
+
+    def compute_id(self, created_at: int, kind: int, tags: List[List[str]], content: str) -> str:
+        return sha256(self.serialize(created_at, kind, tags, content)[0]).hexdigest()
+
+    def sign(self, created_at: int, kind: int, tags: List[List[str]], content: str) -> Tuple[str, str]:
+        """
+        Returns:
+            (事件ID, 可直接发送的 EVENT 帧)
+        """
+        preimage, tags_json, content_json = self.serialize(created_at, kind, tags, content)
+        digest = sha256(preimage).digest()
+        event_id = digest.hex()
+        sig = self._private_key.sign_schnorr(digest).hex()
+        frame = (f'["EVENT",{{"id":"{event_id}","pubkey":"{self.pubkey}","created_at":{created_at},'
+                 f'"kind":{kind},"tags":{tags_json},"content":{content_json},"sig":"{sig}"}}]')
+        return event_id, frame
@@ -0,0 +1,95 @@
+import asyncio
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.nostr_serializer import EventSerializer
+from config.config import Config
+
+# 子进程内的序列化器, 由进程池 initializer 创建, 私钥只传输和解析一次
+_worker_serializer: Optional[EventSerializer] = None
+
+
+def _init_worker(private_key_hex: str) -> None:
+    global _worker_serializer
+    _worker_serializer = EventSerializer(private_key_hex)
+
+
+def sign_events(unsigned_events: List[Dict[str, Any]], serializer: EventSerializer) -> List[Tuple[str, str]]:
+    """
+    计算事件ID并签名
+
+    Args:
+        unsigned_events: [{'content', 'kind', 'tags', 'created_at'}]
+
+    Returns:
+        [(事件ID, 可直接发送的 EVENT 帧)], 与输入顺序一致
+    """
+    return [
+        serializer.sign(data['created_at'], data['kind'], data['tags'], data['content'])
+        for data in unsigned_events
+    ]
+
+
+def _sign_in_worker(unsigned_events: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    return sign_events(unsigned_events, _worker_serializer)
+
+
+class BatchSigner:
+    """
+    批量签名器
+
+    secp256k1 签名和 sha256 计算是 CPU 密集型操作, 流水线发布后会成为瓶颈; 这里将一批事件
+    切分后分发到进程池并行签名. workers 为 0 时在当前进程内签名.
+    """
+
+    def __init__(self, private_key_hex: str, workers: int = None, min_chunk_size: int = None):
+        self.private_key_hex = private_key_hex
+        self.serializer = EventSerializer(private_key_hex)
+        self.workers = Config.NOSTR_SIGN_WORKERS if workers is None else workers
+        self.min_chunk_size = min_chunk_size or Config.NOSTR_SIGN_MIN_CHUNK_SIZE
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: 调用方进程中运行着事件循环和数据库连接, 不适合 fork
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.private_key_hex,)
+            )
+        return self._executor
+
+    def _split(self, unsigned_events: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        chunk_size = max(self.min_chunk_size, math.ceil(len(unsigned_events) / self.workers))
+        return [unsigned_events[start:start + chunk_size]
+                for start in range(0, len(unsigned_events), chunk_size)]
+
+    def sign_batch(self, unsigned_events: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        if self.workers <= 0 or len(unsigned_events) <= self.min_chunk_size:
+            return sign_events(unsigned_events, self.serializer)
+
+        signed = []
+        for chunk in self._get_executor().map(_sign_in_worker, self._split(unsigned_events)):
+            signed.extend(chunk)
+        return signed
+
+    async def sign_batch_async(self, unsigned_events: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        """在进程池中签名, 不阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        if self.workers <= 0 or len(unsigned_events) <= self.min_chunk_size:
+            return await loop.run_in_executor(None, sign_events, unsigned_events, self.serializer)
+
+        executor = self._get_executor()
+        chunks = await asyncio.gather(*(
+            loop.run_in_executor(executor, _sign_in_worker, chunk)
+            for chunk in self._split(unsigned_events)
+        ))
+        return [item for chunk in chunks for item in chunk]
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
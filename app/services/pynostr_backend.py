@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from pynostr.filters import Filters, FiltersList
+from pynostr.message_pool import MessagePool
+from pynostr.relay_manager import RelayManager
+
+from app.services.nostr_backend import NostrBackend, PublishResult
+from config.config import Config
+
+log = logging.getLogger(__name__)
+
+
+class PynostrBackend(NostrBackend):
+    """
+    基于 pynostr RelayManager 的后端
+
+    RelayManager 依赖 tornado IOLoop 且 run_sync 是阻塞的, 每批在线程中新建 RelayManager 连接所有中继,
+    发送完 EVENT 后追加一个 close_on_eose 订阅: pynostr 按 "发一条、读一条" 的节奏收发, 收到 EOSE 即说明
+    之前的 EVENT 都已处理, 随后关闭连接. 整批受 NOSTR_OK_TIMEOUT 加每个事件的等待时间约束, 不会卡死.
+    """
+
+    name = 'pynostr'
+
+    def __init__(self, relay_urls: List[str], ok_timeout: float = None, connect_timeout: float = None):
+        super().__init__(relay_urls)
+        self.ok_timeout = ok_timeout or Config.NOSTR_OK_TIMEOUT
+        self.connect_timeout = connect_timeout or Config.NOSTR_CONNECT_TIMEOUT
+
+    async def close(self) -> None:
+        pass
+
+    def _run(self, frames: List[str], filters: FiltersList, timeout: float) -> MessagePool:
+        # RelayManager 取 IOLoop.current(), 工作线程会被复用, 每批换一个新的事件循环 (上一批的已关闭)
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        relay_manager = RelayManager(timeout=self.connect_timeout)
+        for url in self.relay_urls:
+            relay_manager.add_relay(url, close_on_eose=True)
+        for frame in frames:
+            relay_manager.publish_message(frame)
+        relay_manager.add_subscription_on_all_relays(uuid.uuid4().hex, filters)
+        try:
+            relay_manager.io_loop.run_sync(relay_manager.prepare_relays, timeout=timeout)
+        except TimeoutError:
+            log.warning(f"pynostr relay round timed out after {timeout:.1f}s")
+        finally:
+            relay_manager.close_all_relay_connections()
+            relay_manager.io_loop.close()
+        return relay_manager.message_pool
+
+    def _publish_sync(self, events: List[Tuple[str, str]]) -> Dict[str, List[PublishResult]]:
+        timeout = self.ok_timeout + self.connect_timeout + len(events) * 0.05
+        pool = self._run([frame for _, frame in events], FiltersList([Filters(limit=0)]), timeout)
+
+        grouped = defaultdict(list)
+        while pool.has_ok_notices():
+            ok = pool.get_ok_notice()
+            grouped[ok.event_id].append(PublishResult(ok.event_id, ok.url, bool(ok.ok), ok.message or ''))
+        for event_id, _ in events:
+            replied = {result.relay_url for result in grouped[event_id]}
+            for url in self.relay_urls:
+                if url not in replied:
+                    grouped[event_id].append(PublishResult(event_id, url, False, 'timeout'))
+        return grouped
+
+    def _query_sync(self, filters: Dict, timeout: float) -> List[Dict]:
+        pool = self._run([], FiltersList([Filters(**filters)]), timeout)
+        events = {}
+        while pool.has_events():
+            event = pool.get_event().event
+            events.setdefault(event.id, event.to_dict())
+        return list(events.values())
+
+    async def publish_events(self, events: List[Tuple[str, str]]) -> Dict[str, List[PublishResult]]:
+        if not events:
+            return {}
+        return await asyncio.to_thread(self._publish_sync, events)
+
+    async def query(self, filters: Dict, timeout: float = None) -> List[Dict]:
+        return await asyncio.to_thread(self._query_sync, filters, timeout or self.ok_timeout + self.connect_timeout)
@@ -1,75 +1,454 @@
-import json
+import asyncio
 import logging
+import os
+import socket
+import time
 import urllib.parse
 import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
 
-from pynostr.event import Event
+from pynostr.event import Event, EventKind
 from pynostr.filters import FiltersList, Filters
 from pynostr.key import PrivateKey
 from pynostr.relay_manager import RelayManager
+from sqlalchemy.orm import Session
 
+from app.models.database import SessionLocal
 from app.models.models import Interaction, InteractionType
 from app.services.database_service import DatabaseService
+from app.services.nostr_backend import NostrBackend, PublishResult, create_backend
+from app.services.nostr_digest import DigestBuilder
+from app.services.nostr_signer import BatchSigner
+from config.config import Config
+from utils.helpers import LRUCache
 
 log = logging.getLogger(__name__)
 
 
 class NostrSync:
 
-    def __init__(self, relay_url, private_key: str):
+    def __init__(self, relay_url, private_key: str, backend: NostrBackend = None):
         if not relay_url:
             raise ValueError("Relay URL is required")
 
-        self.relay_manager = RelayManager(timeout=6)
         for relay in relay_url:
             # 需要将relay进行url解析， 看是否是wss的还是ws的
             parsed_url = urllib.parse.urlparse(relay)
             if parsed_url.scheme not in ['ws', 'wss']:
                 raise ValueError(f"Invalid relay URL scheme: {parsed_url.scheme}")
-            self.relay_manager.add_relay(relay, close_on_eose=False)
+        # 发布和对账查询都通过 NostrBackend, 默认按 Config.NOSTR_BACKEND 创建
+        self.publisher = backend or create_backend(relay_url)
 
         private_pair = PrivateKey.from_nsec(private_key)
         self.private_pair = private_pair
-        filters = FiltersList([Filters(authors=[private_pair.public_key.hex()], limit=100)])
-        subscription_id = uuid.uuid1().hex
-        self.relay_manager.add_subscription_on_all_relays(subscription_id, filters)
+        self.signer = BatchSigner(private_pair.hex())
+        self.pubkey = private_pair.public_key.hex()
 
         self.db_service = DatabaseService()
+        # outbox 租约持有者标识, 多个发布进程各自唯一
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        # 已发送等待确认的 event_id -> [interaction_id]
+        self.pending_events: Dict[str, List[int]] = {}
+        # 已确认尚未写库的 interaction_id -> event_id
+        self.ack_buffer: Dict[int, str] = {}
+        # 已确认尚未写库的 (interaction_id, relay_url) -> event_id, 只包含发布返回前已回 OK 的中继
+        self.delivery_buffer: Dict[Tuple[int, str], str] = {}
+        # 发布返回后才回 OK 的中继, 尚未写库的 (interaction_id, relay_url) -> event_id, 下次 flush_acks 写入
+        self.late_deliveries: Dict[Tuple[int, str], str] = {}
+        # 仍有中继在后台等待 OK 的 event_id -> [interaction_id], 用于归属晚到的确认
+        self.awaiting_events = LRUCache(Config.NOSTR_SIGNED_CACHE_SIZE)
+        # (channel_id, message_id) -> event_id, 转发/回复/点赞引用的父消息
+        self.ref_event_ids = LRUCache(Config.NOSTR_REF_CACHE_SIZE)
+        # 已签名的 (事件ID, EVENT 帧), 重试和补发时直接复用, 每个事件只签名一次
+        self.signed_events = LRUCache(Config.NOSTR_SIGNED_CACHE_SIZE)
+        self.sign_stats = Counter()
+        # 汇总频道 (Config.NOSTR_DIGEST_CHANNELS) 的互动按窗口汇总发布
+        self.digest_builder = DigestBuilder()
+        # (channel_id, 窗口开始) -> (已发布的汇总块事件ID集合, 最近一次索引的 created_at)
+        self.digest_windows = LRUCache(Config.NOSTR_REF_CACHE_SIZE)
 
-    def sync_interactions(self, interactions):
-        for interaction in interactions:
-            event = self.create_nostr_event(interaction)
-            self.relay_manager.publish_event(event)
-            self.relay_manager.run_sync()
+    async def publish_outbox(self, batch_size: int = None) -> int:
+        """
+        从 outbox 中按顺序分批领取待发布的互动并发布到 Nostr
+
+        发布确认的记录从 outbox 删除, 失败的记录释放租约并延迟重试. 数据库操作都放到线程中执行,
+        不阻塞同一事件循环中的采集任务.
+
+        Returns:
+            确认发布的互动数
+        """
+        batch_size = batch_size or Config.NOSTR_PUBLISH_BATCH_SIZE
+        published = 0
+        # 领取的互动记录在提交后仍要读取, 不能在提交时过期 (否则会在事件循环线程中懒加载)
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            while True:
+                interactions = await asyncio.to_thread(
+                    self.db_service.claim_outbox_batch,
+                    db, self.worker_id, batch_size, Config.NOSTR_OUTBOX_LEASE_SECONDS
+                )
+                if not interactions:
+                    break
+
+                confirmed, rejected = await self.sync_interactions(db, interactions)
+                failures = {}
+                permanent = []
+                for interaction in interactions:
+                    if interaction.interaction_id in confirmed:
+                        continue
+                    results = rejected.get(interaction.interaction_id, [])
+                    failures[interaction.interaction_id] = '; '.join(
+                        f"{result.relay_url}: {result.message}" for result in results
+                    ) or 'no relay result'
+                    if results and all(result.permanent for result in results):
+                        permanent.append(interaction.interaction_id)
+                _, dead = await asyncio.to_thread(self.db_service.release_outbox_entries,
+                                                  db, self.worker_id, failures, permanent)
+                if dead:
+                    log.warning(f"Moved {dead} interactions to dead letter table")
+                published += len(confirmed)
+
+                if not confirmed:
+                    # 整批都没有确认, 中继大概率不可用, 等下一轮再试
+                    log.warning(f"No OK received for {len(interactions)} events, stop publishing this round; "
+                                f"relays: {self.publisher.relay_health()}")
+                    break
+            return published
+        finally:
+            try:
+                self.collect_late_deliveries()
+                await asyncio.to_thread(self.flush_acks, db)
+            finally:
+                db.close()
+
+    async def sync_interactions(self, db: Session, interactions: List[Interaction]) \
+            -> Tuple[Dict[int, str], Dict[int, List[PublishResult]]]:
+        """
+        将一批互动记录流水线式发布到所有中继
+
+        确认结果通过 event_id -> interaction_id 映射归属到对应的互动记录, 累计到
+        NOSTR_ACK_FLUSH_SIZE 条后批量写库.
+
+        Returns:
+            (至少一个中继确认的 {interaction_id: event_id}, 所有中继都未确认的 {interaction_id: [发布结果]})
+        """
+        confirmed, failed = await self.publish_interactions(db, interactions)
+        self.ack_buffer.update(confirmed)
+        self.collect_late_deliveries()
+        if len(self.ack_buffer) >= Config.NOSTR_ACK_FLUSH_SIZE:
+            await asyncio.to_thread(self.flush_acks, db)
+        return confirmed, failed
+
+    async def publish_interactions(self, db: Session, interactions: List[Interaction]) \
+            -> Tuple[Dict[int, str], Dict[int, List[PublishResult]]]:
+        """按频道模式 (逐条事件 / 汇总) 发布, 不写库; 各中继的确认记录在 delivery_buffer"""
+        digest = [interaction for interaction in interactions if interaction.channel_id in Config.NOSTR_DIGEST_CHANNELS]
+        regular = [interaction for interaction in interactions
+                   if interaction.channel_id not in Config.NOSTR_DIGEST_CHANNELS]
+
+        confirmed = {}
+        failed = {}
+        for part_confirmed, part_failed in (await self.sync_events(db, regular),
+                                            await self.sync_digests(db, digest)):
+            confirmed.update(part_confirmed)
+            failed.update(part_failed)
+        return confirmed, failed
+
+    async def sync_events(self, db: Session, interactions: List[Interaction]) \
+            -> Tuple[Dict[int, str], Dict[int, List[PublishResult]]]:
+        """每条互动一个 kind 1/6/7 事件"""
+        if not interactions:
+            return {}, {}
+        await asyncio.to_thread(self.prefetch_ref_event_ids, db, interactions)
+
+        frames = {}
+        remaining = list(interactions)
+        while remaining:
+            # 父消息与引用它的互动在同一批且尚未入库解析时, 先签名父消息, 子事件才能带上 e 标签
+            unsigned_keys = {self._message_key(interaction) for interaction in remaining
+                             if interaction.type != InteractionType.LIKE.value}
+            wave = [interaction for interaction in remaining
+                    if self._ref_key(interaction) not in unsigned_keys
+                    or self._ref_key(interaction) in self.ref_event_ids] or remaining
+            wave_ids = {interaction.interaction_id for interaction in wave}
+            remaining = [interaction for interaction in remaining if interaction.interaction_id not in wave_ids]
+
+            signed = await self.sign_cached([(self._signed_key(i), i) for i in wave], self.build_nostr_event)
+            for interaction, (event_id, frame) in zip(wave, signed):
+                frames[event_id] = frame
+                # 内容完全相同的互动会生成相同的事件ID, 一个 OK 同时确认多条记录
+                self.pending_events.setdefault(event_id, []).append(interaction.interaction_id)
+                if interaction.type != InteractionType.LIKE.value:
+                    self.ref_event_ids.put(self._message_key(interaction), event_id)
+
+        results = await self.publisher.publish_events(list(frames.items()))
+
+        confirmed = {}
+        failed = {}
+        for event_id, relay_results in results.items():
+            interaction_ids = self.pending_events.pop(event_id, [])
+            if not any(result.accepted for result in relay_results):
+                for result in relay_results:
+                    log.warning(f"Event {event_id} not accepted by {result.relay_url}: {result.message}")
+                # 父消息重试时事件ID不变, 已引用它的子事件无需改变
+                for interaction_id in interaction_ids:
+                    failed[interaction_id] = relay_results
+                continue
+
+            for interaction_id in interaction_ids:
+                confirmed[interaction_id] = event_id
+            self._record_deliveries(interaction_ids, event_id, relay_results)
+        return confirmed, failed
+
+    async def sync_digests(self, db: Session, interactions: List[Interaction]) \
+            -> Tuple[Dict[int, str], Dict[int, List[PublishResult]]]:
+        """
+        汇总频道: 每个 (频道, 时间窗口) 的互动打包成若干汇总块事件, 再发布一个列出窗口内全部汇总块的索引事件
+
+        先发布汇总块, 再发布索引; 索引也被确认后, 块内的互动才算发布成功, nostr_event_id 记为所在块的事件ID.
+        失败的互动留在 outbox 重试, 重试时内容不变的块得到相同的事件ID.
+        """
+        if not interactions:
+            return {}, {}
+        windows = self.digest_builder.build_chunks(interactions)
+        chunks = [chunk for window_chunks in windows.values() for chunk in window_chunks]
+        signed = await self.sign_cached([(('digest', chunk.chunk_hash), chunk) for chunk in chunks],
+                                        lambda chunk: chunk.event)
+        chunk_ids = {chunk.chunk_hash: event_id for chunk, (event_id, _) in zip(chunks, signed)}
+        chunk_results = await self.publisher.publish_events(list(dict(signed).items()))
+
+        confirmed = {}
+        failed = {}
+        accepted = {}
+        for window, window_chunks in windows.items():
+            for chunk in window_chunks:
+                event_id = chunk_ids[chunk.chunk_hash]
+                results = chunk_results.get(event_id, [])
+                if any(result.accepted for result in results):
+                    accepted.setdefault(window, []).append(chunk)
+                    continue
+                for result in results:
+                    log.warning(f"Digest chunk {event_id} not accepted by {result.relay_url}: {result.message}")
+                for interaction_id in chunk.interaction_ids:
+                    failed[interaction_id] = results
+
+        index_events = {}
+        for window, window_chunks in accepted.items():
+            published, last_index_at = await asyncio.to_thread(self.load_digest_window, db, *window)
+            published = published | {chunk_ids[chunk.chunk_hash] for chunk in window_chunks}
+            created_at = max(int(time.time()), last_index_at + 1)
+            index_events[window] = (self.digest_builder.build_index(*window, sorted(published), created_at),
+                                    published, created_at)
+        if not index_events:
+            return confirmed, failed
+
+        signed_indexes = await self.signer.sign_batch_async([event for event, _, _ in index_events.values()])
+        index_results = await self.publisher.publish_events(signed_indexes)
+        for (window, (_, published, created_at)), (index_id, _) in zip(index_events.items(), signed_indexes):
+            results = index_results.get(index_id, [])
+            index_accepted = any(result.accepted for result in results)
+            if index_accepted:
+                self.digest_windows.put(window, (published, created_at))
+            else:
+                log.warning(f"Digest index {index_id} for channel {window[0]} window {window[1]} not accepted")
+            for chunk in accepted[window]:
+                event_id = chunk_ids[chunk.chunk_hash]
+                for interaction_id in chunk.interaction_ids:
+                    if index_accepted:
+                        confirmed[interaction_id] = event_id
+                    else:
+                        failed[interaction_id] = results
+                if index_accepted:
+                    self._record_deliveries(chunk.interaction_ids, event_id, chunk_results.get(event_id, []))
+        return confirmed, failed
+
+    async def sign_cached(self, items: List[Tuple[Hashable, Any]], build: Callable[[Any], Dict[str, Any]]) \
+            -> List[Tuple[str, str]]:
+        """
+        按缓存键复用已签名的事件, 只构造并签名缓存中没有的
+
+        Args:
+            items: [(缓存键, 构造事件所需的对象)]
+            build: 对象 -> 未签名事件
+
+        Returns:
+            [(事件ID, EVENT 帧)], 与输入顺序一致
+        """
+        cached = self.signed_events.get_many(key for key, _ in items)
+        missing = {}
+        for key, item in items:
+            if key not in cached:
+                missing.setdefault(key, item)
+        if missing:
+            signed = await self.signer.sign_batch_async([build(item) for item in missing.values()])
+            fresh = dict(zip(missing, signed))
+            self.signed_events.put_many(fresh)
+            cached.update(fresh)
+        self.sign_stats['signed'] += len(missing)
+        self.sign_stats['reused'] += len(items) - len(missing)
+        return [cached[key] for key, _ in items]
+
+    def _signed_key(self, interaction: Interaction) -> tuple:
+        # 父消息晚于子互动入库时, 引用的事件ID会从无到有, 事件内容随之变化, 需要一起作为缓存键
+        return 'event', interaction.interaction_id, self.get_ref_event_id(interaction)
+
+    def _record_deliveries(self, interaction_ids: List[int], event_id: str, results: List[PublishResult]) -> None:
+        for result in results:
+            if result.accepted:
+                for interaction_id in interaction_ids:
+                    self.delivery_buffer[(interaction_id, result.relay_url)] = event_id
+        if len(results) < len(self.publisher.relay_urls):
+            self.awaiting_events.put(event_id, interaction_ids)
+
+    def collect_late_deliveries(self) -> None:
+        """取出发布器后台收到的晚到确认, 归属到互动后缓冲到 late_deliveries (在事件循环线程中调用)"""
+        for result in self.publisher.pop_late_results():
+            for interaction_id in self.awaiting_events.get(result.event_id) or []:
+                self.late_deliveries[(interaction_id, result.relay_url)] = result.event_id
+
+    def load_digest_window(self, db: Session, channel_id: int, window_start: int) -> Tuple[set, int]:
+        """窗口内已发布的汇总块事件ID和上一版索引的 created_at, 本进程未缓存时从数据库加载"""
+        cached = self.digest_windows.get((channel_id, window_start))
+        if cached is not None:
+            return cached
+        start = datetime.fromtimestamp(window_start, timezone.utc).replace(tzinfo=None)
+        end = start + timedelta(seconds=self.digest_builder.window_seconds)
+        published = set(self.db_service.get_digest_chunk_event_ids(db, channel_id, start, end))
+        return published, 0
 
-            while self.relay_manager.message_pool.has_ok_notices():
-                ok_msg = self.relay_manager.message_pool.get_ok_notice()
-                self.db_service.update_interaction_published_status(interaction.interaction_id, ok_msg['event_id'])
+    def flush_acks(self, db: Session) -> int:
+        """将缓冲的发布确认和晚到的中继投递记录批量写入数据库"""
+        buffered, self.ack_buffer = self.ack_buffer, {}
+        late, self.late_deliveries = self.late_deliveries, {}
+        deliveries = self.pop_deliveries(buffered)
+        # 互动已在之前写库的, 晚到的投递记录单独写入; 其余与发布状态在同一事务写入
+        earlier = [(key, event_id) for key, event_id in late.items() if key[0] not in buffered]
+        deliveries.update((key, event_id) for key, event_id in late.items() if key[0] in buffered)
+        for start in range(0, len(earlier), Config.NOSTR_ACK_FLUSH_SIZE):
+            self.db_service.save_relay_deliveries(db, dict(earlier[start:start + Config.NOSTR_ACK_FLUSH_SIZE]))
+        flushed = 0
+        items = list(buffered.items())
+        for start in range(0, len(items), Config.NOSTR_ACK_FLUSH_SIZE):
+            chunk = dict(items[start:start + Config.NOSTR_ACK_FLUSH_SIZE])
+            chunk_deliveries = {key: event_id for key, event_id in deliveries.items() if key[0] in chunk}
+            flushed += self.db_service.mark_interactions_published(db, self.worker_id, chunk, chunk_deliveries)
+        return flushed
 
-    # def 一个只用于测试的方法
+    def pop_deliveries(self, interaction_ids) -> Dict[Tuple[int, str], str]:
+        """取出指定互动的中继确认记录"""
+        interaction_ids = set(interaction_ids)
+        popped = {key: event_id for key, event_id in self.delivery_buffer.items() if key[0] in interaction_ids}
+        for key in popped:
+            del self.delivery_buffer[key]
+        return popped
+
+    def prefetch_ref_event_ids(self, db: Session, interactions: List[Interaction]) -> None:
+        """
+        解析本批互动引用的父消息事件ID, 结果只由已入库的数据决定, 与父消息何时发布无关:
+          - 已发布的父消息取库中的 nostr_event_id
+          - 未发布的父消息按其记录构造事件计算ID, 与它之后发布时的事件ID相同 (它引用的消息逐级同样解析)
+          - 汇总频道的消息没有单独的事件, 不带 e 标签; 尚未入库的父消息无法计算, 也不带 e 标签
+        每一级引用一次 IN 查询.
+        """
+        pending = {self._ref_key(interaction) for interaction in interactions}
+        parents: Dict[tuple, Interaction] = {}
+        queried = set()
+        while pending:
+            missing = [ref for ref in pending
+                       if ref is not None and ref not in queried and ref not in self.ref_event_ids]
+            if not missing:
+                break
+            queried.update(missing)
+            found = self.db_service.get_ref_interactions(db, missing)
+            parents.update(found)
+            pending = {self._ref_key(parent) for parent in found.values() if not parent.nostr_event_id}
+        for ref in parents:
+            self._resolve_parent(ref, parents, set())
+
+    def _resolve_parent(self, ref: tuple, parents: Dict[tuple, Interaction], visiting: set) -> Optional[str]:
+        if ref in self.ref_event_ids:
+            return self.ref_event_ids.get(ref)
+        parent = parents.get(ref)
+        if parent is None or ref in visiting:
+            return None
+        if parent.channel_id in Config.NOSTR_DIGEST_CHANNELS:
+            event_id = None
+        elif parent.nostr_event_id:
+            event_id = parent.nostr_event_id
+        else:
+            visiting.add(ref)
+            grandparent = self._ref_key(parent)
+            if grandparent is not None:
+                self._resolve_parent(grandparent, parents, visiting)
+            event = self.build_nostr_event(parent)
+            event_id = self.signer.serializer.compute_id(event['created_at'], event['kind'], event['tags'],
+                                                         event['content'])
+        self.ref_event_ids.put(ref, event_id)
+        return event_id
+
+    def get_ref_event_id(self, interaction: Interaction) -> Optional[str]:
+        ref = self._ref_key(interaction)
+        if ref is None:
+            return None
+        return self.ref_event_ids.get(ref)
+
+    @staticmethod
+    def _message_key(interaction: Interaction) -> tuple:
+        return interaction.channel_id, interaction.message_id
+
+    @staticmethod
+    def _ref_key(interaction: Interaction) -> Optional[tuple]:
+        if interaction.type not in (InteractionType.RETWEET.value, InteractionType.REPLY.value,
+                                    InteractionType.LIKE.value):
+            return None
+        if interaction.ref_message_id is None:
+            return None
+        return interaction.ref_channel_id or interaction.channel_id, interaction.ref_message_id
+
+    async def close(self) -> None:
+        await self.publisher.close()
+        self.signer.close()
+
+    # def 一个只用于测试的方法, 每次调用时才创建 pynostr RelayManager
     def test_sync_interactions(self, event):
-        self.relay_manager.publish_event(event)
-        self.relay_manager.run_sync()
+        relay_manager = RelayManager(timeout=6)
+        for relay in self.publisher.relay_urls:
+            relay_manager.add_relay(relay, close_on_eose=False)
+        filters = FiltersList([Filters(authors=[self.pubkey], limit=100)])
+        relay_manager.add_subscription_on_all_relays(uuid.uuid1().hex, filters)
+        relay_manager.publish_event(event)
+        relay_manager.run_sync()
 
-        while self.relay_manager.message_pool.has_ok_notices():
-            ok_msg = self.relay_manager.message_pool.get_ok_notice()
+        while relay_manager.message_pool.has_ok_notices():
+            ok_msg = relay_manager.message_pool.get_ok_notice()
             print(ok_msg)
 
     def create_nostr_event(self, interaction: Interaction) -> Event:
+        """构造并在当前进程内签名单个事件"""
+        data = self.build_nostr_event(interaction)
+        event = Event(content=data['content'], kind=data['kind'], tags=data['tags'],
+                      created_at=data['created_at'])
+        event.sign(self.private_pair.hex())
+        return event
+
+    def build_nostr_event(self, interaction: Interaction) -> Dict[str, Any]:
         """
+        构造未签名事件 {'content', 'kind', 'tags', 'created_at'}, 由 BatchSigner 批量签名
         [
             "EVENT",
             {
                 "id": "<事件唯一ID>",
                 "pubkey": "<TEE节点公钥>",
-                "created_at": "<TEE节点同步时间戳>",
+                "created_at": <发言时间戳>,
                 "kind": 1,
                 "tags": [
                     ["t", "discord"],  // 标识事件来源于Discord
                     ["channel_id", "<Discord频道ID>"],  // 发言所在的频道ID
                     ["user_id", "<发言用户Discord ID>"],  // 发言用户的ID
-                    ["created_at", "<发言时间>"],
                     ["username", "<发言用户用户名>"],  // 发言用户的用户名
+                    ["created_at", "<发言时间>"],
                     ["message_id", "<原消息ID>"]  // 原始发言消息的ID
                 ],
                 "content": "<发言内容>",
@@ -77,30 +456,19 @@ class NostrSync:
             }
         ]
         """
-        if interaction.type == InteractionType.RETWEET.value or InteractionType.REPLY.value:
-            return self.create_nostr_retweet_event(interaction)
+        if interaction.type in (InteractionType.RETWEET.value, InteractionType.REPLY.value):
+            return self.build_nostr_retweet_event(interaction)
         elif interaction.type == InteractionType.LIKE.value:
-            return self.create_nostr_like_event(interaction)
-        tags = [
-            ['t', 'discord'],
-            ['channel_id', str(interaction.channel_id)],
-            ['user_id', interaction.user_id],
-            ["created_at", str(int(interaction.interaction_time.timestamp()))],
-            ["message_id", interaction.message_id],
-            ['username', interaction.username]
-        ]
-        event = Event(interaction.interaction_content)
-        for tag in tags:
-            event.add_tag(tag[0], tag[1])
-        event.sign(self.private_pair.hex())
-        return event
+            return self.build_nostr_like_event(interaction)
+        return self._unsigned_event(interaction, interaction.interaction_content, EventKind.TEXT_NOTE,
+                                    self._base_tags(interaction))
 
-    def create_nostr_retweet_event(self, interaction: Interaction) -> Event:
+    def build_nostr_retweet_event(self, interaction: Interaction) -> Dict[str, Any]:
         """
         {
             "id": "<事件唯一ID>",
             "pubkey": "<TEE节点公钥>",
-            "created_at": "<TEE节点同步时间戳>",
+            "created_at": <转发时间戳>,
             "kind": 6,
             "tags": [
                 ["t", "discord"],  // 标识事件来源于Discord
@@ -115,33 +483,18 @@ class NostrSync:
             "sig": "<事件签名>"
         }
         """
-        tags = [
-            ['t', 'discord'],
-            ['channel_id', str(interaction.channel_id)],
-            ['user_id', interaction.user_id],
-            ["created_at", str(int(interaction.interaction_time.timestamp()))],
-            ["message_id", interaction.message_id],
-            ['username', interaction.username],
-        ]
-        event = Event("", kind=6)
-        for tag in tags:
-            event.add_tag(tag[0], tag[1])
-        # 从interaction.note字符串中通过json解析出来对应的channel_id和message_id
-        note_data = json.loads(interaction.note)
-        channel_id = note_data.get('channel_id')
-        message_id = note_data.get('message_id')
-        event_id = self.db_service.get_interaction_nostr_event_id(channel_id, message_id)
+        tags = self._base_tags(interaction)
+        event_id = self.get_ref_event_id(interaction)
         if event_id:
-            event.add_tag('e', event_id)
-        event.sign(self.private_pair.hex())
-        return event
+            tags.append(['e', event_id])
+        return self._unsigned_event(interaction, "", 6, tags)
 
-    def create_nostr_like_event(self, interaction: Interaction) -> Event:
+    def build_nostr_like_event(self, interaction: Interaction) -> Dict[str, Any]:
         """
         {
             "id": "<事件唯一ID>",
             "pubkey": "<TEE节点公钥>",
-            "created_at": "<TEE节点同步时间戳>",
+            "created_at": <点赞时间戳>,
             "kind": 7,
             "tags": [
                 ["t", "discord"],  // 标识事件来源于Discord
@@ -157,26 +510,41 @@ class NostrSync:
             "sig": "<事件签名>"
         }
         """
-        tags = [
+        tags = self._base_tags(interaction)
+        event_id = self.get_ref_event_id(interaction)
+        if event_id:
+            tags.append(['e', event_id])
+        if interaction.reaction_emoji:
+            tags.append(['reaction', interaction.reaction_emoji])
+        return self._unsigned_event(interaction, "", EventKind.REACTION, tags)
+
+    @staticmethod
+    def _epoch(value: datetime) -> int:
+        # 数据库中的时间不带时区, 按 UTC 处理; 与采集时带时区的 datetime 得到相同的时间戳
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+
+    def _base_tags(self, interaction: Interaction) -> List[List[str]]:
+        """所有类型共用的标签, 顺序固定, 值统一为字符串"""
+        return [
             ['t', 'discord'],
             ['channel_id', str(interaction.channel_id)],
-            ['user_id', interaction.user_id],
-            ["created_at", str(int(interaction.interaction_time.timestamp()))],
-            ["message_id", interaction.message_id],
-            ['username', interaction.username],
+            ['user_id', str(interaction.user_id)],
+            ['username', interaction.username or ''],
+            ['created_at', str(self._epoch(interaction.interaction_time))],
+            ['message_id', str(interaction.message_id)]
         ]
-        event = Event("", kind=7)
-        for tag in tags:
-            event.add_tag(tag[0], tag[1])
-        # 从interaction.note字符串中通过json解析出来对应的channel_id和message_id
-        note_data = json.loads(interaction.note)
-        channel_id = note_data.get('channel_id')
-        message_id = note_data.get('message_id')
-        emoji = note_data.get('emoji')
-        event_id = self.db_service.get_interaction_nostr_event_id(channel_id, message_id)
-        if event_id:
-            event.add_tag('e', event_id)
-        if emoji:
-            event.add_tag('reaction', emoji)
-        event.sign(self.private_pair.hex())
-        return event
+
+    def _unsigned_event(self, interaction: Interaction, content: str, kind: int,
+                        tags: List[List[str]]) -> Dict[str, Any]:
+        """
+        事件内容只由已入库的数据决定 (created_at 取互动时间), 同一条互动重复构造得到相同的事件ID,
+        发布后未来得及写库就崩溃时重新发布不会在中继上产生重复事件
+        """
+        return {
+            'content': content or '',
+            'kind': int(kind),
+            'tags': tags,
+            'created_at': self._epoch(interaction.interaction_time)
+        }
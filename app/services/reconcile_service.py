@@ -0,0 +1,130 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.models.database import get_db
+from app.models.models import Interaction, InteractionType
+from app.services.database_service import DatabaseService
+from app.services.pynostr_sync import NostrSync
+from config.config import Config
+from utils.logger import Logger
+
+# 互动类型对应的 Nostr 事件类型
+INTERACTION_KINDS = {
+    InteractionType.MESSAGE.value: 1,
+    InteractionType.REPLY.value: 6,
+    InteractionType.RETWEET.value: 6,
+    InteractionType.LIKE.value: 7,
+}
+
+
+class ReconcileService:
+    """
+    发布状态对账
+
+    发布后、写库前进程退出时, 已在中继上的事件对应的互动仍是 is_published = 0. 对账任务按时间窗口
+    分页查询本节点公钥发布的事件, 按 channel_id/message_id 等标签匹配回互动记录并批量标记为已发布,
+    避免整体重新发布.
+    """
+
+    def __init__(self, nostr_sync: NostrSync, page_size: int = None, window_seconds: int = None):
+        self.logger = Logger('reconcile_service')
+        self.nostr_sync = nostr_sync
+        self.db_service = DatabaseService()
+        self.page_size = page_size or Config.NOSTR_RECONCILE_PAGE_SIZE
+        self.window_seconds = window_seconds or Config.NOSTR_RECONCILE_WINDOW_SECONDS
+        # 同一秒内事件超过一页而未取全的秒数
+        self.skipped_seconds = 0
+
+    @staticmethod
+    def event_key(event: Dict) -> Optional[Tuple]:
+        tags = {}
+        for tag in event.get('tags', []):
+            if len(tag) >= 2:
+                tags.setdefault(tag[0], tag[1])
+        if 'message_id' not in tags or 'channel_id' not in tags:
+            return None
+        return (tags['channel_id'], tags['message_id'], event.get('kind'),
+                tags.get('user_id', ''), tags.get('reaction', ''))
+
+    @staticmethod
+    def interaction_key(interaction: Interaction) -> Tuple:
+        return (str(interaction.channel_id), str(interaction.message_id), INTERACTION_KINDS.get(interaction.type),
+                str(interaction.user_id), interaction.reaction_emoji or '')
+
+    async def fetch_window(self, since: int, until: int) -> List[Dict]:
+        """
+        分页拉取 [since, until] 内本节点发布的事件
+
+        中继按 created_at 倒序返回, 每页以本页最早的 created_at 作为下一页的 until; 边界秒内的事件
+        可能重复返回, 按事件ID去重. 同一秒内超过 page_size 的事件无法取全, 记录警告后跳过该秒.
+        """
+        events = {}
+        while until >= since:
+            page = await self.nostr_sync.publisher.query({
+                'authors': [self.nostr_sync.pubkey],
+                'since': since,
+                'until': until,
+                'limit': self.page_size
+            })
+            new = [event for event in page if event.get('id') not in events]
+            for event in new:
+                events[event['id']] = event
+            if len(page) < self.page_size:
+                break
+            oldest = min(event['created_at'] for event in page)
+            if new and oldest < until:
+                until = oldest
+                continue
+            # 整页都在同一秒 (该秒的事件超过一页) 时无法按时间继续细分, 跳过该秒避免死循环
+            fetched = sum(1 for event in events.values() if event['created_at'] == oldest)
+            self.logger.warning(f"More than {self.page_size} events at created_at={oldest}, "
+                                f"only {fetched} fetched; the rest of this second is skipped")
+            self.skipped_seconds += 1
+            until = oldest - 1
+        return list(events.values())
+
+    def mark_matches(self, matches: Dict[Tuple, str]) -> Tuple[int, int]:
+        """按中继事件的 (channel_id, message_id) 查询未发布的互动, 匹配后按块批量标记, 返回 (扫描数, 标记数)"""
+        messages = {(int(key[0]), int(key[1])) for key in matches if key[0].isdigit() and key[1].isdigit()}
+        db = next(get_db())
+        scanned = 0
+        marked = 0
+        try:
+            for chunk in self.db_service.iter_unsynced_interactions_by_messages(db, messages):
+                scanned += len(chunk)
+                published = {}
+                for interaction in chunk:
+                    event_id = matches.get(self.interaction_key(interaction))
+                    if event_id:
+                        published[interaction.interaction_id] = event_id
+                marked += self.db_service.mark_interactions_published(db, None, published)
+            return scanned, marked
+        finally:
+            db.close()
+
+    async def run(self, since: datetime, until: datetime = None) -> Dict[str, int]:
+        until = until or datetime.now(timezone.utc)
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        if until.tzinfo is None:
+            until = until.replace(tzinfo=timezone.utc)
+
+        matches = {}
+        fetched = 0
+        window_start = since
+        while window_start < until:
+            window_end = min(until, window_start + timedelta(seconds=self.window_seconds))
+            events = await self.fetch_window(int(window_start.timestamp()), int(window_end.timestamp()))
+            fetched += len(events)
+            for event in events:
+                key = self.event_key(event)
+                if key is not None:
+                    matches.setdefault(key, event['id'])
+            self.logger.info(f"Fetched {len(events)} events in [{window_start}, {window_end}]")
+            window_start = window_end
+
+        scanned, marked = await asyncio.to_thread(self.mark_matches, matches)
+        result = {'fetched': fetched, 'scanned': scanned, 'marked': marked, 'skipped_seconds': self.skipped_seconds}
+        self.logger.info(f"Reconcile finished: {result}")
+        return result
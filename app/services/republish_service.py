@@ -0,0 +1,162 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.models.database import SessionLocal
+from app.models.models import Interaction
+from app.services.database_service import DatabaseService
+from app.services.pynostr_sync import NostrSync
+from config.config import Config
+from utils.logger import Logger
+
+
+class RepublishService:
+    """
+    向单个中继补发历史数据
+
+    按 interaction_id 分块流式读取已发布但尚未投递到该中继的互动, 重新构造事件发布 (事件内容确定,
+    事件ID与原发布一致, 中继已有的按重复事件确认), 最多 concurrency 块同时在途. 每块确认后在一个事务中
+    写入投递记录并推进检查点; 检查点只推进到连续完成的块, 且不越过最早失败的互动, 中断或重新执行时从检查点
+    继续, 失败的互动被重新补发 (其后已投递的不再读取).
+
+    汇总频道 (Config.NOSTR_DIGEST_CHANNELS) 的互动不补发: 汇总块按发布时的批次划分, 按块补发得到的块与原发布不同,
+    索引也会列出目标中继没有的块.
+    """
+
+    def __init__(self, nostr_sync: NostrSync, relay_url: str, chunk_size: int = None, concurrency: int = None,
+                 progress_interval: float = None):
+        self.logger = Logger('republish_service')
+        self.nostr_sync = nostr_sync
+        self.relay_url = relay_url
+        self.db_service = DatabaseService()
+        # 在途事件超过中继排队上限 (NOSTR_PUBLISH_WINDOW * 2) 时, 多出的事件会被直接跳过, 这里按上限收紧
+        max_backlog = Config.NOSTR_PUBLISH_WINDOW * 2
+        self.chunk_size = min(chunk_size or Config.NOSTR_REPUBLISH_CHUNK_SIZE, max_backlog)
+        self.concurrency = max(1, min(concurrency or Config.NOSTR_REPUBLISH_CONCURRENCY,
+                                      max_backlog // self.chunk_size))
+        self.progress_interval = progress_interval or Config.NOSTR_REPUBLISH_PROGRESS_SECONDS
+        self.delivered = 0
+        self.failed = 0
+        self.skipped = 0
+        self.checkpoint = 0
+        # 本次补发中最早失败的 interaction_id, 检查点停在它之前
+        self.first_failed: Optional[int] = None
+
+    def load_checkpoint(self) -> int:
+        db = SessionLocal()
+        try:
+            checkpoint = self.db_service.get_republish_checkpoint(db, self.relay_url)
+            return checkpoint.last_interaction_id if checkpoint else 0
+        finally:
+            db.close()
+
+    def count_total(self, after_id: int) -> int:
+        db = SessionLocal()
+        try:
+            return self.db_service.count_published_interactions(db, after_id)
+        finally:
+            db.close()
+
+    async def publish_chunk(self, interactions: List[Interaction]) -> Tuple[Dict[Tuple[int, str], str], List[int]]:
+        """发布一块, 返回 (该中继的投递记录, 失败的 interaction_id); 汇总频道的互动跳过"""
+        regular = [interaction for interaction in interactions
+                   if interaction.channel_id not in Config.NOSTR_DIGEST_CHANNELS]
+        self.skipped += len(interactions) - len(regular)
+        if not regular:
+            return {}, []
+        interactions = regular
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            confirmed, failed = await self.nostr_sync.publish_interactions(db, interactions)
+        finally:
+            db.close()
+        self.nostr_sync.pop_deliveries(confirmed)
+        deliveries = {(interaction_id, self.relay_url): event_id for interaction_id, event_id in confirmed.items()}
+        return deliveries, list(failed)
+
+    def save_progress(self, last_interaction_id: int, deliveries: Dict[Tuple[int, str], str], failed: int) -> None:
+        db = SessionLocal()
+        try:
+            self.db_service.save_republish_progress(db, self.relay_url, last_interaction_id, deliveries, failed)
+        finally:
+            db.close()
+
+    def log_progress(self, started: float, total: int, final: bool = False) -> None:
+        elapsed = max(time.monotonic() - started, 1e-6)
+        processed = self.delivered + self.failed + self.skipped
+        rate = processed / elapsed
+        remaining = max(total - processed, 0)
+        eta = f"{remaining / rate:.0f}s" if rate and not final else '-'
+        self.logger.info(f"{'Finished' if final else 'Progress'} {self.relay_url}: "
+                         f"delivered {self.delivered}, failed {self.failed}, skipped {self.skipped}, "
+                         f"{processed}/{total} ({rate:.0f} events/s, eta {eta}), checkpoint {self.checkpoint}")
+
+    async def run(self, from_id: Optional[int] = None) -> Dict[str, int]:
+        """
+        Args:
+            from_id: 从该 interaction_id 之后开始; None 表示从上次的检查点继续
+        """
+        self.delivered = self.failed = self.skipped = 0
+        self.first_failed = None
+        self.checkpoint = from_id if from_id is not None else await asyncio.to_thread(self.load_checkpoint)
+        total = await asyncio.to_thread(self.count_total, self.checkpoint)
+        self.logger.info(f"Republishing to {self.relay_url} from interaction {self.checkpoint}, "
+                         f"up to {total} interactions")
+        if Config.NOSTR_DIGEST_CHANNELS:
+            self.logger.warning(f"Digest channels {sorted(Config.NOSTR_DIGEST_CHANNELS)} are not republished: "
+                                f"digest chunks and indexes can not be rebuilt per chunk")
+
+        reader = SessionLocal(expire_on_commit=False)
+        chunks = self.db_service.iter_undelivered_interactions(reader, self.relay_url, self.checkpoint,
+                                                               self.chunk_size)
+        tasks: Dict[asyncio.Task, Tuple[int, int]] = {}
+        completed: Dict[int, Tuple[int, Dict, List[int]]] = {}
+        next_seq = 0
+        next_commit = 0
+        exhausted = False
+        started = time.monotonic()
+        last_report = started
+        try:
+            while True:
+                while not exhausted and len(tasks) < self.concurrency:
+                    chunk = await asyncio.to_thread(next, chunks, None)
+                    if chunk is None:
+                        exhausted = True
+                        break
+                    task = asyncio.ensure_future(self.publish_chunk(chunk))
+                    tasks[task] = (next_seq, chunk[-1].interaction_id)
+                    next_seq += 1
+                if not tasks:
+                    break
+
+                done, _ = await asyncio.wait(list(tasks), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    seq, last_id = tasks.pop(task)
+                    deliveries, failed = task.result()
+                    completed[seq] = (last_id, deliveries, failed)
+
+                # 检查点只推进到连续完成的块, 中断后不会跳过仍在途的块; 有失败时停在最早失败的互动之前
+                while next_commit in completed:
+                    last_id, deliveries, failed = completed.pop(next_commit)
+                    if failed and self.first_failed is None:
+                        self.first_failed = min(failed)
+                    if self.first_failed is not None:
+                        last_id = min(last_id, self.first_failed - 1)
+                    await asyncio.to_thread(self.save_progress, last_id, deliveries, len(failed))
+                    self.delivered += len(deliveries)
+                    self.failed += len(failed)
+                    self.checkpoint = last_id
+                    next_commit += 1
+
+                if time.monotonic() - last_report >= self.progress_interval:
+                    self.log_progress(started, total)
+                    last_report = time.monotonic()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            reader.close()
+
+        self.log_progress(started, total, final=True)
+        return {'delivered': self.delivered, 'failed': self.failed, 'skipped': self.skipped,
+                'checkpoint': self.checkpoint}
@@ -0,0 +1,279 @@
+import calendar
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from app.models.database import get_db
+from app.models.models import Interaction, DataScope, NostrDeadLetter, NostrRelayDelivery
+from app.services.cache_service import response_cache
+from app.services.database_service import DatabaseService
+from config.config import Config
+from utils.logger import Logger
+
+INTERACTION_TABLE = Interaction.__tablename__
+MAXVALUE_PARTITION = 'pmax'
+# 按 interaction_id 引用互动记录的表, 随互动一起清理 (outbox 中的孤立记录在领取时确认删除)
+DEPENDENT_TABLES = (NostrRelayDelivery.__tablename__, NostrDeadLetter.__tablename__)
+
+
+class RetentionService:
+    """
+    按频道的 expiration_time 清理过期互动数据
+
+    discord_interaction 按 collect_time 月度分区 (按 UTC 划分月份):
+      1. 预先从 pmax 中拆分出未来几个月的分区
+      2. 分区内所有频道的数据都已过期时, 直接 DROP PARTITION
+      3. 剩余的过期数据按频道分批 DELETE
+    中继投递记录和死信记录在互动删除前按 interaction_id 一并删除.
+    没有配置 expiration_time 的频道(以及已删除的频道)数据永久保留, 其所在分区不会被删除.
+    """
+
+    def __init__(self, delete_batch_size: int = None, months_ahead: int = None):
+        self.logger = Logger('retention_service')
+        self.delete_batch_size = delete_batch_size or Config.RETENTION_DELETE_BATCH_SIZE
+        self.months_ahead = months_ahead or Config.PARTITION_MONTHS_AHEAD
+
+    def run(self) -> Dict[str, int]:
+        """执行一次完整的保留策略"""
+        db = next(get_db())
+        try:
+            created = self.ensure_future_partitions(db)
+            cutoffs = self.get_channel_cutoffs(db)
+            dropped = self.drop_expired_partitions(db, cutoffs)
+            deleted = self.delete_expired_rows(db, cutoffs)
+            if dropped or deleted:
+                self.bump_versions(db, cutoffs)
+            return {
+                'created_partitions': created,
+                'dropped_partitions': dropped,
+                'deleted_rows': deleted
+            }
+        finally:
+            db.close()
+
+    @staticmethod
+    def bump_versions(db: Session, cutoffs: Dict[int, datetime]) -> None:
+        """数据删除已提交后递增数据版本, 客户端持有的 ETag 失效"""
+        try:
+            DatabaseService.bump_data_versions(db, cutoffs, scopes=[DataScope.INTERACTIONS, DataScope.RETENTION])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        response_cache.invalidate(channel_ids=cutoffs)
+
+    @staticmethod
+    def get_partitions(db: Session) -> List[Tuple[str, Optional[int]]]:
+        """
+        获取 discord_interaction 的分区列表
+
+        Returns:
+            [(分区名, 上界时间戳)], MAXVALUE 分区的上界为 None; 表未分区时返回空列表
+        """
+        rows = db.execute(text(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION "
+            "FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name "
+            "AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION"
+        ), {'table_name': INTERACTION_TABLE}).fetchall()
+        return [(name, None if description == 'MAXVALUE' else int(description))
+                for name, description in rows]
+
+    @staticmethod
+    def partition_name(month_start: datetime) -> str:
+        return f"p{month_start:%Y%m}"
+
+    @staticmethod
+    def add_months(month_start: datetime, months: int) -> datetime:
+        month_index = month_start.month - 1 + months
+        return month_start.replace(year=month_start.year + month_index // 12,
+                                   month=month_index % 12 + 1, day=1,
+                                   hour=0, minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def plan_future_partitions(existing: List[str], now: datetime, months_ahead: int) -> List[Tuple[str, datetime]]:
+        """
+        需要从 pmax 中拆分出的分区: 当前月及未来 months_ahead 个月中比已有分区更晚的月份
+
+        分区必须严格递增, 已经落后于最后一个月度分区的月份跳过 (其数据会并入第一个新建分区).
+
+        Returns:
+            [(分区名, 上界时间)], 按月份递增
+        """
+        last_month = max((name for name in existing if name != MAXVALUE_PARTITION), default=None)
+        current_month = RetentionService.add_months(now, 0)
+        planned = []
+        for offset in range(months_ahead + 1):
+            month_start = RetentionService.add_months(current_month, offset)
+            name = RetentionService.partition_name(month_start)
+            if last_month and name <= last_month:
+                continue
+            planned.append((name, RetentionService.add_months(month_start, 1)))
+        return planned
+
+    def ensure_future_partitions(self, db: Session) -> int:
+        """从 pmax 中拆分出当前月及未来 months_ahead 个月的分区, 返回新建分区数"""
+        partitions = self.get_partitions(db)
+        if not partitions:
+            self.logger.warning(f"Table {INTERACTION_TABLE} is not partitioned, skip partition maintenance")
+            return 0
+
+        existing = [name for name, _ in partitions]
+        if MAXVALUE_PARTITION not in existing:
+            self.logger.warning(f"Partition {MAXVALUE_PARTITION} not found on {INTERACTION_TABLE}")
+            return 0
+
+        planned = self.plan_future_partitions(existing, datetime.utcnow(), self.months_ahead)
+        if not planned:
+            return 0
+
+        # 上界直接写 UTC 时间戳; UNIX_TIMESTAMP('...') 会按会话时区解释字符串
+        definitions = [
+            f"PARTITION {name} VALUES LESS THAN ({calendar.timegm(upper_bound.timetuple())})"
+            for name, upper_bound in planned
+        ]
+        definitions.append(f"PARTITION {MAXVALUE_PARTITION} VALUES LESS THAN MAXVALUE")
+        db.execute(text(
+            f"ALTER TABLE {INTERACTION_TABLE} REORGANIZE PARTITION {MAXVALUE_PARTITION} "
+            f"INTO ({', '.join(definitions)})"
+        ))
+        db.commit()
+        self.logger.info(f"Created {len(planned)} partitions on {INTERACTION_TABLE}")
+        return len(planned)
+
+    def get_channel_cutoffs(self, db: Session) -> Dict[int, datetime]:
+        """获取配置了过期时间的频道及其过期截止时间"""
+        cutoffs = {}
+        for channel in DatabaseService.iter_active_channels(db):
+            if not channel.expiration_time:
+                continue
+            try:
+                cutoffs[int(channel.channel_id)] = DatabaseService.parse_expiration_time(channel.expiration_time)
+            except ValueError as e:
+                self.logger.error(f"Invalid expiration time '{channel.expiration_time}' "
+                                  f"for channel {channel.channel_id}: {str(e)}")
+        return cutoffs
+
+    @staticmethod
+    def is_partition_expired(upper_bound: Optional[int], now: float,
+                             channel_max_times: List[Tuple[int, datetime]],
+                             cutoffs: Dict[int, datetime]) -> bool:
+        """
+        分区能否整体删除: 时间区间已经结束, 且分区内每个频道的最新数据都早于该频道的过期截止时间
+
+        没有截止时间的频道 (未配置 expiration_time 或已删除) 数据永久保留, 其所在分区不能删除.
+
+        Args:
+            upper_bound: 分区上界时间戳, MAXVALUE 分区为 None
+            now: 当前时间戳
+            channel_max_times: 分区内 [(channel_id, MAX(collect_time))]
+            cutoffs: {channel_id: 过期截止时间}
+        """
+        # 当前及未来的分区仍会写入新数据
+        if upper_bound is None or upper_bound > now:
+            return False
+        return all(
+            channel_id in cutoffs and max_collect_time < cutoffs[channel_id]
+            for channel_id, max_collect_time in channel_max_times
+        )
+
+    def drop_expired_partitions(self, db: Session, cutoffs: Dict[int, datetime]) -> int:
+        """删除所有数据都已过期的分区, 返回删除的分区数"""
+        if not cutoffs:
+            return 0
+
+        dropped = 0
+        now = time.time()
+        for name, upper_bound in self.get_partitions(db):
+            # 当前及未来的分区不需要查询
+            if upper_bound is None or upper_bound > now:
+                continue
+
+            # (channel_id, collect_time) 索引上的 loose index scan, 每个频道只读一行
+            rows = db.execute(text(
+                f"SELECT channel_id, MAX(collect_time) FROM {INTERACTION_TABLE} PARTITION ({name}) "
+                f"GROUP BY channel_id"
+            )).fetchall()
+            if not self.is_partition_expired(upper_bound, now, rows, cutoffs):
+                continue
+
+            self.delete_partition_dependents(db, name)
+            db.execute(text(f"ALTER TABLE {INTERACTION_TABLE} DROP PARTITION {name}"))
+            db.commit()
+            dropped += 1
+            self.logger.info(f"Dropped expired partition {name} ({len(rows)} channels)")
+
+        return dropped
+
+    @staticmethod
+    def delete_dependents(db: Session, interaction_ids: List[int]) -> None:
+        """删除引用这些互动的投递记录和死信记录 (不提交事务)"""
+        for table in DEPENDENT_TABLES:
+            db.execute(text(f"DELETE FROM {table} WHERE interaction_id IN :ids")
+                       .bindparams(bindparam('ids', expanding=True)), {'ids': interaction_ids})
+
+    def delete_partition_dependents(self, db: Session, name: str) -> None:
+        """DROP PARTITION 之前按 interaction_id 分批删除分区内互动的依赖记录"""
+        statement = text(
+            f"SELECT interaction_id FROM {INTERACTION_TABLE} PARTITION ({name}) "
+            f"WHERE interaction_id > :after ORDER BY interaction_id LIMIT :limit"
+        )
+        after = 0
+        while True:
+            interaction_ids = [row[0] for row in db.execute(statement, {
+                'after': after,
+                'limit': self.delete_batch_size
+            })]
+            if not interaction_ids:
+                break
+            try:
+                self.delete_dependents(db, interaction_ids)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            after = interaction_ids[-1]
+            if len(interaction_ids) < self.delete_batch_size:
+                break
+
+    def delete_expired_rows(self, db: Session, cutoffs: Dict[int, datetime]) -> int:
+        """按频道分批删除剩余的过期数据及其依赖记录, 返回删除的互动行数"""
+        select_statement = text(
+            f"SELECT interaction_id FROM {INTERACTION_TABLE} "
+            f"WHERE channel_id = :channel_id AND collect_time < :cutoff "
+            f"LIMIT :limit"
+        )
+        delete_statement = text(
+            f"DELETE FROM {INTERACTION_TABLE} "
+            f"WHERE channel_id = :channel_id AND collect_time < :cutoff AND interaction_id IN :ids"
+        ).bindparams(bindparam('ids', expanding=True))
+
+        total = 0
+        for channel_id, cutoff in cutoffs.items():
+            while True:
+                params = {'channel_id': channel_id, 'cutoff': cutoff}
+                try:
+                    interaction_ids = [row[0] for row in db.execute(select_statement, {
+                        **params,
+                        'limit': self.delete_batch_size
+                    })]
+                    if not interaction_ids:
+                        break
+                    self.delete_dependents(db, interaction_ids)
+                    result = db.execute(delete_statement, {**params, 'ids': interaction_ids})
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+
+                total += result.rowcount
+                if len(interaction_ids) < self.delete_batch_size:
+                    break
+
+        if total:
+            self.logger.info(f"Deleted {total} expired interactions")
+        return total
@@ -1,6 +1,8 @@
 from marshmallow import Schema, fields, validates, validates_schema, ValidationError, EXCLUDE
 import re
 
+from config.config import Config
+
 
 class BaseChannelSchema(Schema):
     """基础频道 Schema,定义所有可能的字段"""
@@ -94,3 +96,37 @@ class InteractionSchema(Schema):
     username = fields.Str(required=True)
     interaction_content = fields.Str(required=True)
     interaction_time = fields.DateTime(required=True)
+
+
+class DiscordIdField(fields.Field):
+    """Discord ID, 接受整数或数字字符串 (超过 2^53 的 ID 在 JS 客户端中只能用字符串表示)"""
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        if isinstance(value, bool) or not re.match(r'^\d+$', str(value)):
+            raise ValidationError('Not a valid Discord ID')
+        return int(value)
+
+
+class StatsBatchSchema(Schema):
+    """批量统计的 Schema
+    - user_ids, channel_ids 至少提供一个, 合计不超过 STATS_BATCH_MAX_IDS
+    - start_time, end_time 为秒级时间戳 (按采集时间过滤), 可选
+    """
+    user_ids = fields.List(DiscordIdField(), load_default=list)
+    channel_ids = fields.List(DiscordIdField(), load_default=list)
+    start_time = fields.Int(load_default=None)
+    end_time = fields.Int(load_default=None)
+
+    class Meta:
+        unknown = EXCLUDE  # 忽略未定义的字段
+
+    @validates_schema
+    def validate_batch(self, data, **kwargs):
+        """验证ID数量和时间范围"""
+        total = len(data['user_ids']) + len(data['channel_ids'])
+        if total == 0:
+            raise ValidationError('user_ids or channel_ids is required')
+        if total > Config.STATS_BATCH_MAX_IDS:
+            raise ValidationError(f'At most {Config.STATS_BATCH_MAX_IDS} ids are allowed per request')
+        if data['start_time'] and data['end_time'] and data['start_time'] > data['end_time']:
+            raise ValidationError('start_time must be earlier than end_time')
@@ -0,0 +1,5 @@
+"""gunicorn worker 按字符串导入的 WSGI 应用 (见 wsgi_server.py)"""
+from app import create_app
+from config.config import Config
+
+app = create_app(Config)
@@ -13,13 +13,81 @@ class Config:
     DB_USER = 'root'
     DB_PASSWORD = '123456'
     DB_NAME = 'discord'
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))  # 每个进程的连接池大小, 不小于 API_THREADS
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))  # 连接池满时额外允许的连接数
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))  # 等待空闲连接的超时(秒)
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 3600))  # 连接最长复用时间(秒), 小于 MySQL wait_timeout
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'  # 取出连接前检测是否可用
+    DB_CHUNK_SIZE = int(os.getenv('DB_CHUNK_SIZE', 1000))  # 批量读取时每块的行数
+    USERNAME_ID_CACHE_SIZE = int(os.getenv('USERNAME_ID_CACHE_SIZE', 100000))  # 用户名Id缓存条数
     
     # Nostr配置
     NOSTR_RELAY_URLS = ['ws://your-relay-url']
     NOSTR_PRIVATE_KEY = os.getenv('NOSTR_PRIVATE_KEY', 'your-private-key')
+    NOSTR_BACKEND = os.getenv('NOSTR_BACKEND', 'asyncio')  # 中继传输后端: asyncio / pynostr
+    NOSTR_PUBLISH_BATCH_SIZE = int(os.getenv('NOSTR_PUBLISH_BATCH_SIZE', 200))  # 每次从 outbox 领取的数量
+    NOSTR_PUBLISH_LINGER_SECONDS = float(os.getenv('NOSTR_PUBLISH_LINGER_SECONDS', 0.5))  # 被唤醒后等待合并新数据的时间
+    NOSTR_PUBLISH_MAX_DELAY = float(os.getenv('NOSTR_PUBLISH_MAX_DELAY', 30))  # 没有新数据时检查 outbox 的最长间隔(秒)
+    NOSTR_OUTBOX_LEASE_SECONDS = int(os.getenv('NOSTR_OUTBOX_LEASE_SECONDS', 300))  # 领取租约时长
+    NOSTR_PUBLISH_WINDOW = int(os.getenv('NOSTR_PUBLISH_WINDOW', 500))  # 每个中继同时等待 OK 的事件数上限
+    NOSTR_PUBLISH_INITIAL_WINDOW = int(os.getenv('NOSTR_PUBLISH_INITIAL_WINDOW', 50))  # 自适应窗口的初始值
+    NOSTR_PUBLISH_MIN_WINDOW = int(os.getenv('NOSTR_PUBLISH_MIN_WINDOW', 4))  # 自适应窗口的下限
+    NOSTR_OK_TIMEOUT = float(os.getenv('NOSTR_OK_TIMEOUT', 10))  # 等待单个事件 OK 的超时(秒)
+    NOSTR_CONNECT_TIMEOUT = float(os.getenv('NOSTR_CONNECT_TIMEOUT', 10))  # 连接中继的超时(秒)
+    NOSTR_SIGN_WORKERS = int(os.getenv('NOSTR_SIGN_WORKERS', os.cpu_count() or 1))  # 签名进程数, 0 表示当前进程内签名
+    NOSTR_SIGN_MIN_CHUNK_SIZE = int(os.getenv('NOSTR_SIGN_MIN_CHUNK_SIZE', 32))  # 分发到签名进程的最小批量
+    NOSTR_ACK_FLUSH_SIZE = int(os.getenv('NOSTR_ACK_FLUSH_SIZE', 300))  # 累计多少条发布确认后批量写库
+    NOSTR_SIGNED_CACHE_SIZE = int(os.getenv('NOSTR_SIGNED_CACHE_SIZE', 50000))  # 已签名事件缓存条数, 重试时复用
+    NOSTR_REF_CACHE_SIZE = int(os.getenv('NOSTR_REF_CACHE_SIZE', 100000))  # 被引用消息事件Id缓存条数
+    NOSTR_DIGEST_CHANNELS = {int(channel_id) for channel_id in os.getenv('NOSTR_DIGEST_CHANNELS', '').split(',')
+                             if channel_id.strip()}  # 按时间窗口汇总发布的频道ID, 逗号分隔
+    NOSTR_DIGEST_WINDOW_SECONDS = int(os.getenv('NOSTR_DIGEST_WINDOW_SECONDS', 3600))  # 汇总时间窗口(秒)
+    NOSTR_DIGEST_CHUNK_BYTES = int(os.getenv('NOSTR_DIGEST_CHUNK_BYTES', 32768))  # 单个汇总块 content 的最大字节数
+    NOSTR_DIGEST_KIND = int(os.getenv('NOSTR_DIGEST_KIND', 30078))  # 汇总事件类型 (NIP-33 参数化可替换事件)
+    NOSTR_RECONCILE_PAGE_SIZE = int(os.getenv('NOSTR_RECONCILE_PAGE_SIZE', 500))  # 对账时每个 REQ 的 limit
+    NOSTR_RECONCILE_WINDOW_SECONDS = int(os.getenv('NOSTR_RECONCILE_WINDOW_SECONDS', 3600))  # 对账时间窗口
+    NOSTR_REPUBLISH_CHUNK_SIZE = int(os.getenv('NOSTR_REPUBLISH_CHUNK_SIZE', 200))  # 补发历史数据时每块的互动数
+    NOSTR_REPUBLISH_CONCURRENCY = int(os.getenv('NOSTR_REPUBLISH_CONCURRENCY', 4))  # 补发时同时在途的块数
+    NOSTR_REPUBLISH_PROGRESS_SECONDS = float(os.getenv('NOSTR_REPUBLISH_PROGRESS_SECONDS', 10))  # 补发进度日志间隔(秒)
+    NOSTR_RETRY_DELAY_SECONDS = int(os.getenv('NOSTR_RETRY_DELAY_SECONDS', 15))  # 发布失败后首次重试的退避基数(秒)
+    NOSTR_RETRY_MAX_DELAY_SECONDS = int(os.getenv('NOSTR_RETRY_MAX_DELAY_SECONDS', 3600))  # 重试退避上限(秒)
+    NOSTR_MAX_ATTEMPTS = int(os.getenv('NOSTR_MAX_ATTEMPTS', 10))  # 超过后转入死信表
+    NOSTR_RELAY_BACKOFF_BASE = float(os.getenv('NOSTR_RELAY_BACKOFF_BASE', 1))  # 中继重连退避基数(秒)
+    NOSTR_RELAY_BACKOFF_MAX = float(os.getenv('NOSTR_RELAY_BACKOFF_MAX', 300))  # 中继重连退避上限(秒)
+    NOSTR_RELAY_DEGRADED_LATENCY = float(os.getenv('NOSTR_RELAY_DEGRADED_LATENCY', 2))  # 平均 OK 延迟超过该值视为降级(秒)
+    NOSTR_RELAY_LATENCY_WINDOW = int(os.getenv('NOSTR_RELAY_LATENCY_WINDOW', 200))  # 滚动延迟统计的样本数
+    NOSTR_RELAY_TARGET_LATENCY = float(os.getenv('NOSTR_RELAY_TARGET_LATENCY', 1))  # OK 延迟超过该值时缩小窗口(秒)
+    NOSTR_RELAY_MAX_RATE = float(os.getenv('NOSTR_RELAY_MAX_RATE', 0))  # 每个中继每秒发送事件数上限, 0 表示收到限流前不限
+    NOSTR_RELAY_MIN_RATE = float(os.getenv('NOSTR_RELAY_MIN_RATE', 5))  # 限流后降速的下限(事件/秒)
+    NOSTR_RELAY_RATE_INCREASE = float(os.getenv('NOSTR_RELAY_RATE_INCREASE', 50))  # 无限流时每秒增加的速率(事件/秒)
+
+    # 数据保留配置
+    RETENTION_INTERVAL_HOURS = int(os.getenv('RETENTION_INTERVAL_HOURS', 6))  # 过期数据清理间隔
+    RETENTION_DELETE_BATCH_SIZE = int(os.getenv('RETENTION_DELETE_BATCH_SIZE', 5000))  # 每批删除行数
+    PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', 3))  # 预建未来分区月数
 
     # API配置
+    API_HOST = os.getenv('API_HOST', '0.0.0.0')
     API_PORT = int(os.getenv('API_PORT', 8888))
+    API_SERVER = os.getenv('API_SERVER', 'gunicorn')  # gunicorn: 多进程生产模式; flask: Werkzeug 开发服务器
+    API_WORKERS = int(os.getenv('API_WORKERS', (os.cpu_count() or 1) * 2 + 1))  # gunicorn worker 进程数
+    API_THREADS = int(os.getenv('API_THREADS', 4))  # 每个 worker 的线程数, 大于 1 时使用 gthread
+    API_TIMEOUT = int(os.getenv('API_TIMEOUT', 60))  # worker 无响应超过该时间被重启(秒)
+    API_GRACEFUL_TIMEOUT = int(os.getenv('API_GRACEFUL_TIMEOUT', 30))  # 重载/停止时等待在途请求的时间(秒)
+    API_KEEPALIVE = int(os.getenv('API_KEEPALIVE', 5))  # keep-alive 连接空闲时间(秒)
+    API_MAX_REQUESTS = int(os.getenv('API_MAX_REQUESTS', 0))  # worker 处理该数量请求后重启, 0 表示不重启
+    API_MAX_REQUESTS_JITTER = int(os.getenv('API_MAX_REQUESTS_JITTER', 0))  # 重启请求数的随机偏移
+    API_PRELOAD_APP = os.getenv('API_PRELOAD_APP', 'false').lower() == 'true'  # master 预加载应用, 开启后 HUP 不重新加载代码
+    API_PID_FILE = os.getenv('API_PID_FILE', os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'gunicorn.pid'))  # gunicorn master pid 文件
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 5))  # 统计接口响应缓存时间(秒), 0 表示不缓存
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 10000))  # 进程内缓存条数上限
+    REDIS_URL = os.getenv('REDIS_URL', '')  # 设置后响应缓存放在 Redis 中, 各进程共享, 如 redis://localhost:6379/0
+    ETAG_MAX_AGE = int(os.getenv('ETAG_MAX_AGE', 60))  # 结果随时间变化的接口 (频道总数按过期时间截止) ETag 的最长有效时间(秒)
+    STATS_BATCH_MAX_IDS = int(os.getenv('STATS_BATCH_MAX_IDS', 1000))  # 批量统计接口每次请求的用户和频道ID总数上限
+    RESPONSE_COMPRESS_MIN_SIZE = int(os.getenv('RESPONSE_COMPRESS_MIN_SIZE', 1024))  # 响应体超过该字节数时压缩, 0 表示不压缩
+    RESPONSE_GZIP_LEVEL = int(os.getenv('RESPONSE_GZIP_LEVEL', 6))  # gzip 压缩级别 (1-9)
+    RESPONSE_BROTLI_QUALITY = int(os.getenv('RESPONSE_BROTLI_QUALITY', 5))  # brotli 压缩质量 (0-11), 需安装 brotli
     
     # 安全配置
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key')
@@ -1,6 +1,9 @@
 import discord
+import importlib.util
+import os
 import requests
 import socket
+import sys
 from app import create_app
 from config.config import Config
 from utils.logger import Logger
@@ -62,15 +65,32 @@ def run_discord_collector():
         raise e
 
 
+def run_gunicorn():
+    """
+    gunicorn 多进程服务, kill -HUP <logs/gunicorn.pid> 平滑重载 worker; gunicorn 不可用 (如 Windows) 时返回 False
+
+    当前进程已导入 app 和 config, 替换为全新的解释器运行 master, 重载时 worker 才能导入新代码.
+    """
+    if importlib.util.find_spec('gunicorn') is None or not hasattr(os, 'fork'):
+        logger.warning("gunicorn unavailable, falling back to Flask development server")
+        return False
+    logger.info("Starting gunicorn master")
+    # python -m 从当前目录查找 wsgi_server
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    os.execv(sys.executable, [sys.executable, '-m', 'wsgi_server'])
+
+
 def run_flask_app():
     """运行 Flask 应用"""
     try:
+        if Config.API_SERVER == 'gunicorn' and run_gunicorn():
+            return
         app = create_app(Config)
         #host = get_local_ip()  # 获取本机IP
         # 注册服务时使用实际IP
         #register_service(host)
         # 启动应用
-        app.run(host='0.0.0.0', port=Config.API_PORT)  # 仍然监听所有接口
+        app.run(host=Config.API_HOST, port=Config.API_PORT)  # 仍然监听所有接口
     except Exception as e:
         logger.error(f"Failed to start Flask app: {str(e)}")
         raise e
@@ -8,6 +8,16 @@ if [ ! -d "$project_path/logs" ]; then
     mkdir -p "$project_path/logs"
 fi
 
+# Graceful reload of the API workers: sh restart.sh reload
+pid_file="$project_path/logs/gunicorn.pid"
+if [ "$1" = "reload" ]; then
+    if [ -f "$pid_file" ] && kill -HUP "$(cat "$pid_file")" 2>/dev/null; then
+        echo "Sent HUP to gunicorn master $(cat "$pid_file"), workers are reloading gracefully"
+        exit 0
+    fi
+    echo "gunicorn master not running, restarting all processes"
+fi
+
 # Kill all Python processes containing 'main'
 ps aux | grep python3 | grep main | grep -v grep | awk '{print $2}' | xargs -r kill -9
 
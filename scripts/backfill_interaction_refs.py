@@ -0,0 +1,130 @@
+"""
+从旧的 note 字段回填 ref_message_id / ref_channel_id / reaction_emoji
+
+旧版本把引用信息以 str(dict) 写入 note, 其中点赞记录的 emoji 是 PartialEmoji 的 repr,
+无法用 json/ast 直接解析, 因此解析失败时退回到正则提取.
+按 interaction_id 分批处理, 中断后可重复执行
+(前置条件: 已执行 sql/migrations/004_interaction_ref_columns.sql).
+
+用法:
+    python -m scripts.backfill_interaction_refs --batch-size 2000
+"""
+import argparse
+import ast
+import re
+from typing import Any, Dict, Optional
+
+from sqlalchemy import bindparam
+
+from app.models.database import get_db
+from app.models.models import Interaction
+from utils.logger import Logger
+
+logger = Logger('backfill_interaction_refs')
+
+_ID_PATTERNS = {
+    'message_id': re.compile(r"'message_id':\s*(\d+)"),
+    'channel_id': re.compile(r"'channel_id':\s*(\d+)"),
+}
+_EMOJI_PATTERN = re.compile(r"<PartialEmoji animated=(True|False) name='((?:[^'\\]|\\.)*)' id=(\d+|None)>")
+
+
+def parse_legacy_note(note: str) -> Optional[Dict[str, Any]]:
+    """解析旧 note, 返回 {'message_id', 'channel_id', 'emoji'}; 无引用信息时返回 None"""
+    if not note:
+        return None
+
+    try:
+        data = ast.literal_eval(note)
+        if isinstance(data, dict):
+            return {
+                'message_id': data.get('message_id'),
+                'channel_id': data.get('channel_id'),
+                'emoji': str(data['emoji']) if data.get('emoji') else None
+            }
+    except (ValueError, SyntaxError):
+        pass
+
+    result = {}
+    for key, pattern in _ID_PATTERNS.items():
+        match = pattern.search(note)
+        result[key] = int(match.group(1)) if match else None
+
+    emoji = None
+    match = _EMOJI_PATTERN.search(note)
+    if match:
+        animated, name, emoji_id = match.groups()
+        # 与 str(PartialEmoji) 保持一致: 自定义表情为 <:name:id>, 否则为 unicode 字符本身
+        if emoji_id != 'None':
+            emoji = f"<{'a' if animated == 'True' else ''}:{name}:{emoji_id}>"
+        else:
+            emoji = name
+    result['emoji'] = emoji
+
+    if result['message_id'] is None and result['channel_id'] is None:
+        return None
+    return result
+
+
+def backfill(batch_size: int) -> int:
+    table = Interaction.__table__
+    statement = table.update() \
+        .where(table.c.interaction_id == bindparam('b_interaction_id')) \
+        .values(ref_message_id=bindparam('b_ref_message_id'),
+                ref_channel_id=bindparam('b_ref_channel_id'),
+                reaction_emoji=bindparam('b_reaction_emoji'))
+
+    db = next(get_db())
+    try:
+        last_id = 0
+        updated = 0
+        while True:
+            rows = db.query(Interaction.interaction_id, Interaction.note) \
+                .filter(Interaction.interaction_id > last_id) \
+                .filter(Interaction.note.isnot(None), Interaction.note != '') \
+                .filter(Interaction.ref_message_id.is_(None)) \
+                .order_by(Interaction.interaction_id) \
+                .limit(batch_size) \
+                .all()
+            if not rows:
+                break
+            last_id = rows[-1].interaction_id
+
+            params = []
+            for row in rows:
+                refs = parse_legacy_note(row.note)
+                if refs is None:
+                    logger.warning(f"Unparseable note on interaction {row.interaction_id}: {row.note!r}")
+                    continue
+                params.append({
+                    'b_interaction_id': row.interaction_id,
+                    'b_ref_message_id': refs['message_id'],
+                    'b_ref_channel_id': refs['channel_id'],
+                    'b_reaction_emoji': refs['emoji'][:64] if refs['emoji'] else None
+                })
+
+            try:
+                if params:
+                    db.execute(statement, params)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+
+            updated += len(params)
+            logger.info(f"Backfilled {updated} interactions (last id {last_id})")
+        return updated
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill typed reference columns from legacy note values')
+    parser.add_argument('--batch-size', type=int, default=2000)
+    args = parser.parse_args()
+    updated = backfill(args.batch_size)
+    logger.info(f"Finished, {updated} interactions backfilled")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+discord_interaction 紧凑行格式在线迁移工具
+
+按 interaction_id 区间分批回填, 每批一个短事务, 中断后可重复执行
+(前置条件: 已执行 sql/migrations/002_compact_layout_prepare.sql):
+  - usernames: 写入 discord_user / discord_user_name_history 并回填 username_id
+  - event_ids: 将十六进制 nostr_event_id 转换到 BINARY(32) 的 nostr_event_id_bin
+
+用法:
+    python -m scripts.migrate_compact_layout --step all --batch-size 5000 --sleep 0.05
+"""
+import argparse
+import time
+
+from sqlalchemy import text
+
+from app.models.database import get_db
+from utils.logger import Logger
+
+logger = Logger('migrate_compact_layout')
+
+STEPS = {
+    'usernames': [
+        """
+        INSERT IGNORE INTO discord_user_name_history (user_id, username)
+        SELECT DISTINCT user_id, username COLLATE utf8mb4_bin FROM discord_interaction
+        WHERE interaction_id BETWEEN :start AND :end AND username_id IS NULL
+        """,
+        # 按区间顺序执行, 每个用户保留区间内最后一条记录的用户名
+        """
+        INSERT INTO discord_user (user_id, username)
+        SELECT i.user_id, i.username FROM discord_interaction i
+        JOIN (
+            SELECT user_id, MAX(interaction_id) AS max_id FROM discord_interaction
+            WHERE interaction_id BETWEEN :start AND :end
+            GROUP BY user_id
+        ) latest ON latest.max_id = i.interaction_id
+        ON DUPLICATE KEY UPDATE username = VALUES(username), last_seen_at = now()
+        """,
+        """
+        UPDATE discord_interaction i
+        JOIN discord_user_name_history h ON h.user_id = i.user_id AND h.username = i.username COLLATE utf8mb4_bin
+        SET i.username_id = h.id
+        WHERE i.interaction_id BETWEEN :start AND :end AND i.username_id IS NULL
+        """
+    ],
+    'event_ids': [
+        """
+        UPDATE discord_interaction SET nostr_event_id_bin = UNHEX(nostr_event_id)
+        WHERE interaction_id BETWEEN :start AND :end
+          AND nostr_event_id_bin IS NULL AND LENGTH(nostr_event_id) = 64
+        """
+    ]
+}
+
+
+def run_step(name: str, batch_size: int, sleep_seconds: float) -> int:
+    """按 interaction_id 区间分批执行迁移步骤, 返回影响的行数"""
+    statements = [text(sql) for sql in STEPS[name]]
+    db = next(get_db())
+    try:
+        min_id, max_id = db.execute(text(
+            "SELECT MIN(interaction_id), MAX(interaction_id) FROM discord_interaction"
+        )).fetchone()
+        if min_id is None:
+            logger.info(f"[{name}] discord_interaction is empty, nothing to migrate")
+            return 0
+
+        affected = 0
+        started = time.monotonic()
+        for start in range(min_id, max_id + 1, batch_size):
+            end = min(start + batch_size - 1, max_id)
+            try:
+                for statement in statements:
+                    affected += db.execute(statement, {'start': start, 'end': end}).rowcount
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+
+            elapsed = time.monotonic() - started
+            logger.info(f"[{name}] {end}/{max_id} ids processed, {affected} rows affected, "
+                        f"{(end - min_id + 1) / max(elapsed, 1e-6):.0f} ids/s")
+            if sleep_seconds:
+                # 让出 IO 给线上写入
+                time.sleep(sleep_seconds)
+        return affected
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate discord_interaction to the compact row layout')
+    parser.add_argument('--step', choices=list(STEPS) + ['all'], default='all')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--sleep', type=float, default=0.05, help='seconds to pause between batches')
+    args = parser.parse_args()
+
+    steps = list(STEPS) if args.step == 'all' else [args.step]
+    for step in steps:
+        affected = run_step(step, args.batch_size, args.sleep)
+        logger.info(f"[{step}] finished, {affected} rows affected")
+
+
+if __name__ == '__main__':
+    main()
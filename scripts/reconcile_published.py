@@ -0,0 +1,44 @@
+"""
+Nostr 发布状态对账
+
+从中继分页拉取本节点在时间范围内发布的事件, 匹配回 is_published = 0 的互动记录并批量标记为已发布,
+同时删除对应的 outbox 记录. 用于发布进程在发布后、写库前退出的故障恢复.
+
+用法:
+    python -m scripts.reconcile_published --since 2024-06-01 --until 2024-06-02 --window-hours 1
+"""
+import argparse
+import asyncio
+from datetime import datetime
+
+from app.services.pynostr_sync import NostrSync
+from app.services.reconcile_service import ReconcileService
+from config.config import Config
+from utils.logger import Logger
+
+logger = Logger('reconcile_published')
+
+
+async def reconcile(since: datetime, until: datetime, window_hours: float, page_size: int):
+    nostr_sync = NostrSync(Config.NOSTR_RELAY_URLS, Config.NOSTR_PRIVATE_KEY)
+    try:
+        service = ReconcileService(nostr_sync, page_size=page_size, window_seconds=int(window_hours * 3600))
+        return await service.run(since, until)
+    finally:
+        await nostr_sync.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mark interactions already present on relays as published')
+    parser.add_argument('--since', type=datetime.fromisoformat, required=True, help='UTC, e.g. 2024-06-01T00:00')
+    parser.add_argument('--until', type=datetime.fromisoformat, default=None, help='UTC, defaults to now')
+    parser.add_argument('--window-hours', type=float, default=Config.NOSTR_RECONCILE_WINDOW_SECONDS / 3600)
+    parser.add_argument('--page-size', type=int, default=Config.NOSTR_RECONCILE_PAGE_SIZE)
+    args = parser.parse_args()
+
+    result = asyncio.run(reconcile(args.since, args.until, args.window_hours, args.page_size))
+    logger.info(f"Finished: {result}")
+
+
+if __name__ == '__main__':
+    main()
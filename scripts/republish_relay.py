@@ -0,0 +1,48 @@
+"""
+向单个中继补发历史数据
+
+新增中继 (加入 NOSTR_RELAY_URLS) 后, outbox 只会发布新数据; 该脚本把已发布但还没有投递到该中继的互动
+按块重新发布过去, 投递记录写入 discord_nostr_relay_delivery, 进度写入 discord_nostr_republish_checkpoint,
+中断后再次执行会从检查点继续 (前置条件: 已执行 sql/migrations/008_nostr_relay_delivery.sql).
+
+用法:
+    python -m scripts.republish_relay --relay wss://new-relay.example --chunk-size 200 --concurrency 4
+    python -m scripts.republish_relay --relay wss://new-relay.example --from-id 0  # 忽略检查点, 重新扫描
+"""
+import argparse
+import asyncio
+from typing import Optional
+
+from app.services.nostr_backend import create_backend
+from app.services.pynostr_sync import NostrSync
+from app.services.republish_service import RepublishService
+from config.config import Config
+from utils.logger import Logger
+
+logger = Logger('republish_relay')
+
+
+async def republish(relay_url: str, chunk_size: int, concurrency: int, from_id: Optional[int]):
+    nostr_sync = NostrSync([relay_url], Config.NOSTR_PRIVATE_KEY, backend=create_backend([relay_url]))
+    try:
+        service = RepublishService(nostr_sync, relay_url, chunk_size=chunk_size, concurrency=concurrency)
+        return await service.run(from_id)
+    finally:
+        await nostr_sync.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Republish stored interactions to a single relay')
+    parser.add_argument('--relay', required=True, help='relay url, e.g. wss://relay.example')
+    parser.add_argument('--chunk-size', type=int, default=Config.NOSTR_REPUBLISH_CHUNK_SIZE)
+    parser.add_argument('--concurrency', type=int, default=Config.NOSTR_REPUBLISH_CONCURRENCY)
+    parser.add_argument('--from-id', type=int, default=None,
+                        help='start after this interaction id instead of the saved checkpoint')
+    args = parser.parse_args()
+
+    result = asyncio.run(republish(args.relay, args.chunk_size, args.concurrency, args.from_id))
+    logger.info(f"Finished: {result}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,22 +4,38 @@ create table discord_interaction
     message_id          bigint                     not null comment '消息Id',
     channel_id          bigint                     not null comment '频道Id',
     user_id             bigint                     not null comment '用户Id',
-    username            varchar(256)               not null comment '用户名',
+    username_id         int                        null comment '用户名Id (discord_user_name_history.id)',
     interaction_content text                       not null comment '发言内容',
     interaction_time    timestamp                  not null comment '发言时间',
     post_time           timestamp                  not null comment '帖子发布时间',
     collect_time        timestamp    default now() not null comment '采集时间',
-    note                varchar(256) null comment '备注',
+    note                varchar(256) null comment '备注 (已废弃, 由 ref_* 字段替代)',
+    ref_message_id      bigint                     null comment '引用消息Id (回复/转发/点赞的目标消息)',
+    ref_channel_id      bigint                     null comment '引用消息所在频道Id',
+    reaction_emoji      varchar(64)                null comment '点赞表情',
     type                tinyint(1)              not null comment '发言类型 (1:文字 | 2:点赞 ｜ 转发)',
     is_published        tinyint(1)              not null comment '是否已发布 (1:已发布 | 0:未发布)',
-    nostr_event_id      varchar(256) default '' null comment 'Nostr Event Id',
+    nostr_event_id      binary(32)                 null comment 'Nostr Event Id',
     constraint discord_interaction_pk
-        primary key (interaction_id)
-) comment '发言消息表';
+        primary key (interaction_id, collect_time)
+) comment '发言消息表'
+    -- 按采集时间月度分区, 过期数据整分区 DROP; 新分区由 RetentionService 从 pmax 中拆分
+    partition by range (unix_timestamp(collect_time)) (
+        partition pmax values less than maxvalue
+    );
 
 create index idx_channelId_userId
     on discord_interaction (channel_id, user_id);
 
+create index idx_channelId_collectTime
+    on discord_interaction (channel_id, collect_time);
+
+create index idx_refChannelId_refMessageId
+    on discord_interaction (ref_channel_id, ref_message_id);
+
+create index idx_channelId_messageId
+    on discord_interaction (channel_id, message_id);
+
 
 
 create table discord_channel_collect_log
@@ -56,3 +72,95 @@ create table discord_channel
 create index idx_channelId
     on discord_channel (channel_id);
 
+
+
+create table discord_user
+(
+    user_id       bigint                              not null comment '用户Id'
+        primary key,
+    username      varchar(256)                        not null comment '当前用户名',
+    first_seen_at timestamp default CURRENT_TIMESTAMP not null comment '首次出现时间',
+    last_seen_at  timestamp default CURRENT_TIMESTAMP not null comment '最近出现时间'
+) comment 'Discord用户表';
+
+
+create table discord_user_name_history
+(
+    id            int auto_increment comment '主键'
+        primary key,
+    user_id       bigint                              not null comment '用户Id',
+    username      varchar(256) collate utf8mb4_bin    not null comment '用户名 (区分大小写和重音)',
+    first_seen_at timestamp default CURRENT_TIMESTAMP not null comment '首次出现时间',
+    constraint uk_userId_username
+        unique (user_id, username)
+) comment '用户名历史表';
+
+
+create table discord_nostr_outbox
+(
+    id               bigint auto_increment comment '主键'
+        primary key,
+    interaction_id   int                                 not null comment '互动记录Id',
+    available_at     timestamp default CURRENT_TIMESTAMP not null comment '可领取时间',
+    lease_owner      varchar(64)                         null comment '领取者',
+    lease_expires_at timestamp                           null comment '租约过期时间',
+    attempts         int       default 0                 not null comment '领取次数',
+    create_at        timestamp default CURRENT_TIMESTAMP not null comment '创建时间',
+    constraint uk_interactionId
+        unique (interaction_id)
+) comment 'Nostr待发布队列';
+
+create index idx_availableAt
+    on discord_nostr_outbox (available_at);
+
+
+create table discord_nostr_dead_letter
+(
+    id             bigint auto_increment comment '主键'
+        primary key,
+    interaction_id int                                 not null comment '互动记录Id',
+    attempts       int       default 0                 not null comment '领取次数',
+    last_error     varchar(512)                        null comment '最后一次失败原因',
+    create_at      timestamp default CURRENT_TIMESTAMP not null comment '创建时间',
+    constraint uk_interactionId
+        unique (interaction_id)
+) comment 'Nostr发布死信表';
+
+
+create table discord_nostr_relay_delivery
+(
+    id             bigint auto_increment comment '主键'
+        primary key,
+    relay_url      varchar(255)                        not null comment '中继地址',
+    interaction_id int                                 not null comment '互动记录Id',
+    nostr_event_id binary(32)                          null comment 'Nostr事件ID',
+    delivered_at   timestamp default CURRENT_TIMESTAMP not null comment '确认时间',
+    constraint uk_relayUrl_interactionId
+        unique (relay_url, interaction_id)
+) comment 'Nostr中继投递记录';
+
+create index idx_interactionId
+    on discord_nostr_relay_delivery (interaction_id);
+
+create table discord_nostr_republish_checkpoint
+(
+    id                  int auto_increment comment '主键'
+        primary key,
+    relay_url           varchar(255)                        not null comment '中继地址',
+    last_interaction_id int       default 0                 not null comment '已处理到的互动记录Id',
+    delivered           bigint    default 0                 not null comment '累计确认数',
+    failed              bigint    default 0                 not null comment '累计失败数',
+    update_at           timestamp default CURRENT_TIMESTAMP not null on update CURRENT_TIMESTAMP comment '更新时间',
+    constraint uk_relayUrl
+        unique (relay_url)
+) comment 'Nostr中继补发进度';
+
+
+create table discord_data_version
+(
+    scope_type varchar(16)                         not null comment '作用域类型 (channel/user/channels/interactions/retention)',
+    scope_id   bigint    default 0                 not null comment '频道Id/用户Id, 全局作用域为 0',
+    version    bigint    default 0                 not null comment '版本号',
+    update_at  timestamp default CURRENT_TIMESTAMP not null on update CURRENT_TIMESTAMP comment '更新时间',
+    primary key (scope_type, scope_id)
+) comment '数据版本';
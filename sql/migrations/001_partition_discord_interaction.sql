@@ -0,0 +1,20 @@
+-- discord_interaction 改为按 collect_time 月度分区
+--
+-- 分区键必须包含在主键中, 因此主键调整为 (interaction_id, collect_time).
+-- 该 ALTER 会重建整张表 (ALGORITHM=COPY), 请在低峰期执行, 大表建议使用 pt-online-schema-change / gh-ost.
+-- 执行前把下面的月份调整为现有数据覆盖的范围, 之后的分区由 RetentionService 自动维护.
+-- 分区按 UTC 月份划分, 上界写 UTC 时间戳 (UNIX_TIMESTAMP('...') 会按会话时区解释字符串).
+
+alter table discord_interaction
+    drop primary key,
+    add primary key (interaction_id, collect_time);
+
+create index idx_channelId_collectTime
+    on discord_interaction (channel_id, collect_time);
+
+alter table discord_interaction
+    partition by range (unix_timestamp(collect_time)) (
+        partition p202609 values less than (1790812800), -- 2026-10-01 00:00:00 UTC
+        partition p202610 values less than (1793491200), -- 2026-11-01 00:00:00 UTC
+        partition pmax values less than maxvalue
+    );
@@ -0,0 +1,31 @@
+-- 紧凑行格式 (第一步): 新增用户维度表和新列, 旧版本服务可继续运行
+--
+-- 完整流程:
+--   1. 执行本脚本
+--   2. python -m scripts.migrate_compact_layout  (在线分批回填, 可重复执行)
+--   3. 停止服务, 再执行一次 python -m scripts.migrate_compact_layout 补齐尾部数据
+--   4. 执行 003_compact_layout_finalize.sql, 部署新版本并启动服务
+
+create table discord_user
+(
+    user_id       bigint                              not null comment '用户Id'
+        primary key,
+    username      varchar(256)                        not null comment '当前用户名',
+    first_seen_at timestamp default CURRENT_TIMESTAMP not null comment '首次出现时间',
+    last_seen_at  timestamp default CURRENT_TIMESTAMP not null comment '最近出现时间'
+) comment 'Discord用户表';
+
+create table discord_user_name_history
+(
+    id            int auto_increment comment '主键'
+        primary key,
+    user_id       bigint                              not null comment '用户Id',
+    username      varchar(256) collate utf8mb4_bin    not null comment '用户名 (区分大小写和重音)',
+    first_seen_at timestamp default CURRENT_TIMESTAMP not null comment '首次出现时间',
+    constraint uk_userId_username
+        unique (user_id, username)
+) comment '用户名历史表';
+
+alter table discord_interaction
+    add column username_id int null comment '用户名Id (discord_user_name_history.id)' after user_id,
+    add column nostr_event_id_bin binary(32) null comment 'Nostr Event Id';
@@ -0,0 +1,6 @@
+-- 紧凑行格式 (第二步): 回填完成且服务停止后执行, 删除宽列并切换到 binary 事件ID
+
+alter table discord_interaction
+    drop column username,
+    drop column nostr_event_id,
+    rename column nostr_event_id_bin to nostr_event_id;
@@ -0,0 +1,10 @@
+-- 用结构化的引用字段替代 note 中的字符串化字典
+-- 执行后运行 python -m scripts.backfill_interaction_refs 从旧 note 回填
+
+alter table discord_interaction
+    add column ref_message_id bigint null comment '引用消息Id (回复/转发/点赞的目标消息)' after note,
+    add column ref_channel_id bigint null comment '引用消息所在频道Id' after ref_message_id,
+    add column reaction_emoji varchar(64) null comment '点赞表情' after ref_channel_id;
+
+create index idx_refChannelId_refMessageId
+    on discord_interaction (ref_channel_id, ref_message_id);
@@ -0,0 +1,22 @@
+-- Nostr 发布改为 transactional outbox: 互动记录写入时同一事务写入 outbox, 发布确认后删除
+
+create table discord_nostr_outbox
+(
+    id               bigint auto_increment comment '主键'
+        primary key,
+    interaction_id   int                                 not null comment '互动记录Id',
+    available_at     timestamp default CURRENT_TIMESTAMP not null comment '可领取时间',
+    lease_owner      varchar(64)                         null comment '领取者',
+    lease_expires_at timestamp                           null comment '租约过期时间',
+    attempts         int       default 0                 not null comment '领取次数',
+    create_at        timestamp default CURRENT_TIMESTAMP not null comment '创建时间',
+    constraint uk_interactionId
+        unique (interaction_id)
+) comment 'Nostr待发布队列';
+
+create index idx_availableAt
+    on discord_nostr_outbox (available_at);
+
+-- 将存量未发布的互动加入 outbox (一次性全表扫描, 请在低峰期执行)
+insert ignore into discord_nostr_outbox (interaction_id)
+select interaction_id from discord_interaction where is_published = 0 order by interaction_id;
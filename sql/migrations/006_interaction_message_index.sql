@@ -0,0 +1,4 @@
+-- 按 (channel_id, message_id) 批量查询被引用消息的 Nostr 事件Id
+
+create index idx_channelId_messageId
+    on discord_interaction (channel_id, message_id);
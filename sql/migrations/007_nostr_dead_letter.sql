@@ -0,0 +1,14 @@
+-- 重试耗尽或被中继永久拒绝的发布记录从 outbox 转入死信表
+-- 排查后可重新入队: insert ignore into discord_nostr_outbox (interaction_id) select interaction_id from discord_nostr_dead_letter;
+
+create table discord_nostr_dead_letter
+(
+    id             bigint auto_increment comment '主键'
+        primary key,
+    interaction_id int                                 not null comment '互动记录Id',
+    attempts       int       default 0                 not null comment '领取次数',
+    last_error     varchar(512)                        null comment '最后一次失败原因',
+    create_at      timestamp default CURRENT_TIMESTAMP not null comment '创建时间',
+    constraint uk_interactionId
+        unique (interaction_id)
+) comment 'Nostr发布死信表';
@@ -0,0 +1,27 @@
+-- 按中继记录投递状态, 新增中继时用 scripts/republish_relay.py 补发历史数据
+-- is_published 仍表示 "至少一个中继已确认", 投递表记录具体是哪些中继
+
+create table discord_nostr_relay_delivery
+(
+    id             bigint auto_increment comment '主键'
+        primary key,
+    relay_url      varchar(255)                        not null comment '中继地址',
+    interaction_id int                                 not null comment '互动记录Id',
+    nostr_event_id binary(32)                          null comment 'Nostr事件ID',
+    delivered_at   timestamp default CURRENT_TIMESTAMP not null comment '确认时间',
+    constraint uk_relayUrl_interactionId
+        unique (relay_url, interaction_id)
+) comment 'Nostr中继投递记录';
+
+create table discord_nostr_republish_checkpoint
+(
+    id                  int auto_increment comment '主键'
+        primary key,
+    relay_url           varchar(255)                        not null comment '中继地址',
+    last_interaction_id int       default 0                 not null comment '已处理到的互动记录Id',
+    delivered           bigint    default 0                 not null comment '累计确认数',
+    failed              bigint    default 0                 not null comment '累计失败数',
+    update_at           timestamp default CURRENT_TIMESTAMP not null on update CURRENT_TIMESTAMP comment '更新时间',
+    constraint uk_relayUrl
+        unique (relay_url)
+) comment 'Nostr中继补发进度';
@@ -0,0 +1,11 @@
+-- 数据版本, 读接口据此生成弱 ETag, If-None-Match 匹配时返回 304 而不执行统计/分页查询
+-- 互动写入时与互动在同一事务中递增, 过期数据清理和频道增删改后递增
+
+create table discord_data_version
+(
+    scope_type varchar(16)                         not null comment '作用域类型 (channel/user/channels/interactions/retention)',
+    scope_id   bigint    default 0                 not null comment '频道Id/用户Id, 全局作用域为 0',
+    version    bigint    default 0                 not null comment '版本号',
+    update_at  timestamp default CURRENT_TIMESTAMP not null on update CURRENT_TIMESTAMP comment '更新时间',
+    primary key (scope_type, scope_id)
+) comment '数据版本';
@@ -0,0 +1,4 @@
+-- 过期数据清理时按 interaction_id 删除中继投递记录
+
+create index idx_interactionId
+    on discord_nostr_relay_delivery (interaction_id);
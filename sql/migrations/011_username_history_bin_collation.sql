@@ -0,0 +1,5 @@
+-- 用户名历史改为二进制排序规则: 仅大小写或重音不同的用户名 (如 jose / josé) 记为不同的记录
+-- 原排序规则下唯一的数据在二进制排序规则下仍唯一; 此前被合并的变体无法恢复, 只影响之后写入的记录
+
+alter table discord_user_name_history
+    modify column username varchar(256) collate utf8mb4_bin not null comment '用户名 (区分大小写和重音)';
@@ -0,0 +1,115 @@
+"""
+NostrSync 端到端发布基准, 中继使用本地替身 (tests/local_relay.py), 不依赖数据库和外网
+
+    python -m tests.bench_nostr_publish --events 5000 --batch-size 200 --relays 2 --latency 0.02
+    python -m tests.bench_nostr_publish --backend asyncio pynostr
+    python -m tests.bench_nostr_publish --digest
+
+输出每秒确认的互动数、中继收到的事件数、批次延迟和 OK 延迟分位数 (p50/p95/p99, 后端支持时) 以及内存峰值;
+指定多个 --backend 时在相同负载下依次运行, 便于对比.
+"""
+import argparse
+import asyncio
+import resource
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from pynostr.key import PrivateKey
+
+from app.services.nostr_backend import create_backend
+from config.config import Config
+from tests.factories import MemoryNostrSync, make_interactions
+from tests.local_relay import LocalRelay
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def format_percentiles(values) -> str:
+    if not values:
+        return 'n/a'
+    return (f"p50={percentile(values, 0.5) * 1000:.1f}ms p95={percentile(values, 0.95) * 1000:.1f}ms "
+            f"p99={percentile(values, 0.99) * 1000:.1f}ms")
+
+
+async def run_backend(args, backend_name: str) -> None:
+    relays = [
+        await LocalRelay(latency=args.latency, drop_rate=args.drop_rate, reject_rate=args.reject_rate,
+                         rate_limit=args.rate_limit).start()
+        for _ in range(args.relays)
+    ]
+    relay_urls = [relay.url for relay in relays]
+    backend = create_backend(relay_urls, backend_name)
+    backend.ok_timeout = args.ok_timeout
+    nostr_sync = MemoryNostrSync(relay_urls, PrivateKey().bech32(), backend=backend)
+    interactions = make_interactions(args.events, start=datetime.now(timezone.utc), step=0, users=50)
+    Config.NOSTR_DIGEST_CHANNELS = {interactions[0].channel_id} if args.digest else set()
+
+    tracemalloc.start()
+    confirmed = 0
+    batch_latencies = []
+    start = time.perf_counter()
+    try:
+        # --repeat > 1 时重复发布同一批互动, 模拟重试
+        for _ in range(args.repeat):
+            for offset in range(0, len(interactions), args.batch_size):
+                batch_start = time.perf_counter()
+                batch_confirmed, _ = await nostr_sync.sync_interactions(
+                    None, interactions[offset:offset + args.batch_size])
+                batch_latencies.append(time.perf_counter() - batch_start)
+                confirmed += len(batch_confirmed)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        health = backend.relay_health()
+        latencies = backend.ok_latencies()
+    finally:
+        tracemalloc.stop()
+        await nostr_sync.close()
+        for relay in relays:
+            await relay.stop()
+
+    print(f"[{backend_name}] events={args.events} batch_size={args.batch_size} relays={args.relays} "
+          f"latency={args.latency}s drop={args.drop_rate} reject={args.reject_rate} rate_limit={args.rate_limit}")
+    print(f"confirmed: {confirmed}/{args.events * args.repeat} in {elapsed:.2f}s -> {confirmed / elapsed:.0f} events/s, "
+          f"relay events: {sum(relay.received for relay in relays)}")
+    print(f"batch latency: {format_percentiles(batch_latencies)}")
+    print(f"signing: {dict(getattr(nostr_sync, 'sign_stats', {}))}")
+    print(f"OK latency: {format_percentiles(latencies)}")
+    print(f"memory: traced peak={peak / 1024 / 1024:.1f}MiB "
+          f"maxrss={resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f}MiB")
+    for item in health:
+        print(f"  {item['url']}: {item['state']} rejections={item['rejections']}")
+
+
+async def run(args) -> None:
+    # 保留全部延迟样本用于计算分位数
+    Config.NOSTR_RELAY_LATENCY_WINDOW = args.events
+    Config.NOSTR_SIGN_WORKERS = args.sign_workers
+    for backend_name in args.backend:
+        await run_backend(args, backend_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='NostrSync 发布基准 (本地中继)')
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=Config.NOSTR_PUBLISH_BATCH_SIZE)
+    parser.add_argument('--relays', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.0, help='中继回 OK 前的延迟(秒)')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='不回 OK 的比例')
+    parser.add_argument('--reject-rate', type=float, default=0.0, help='回 OK false 的比例')
+    parser.add_argument('--rate-limit', type=int, default=0, help='中继每个连接每秒接受的事件数, 0 表示不限')
+    parser.add_argument('--ok-timeout', type=float, default=Config.NOSTR_OK_TIMEOUT)
+    parser.add_argument('--sign-workers', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1, help='重复发布同一批互动的轮数 (模拟重试)')
+    parser.add_argument('--digest', action='store_true', help='按频道时间窗口汇总发布')
+    parser.add_argument('--backend', nargs='+', default=[Config.NOSTR_BACKEND], choices=['asyncio', 'pynostr'])
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+签名吞吐基准
+
+    python -m tests.bench_nostr_sign --events 5000 --workers 0 1 2 4
+
+workers 为 0 表示在当前进程内签名; 输出每秒签名事件数及单核吞吐.
+"""
+import argparse
+import os
+import time
+
+from pynostr.key import PrivateKey
+
+from app.services.nostr_signer import BatchSigner
+
+
+def make_events(count: int):
+    now = int(time.time())
+    return [
+        {
+            'content': f'benchmark interaction content {i}',
+            'kind': 1,
+            'tags': [
+                ['t', 'discord'],
+                ['channel_id', '1234567890'],
+                ['user_id', str(1000 + i)],
+                ['created_at', str(now)],
+                ['message_id', str(900000 + i)],
+                ['username', f'user{i}']
+            ],
+            'created_at': now
+        }
+        for i in range(count)
+    ]
+
+
+def run(events: int, workers_list, min_chunk_size: int) -> None:
+    private_key_hex = PrivateKey().hex()
+    unsigned = make_events(events)
+    print(f"{'workers':>8} {'seconds':>9} {'events/s':>10} {'events/s/core':>14}")
+    for workers in workers_list:
+        signer = BatchSigner(private_key_hex, workers=workers, min_chunk_size=min_chunk_size)
+        try:
+            # 预热: 拉起进程池, 不计入耗时
+            signer.sign_batch(unsigned[:min_chunk_size * max(workers, 1) + 1])
+            start = time.perf_counter()
+            signed = signer.sign_batch(unsigned)
+            elapsed = time.perf_counter() - start
+        finally:
+            signer.close()
+        assert len(signed) == events
+        rate = events / elapsed
+        print(f"{workers:>8} {elapsed:>9.3f} {rate:>10.0f} {rate / max(workers, 1):>14.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Nostr 事件签名吞吐基准')
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({0, 1, 2, os.cpu_count() or 1}))
+    parser.add_argument('--min-chunk-size', type=int, default=32)
+    args = parser.parse_args()
+    run(args.events, args.workers, args.min_chunk_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+测试和基准共用的互动记录构造 (字段与 Interaction 一致) 和 NostrSync 替身, 不依赖数据库
+"""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.models.models import InteractionType
+from app.services.pynostr_sync import NostrSync
+
+CHANNEL_ID = 1234567890
+FIRST_MESSAGE_ID = 900000
+START_TIME = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def make_interaction(interaction_id: int, **fields) -> SimpleNamespace:
+    """一条文字互动, fields 覆盖默认值"""
+    values = dict(
+        interaction_id=interaction_id,
+        message_id=FIRST_MESSAGE_ID + interaction_id - 1,
+        channel_id=CHANNEL_ID,
+        user_id=1000,
+        username='user0',
+        interaction_content=f'消息 {interaction_id}',
+        interaction_time=START_TIME,
+        type=InteractionType.MESSAGE.value,
+        ref_message_id=None,
+        ref_channel_id=None,
+        reaction_emoji=None
+    )
+    values.update(fields)
+    return SimpleNamespace(**values)
+
+
+def make_interactions(count: int, offset: int = 0, start: datetime = START_TIME, step: int = 1,
+                      users: int = 7, likes: bool = False, **fields):
+    """
+    interaction_id 为 offset+1 .. offset+count 的互动
+
+    Args:
+        start / step: 第 n 条的互动时间为 start + (offset + n) * step 秒
+        users: 发言用户数, 轮流分配
+        likes: 是否让三分之二的记录为对第一条消息的点赞
+    """
+    interactions = []
+    for n in range(offset, offset + count):
+        like = likes and n % 3
+        interactions.append(make_interaction(
+            n + 1,
+            user_id=1000 + n % users,
+            username=f'user{n % users}',
+            interaction_content='' if like else f'消息 {n}',
+            interaction_time=start + timedelta(seconds=n * step),
+            type=InteractionType.LIKE.value if like else InteractionType.MESSAGE.value,
+            ref_message_id=FIRST_MESSAGE_ID if like else None,
+            reaction_emoji='👍' if like else None,
+            **fields
+        ))
+    return interactions
+
+
+class MemoryNostrSync(NostrSync):
+    """确认结果只计数不写库, 汇总窗口只保存在内存中"""
+
+    def flush_acks(self, db) -> int:
+        flushed, self.ack_buffer = len(self.ack_buffer), {}
+        self.delivery_buffer = {}
+        self.late_deliveries = {}
+        return flushed
+
+    def load_digest_window(self, db, channel_id: int, window_start: int):
+        return self.digest_windows.get((channel_id, window_start)) or (set(), 0)
@@ -0,0 +1,167 @@
+"""
+本地 NIP-01 中继替身, 用于离线测试和发布基准
+
+支持 EVENT/OK、REQ/EOSE、CLOSE, 可注入 OK 延迟、丢弃 (不回 OK)、拒绝和按连接限速:
+
+    relay = LocalRelay(latency=0.05, drop_rate=0.01, reject_rate=0.01)
+    await relay.start()
+    ...  # relay.url
+    await relay.stop()
+"""
+import asyncio
+import hashlib
+import json
+import random
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web, WSMsgType
+
+
+def compute_event_id(event: Dict[str, Any]) -> str:
+    serialized = json.dumps(
+        [0, event['pubkey'], event['created_at'], event['kind'], event['tags'], event['content']],
+        separators=(',', ':'),
+        ensure_ascii=False
+    )
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+def match_filter(event: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    if 'ids' in filters and event['id'] not in filters['ids']:
+        return False
+    if 'authors' in filters and event['pubkey'] not in filters['authors']:
+        return False
+    if 'kinds' in filters and event['kind'] not in filters['kinds']:
+        return False
+    if 'since' in filters and event['created_at'] < filters['since']:
+        return False
+    if 'until' in filters and event['created_at'] > filters['until']:
+        return False
+    for key, values in filters.items():
+        if key.startswith('#'):
+            tag_values = {tag[1] for tag in event['tags'] if len(tag) > 1 and tag[0] == key[1:]}
+            if not tag_values.intersection(values):
+                return False
+    return True
+
+
+class LocalRelay:
+    """内存中继: 事件保存在 self.events, 按 created_at 倒序响应 REQ"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 drop_rate: float = 0.0, reject_rate: float = 0.0,
+                 reject_message: str = 'blocked: rejected by local relay', verify_ids: bool = False,
+                 rate_limit: int = 0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.drop_rate = drop_rate
+        self.reject_rate = reject_rate
+        self.reject_message = reject_message
+        self.verify_ids = verify_ids
+        # 每个连接每秒最多接受的 EVENT 数, 超出的回 OK false "rate-limited:", 0 表示不限
+        self.rate_limit = rate_limit
+        self.rate_limited = 0
+        self.events: Dict[str, Dict[str, Any]] = {}
+        self.received = 0
+        self._runner: Optional[web.AppRunner] = None
+        self._tasks = set()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self) -> 'LocalRelay':
+        app = web.Application()
+        app.router.add_get('/', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        # port=0 时取实际分配的端口
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> 'LocalRelay':
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        loop = asyncio.get_running_loop()
+        window_start, window_count = loop.time(), 0
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            try:
+                message = json.loads(msg.data)
+            except ValueError:
+                await ws.send_str(json.dumps(['NOTICE', 'invalid: could not parse message']))
+                continue
+            if not isinstance(message, list) or not message:
+                continue
+
+            if message[0] == 'EVENT' and len(message) >= 2:
+                if self.rate_limit:
+                    if loop.time() - window_start >= 1:
+                        window_start, window_count = loop.time(), 0
+                    window_count += 1
+                    if window_count > self.rate_limit:
+                        self.rate_limited += 1
+                        event_id = message[1].get('id', '') if isinstance(message[1], dict) else ''
+                        await ws.send_str(json.dumps(['OK', event_id, False, 'rate-limited: slow down']))
+                        continue
+                self._spawn(self._on_event(ws, message[1]))
+            elif message[0] == 'REQ' and len(message) >= 3:
+                await self._on_req(ws, message[1], message[2:])
+            elif message[0] == 'CLOSE' and len(message) >= 2:
+                await ws.send_str(json.dumps(['CLOSED', message[1], '']))
+        return ws
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _on_event(self, ws: web.WebSocketResponse, event: Dict[str, Any]) -> None:
+        self.received += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.drop_rate and random.random() < self.drop_rate:
+            return
+
+        event_id = event.get('id', '')
+        if self.verify_ids and compute_event_id(event) != event_id:
+            reply = ['OK', event_id, False, 'invalid: event id does not match']
+        elif self.reject_rate and random.random() < self.reject_rate:
+            reply = ['OK', event_id, False, self.reject_message]
+        elif event_id in self.events:
+            reply = ['OK', event_id, True, 'duplicate: already have this event']
+        else:
+            self.events[event_id] = event
+            reply = ['OK', event_id, True, '']
+        if not ws.closed:
+            await ws.send_str(json.dumps(reply))
+
+    async def _on_req(self, ws: web.WebSocketResponse, subscription_id: str, filters_list: List[Dict]) -> None:
+        matched = {}
+        for filters in filters_list:
+            events = [event for event in self.events.values() if match_filter(event, filters)]
+            events.sort(key=lambda event: event['created_at'], reverse=True)
+            if 'limit' in filters:
+                events = events[:filters['limit']]
+            for event in events:
+                matched[event['id']] = event
+        for event in sorted(matched.values(), key=lambda event: event['created_at'], reverse=True):
+            await ws.send_str(json.dumps(['EVENT', subscription_id, event]))
+        await ws.send_str(json.dumps(['EOSE', subscription_id]))
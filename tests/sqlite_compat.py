@@ -0,0 +1,88 @@
+"""
+在内存 SQLite 上运行 DatabaseService 的 MySQL 语句, 只用于测试
+
+    db = create_session(Interaction, NostrOutbox)
+
+  - INSERT ... ON DUPLICATE KEY UPDATE 编译为 INSERT ... ON CONFLICT DO UPDATE
+  - INSERT IGNORE 编译为 INSERT OR IGNORE
+  - TIMESTAMPADD(SECOND, n, t) 编译为 datetime(t, 'n seconds')
+  - LEAST/GREATEST/POW/FLOOR/RAND 注册为 SQLite 函数, utf8mb4_bin 注册为按码点比较的排序规则
+  - BIGINT 主键编译为 INTEGER, 与 MySQL 一样自增
+  - 索引名加表名前缀 (MySQL 的索引名只需表内唯一, SQLite 要求整个库唯一)
+  - SELECT ... FOR UPDATE SKIP LOCKED 在 SQLite 上本来就被忽略
+"""
+import math
+import random
+
+from sqlalchemy import BigInteger, create_engine, event, literal_column
+from sqlalchemy.dialects.mysql.dml import OnDuplicateClause
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.sql import elements, visitors
+from sqlalchemy.sql.expression import Insert
+from sqlalchemy.sql.functions import Function
+
+from app.models.database import Base
+
+
+@compiles(BigInteger, 'sqlite')
+def _compile_big_integer(element, compiler, **kw):
+    return 'INTEGER'
+
+
+@compiles(CreateIndex, 'sqlite')
+def _compile_create_index(element, compiler, **kw):
+    index = element.element
+    quote = compiler.preparer.quote
+    return compiler.visit_create_index(element, **kw) \
+        .replace(quote(index.name), quote(f'{index.table.name}_{index.name}'), 1)
+
+
+@compiles(Insert, 'sqlite')
+def _compile_insert(element, compiler, **kw):
+    sql = compiler.visit_insert(element, **kw)
+    return 'INSERT OR IGNORE ' + sql[len('INSERT IGNORE '):] if sql.startswith('INSERT IGNORE ') else sql
+
+
+@compiles(Function, 'sqlite')
+def _compile_function(element, compiler, **kw):
+    if element.name.lower() == 'timestampadd':
+        _, amount, base = element.clauses
+        return f"datetime({compiler.process(base, **kw)}, ({compiler.process(amount, **kw)}) || ' seconds')"
+    return compiler.visit_function(element, **kw)
+
+
+@compiles(OnDuplicateClause, 'sqlite')
+def _compile_on_duplicate(element, compiler, **kw):
+    def replace(obj):
+        # insert_stmt.inserted.<列> 即 SQLite 的 excluded.<列>
+        if isinstance(obj, elements.ColumnClause) and obj.table is element.inserted_alias:
+            return literal_column(f'excluded.{obj.name}')
+        return None
+
+    clauses = []
+    for name, value in element.update.items():
+        if not isinstance(value, elements.ClauseElement):
+            value = elements.BindParameter(None, value)
+        value = visitors.replacement_traverse(value, {}, replace)
+        clauses.append(f"{name} = {compiler.process(value.self_group(), **kw)}")
+    return 'ON CONFLICT DO UPDATE SET ' + ', '.join(clauses)
+
+
+def _register_functions(dbapi_connection, connection_record):
+    dbapi_connection.create_function('least', -1, min)
+    dbapi_connection.create_function('greatest', -1, max)
+    dbapi_connection.create_function('pow', 2, math.pow)
+    dbapi_connection.create_function('floor', 1, math.floor)
+    dbapi_connection.create_function('rand', 0, random.random)
+    dbapi_connection.create_collation('utf8mb4_bin', lambda a, b: (a > b) - (a < b))
+
+
+def create_session(*models) -> Session:
+    """创建内存数据库和指定模型的表, 返回会话; 所有线程共用一个连接 (发布流程在线程中访问数据库)"""
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    event.listen(engine, 'connect', _register_functions)
+    Base.metadata.create_all(engine, tables=[model.__table__ for model in models])
+    return sessionmaker(bind=engine, autocommit=False, autoflush=False)()
@@ -0,0 +1,40 @@
+import gzip
+import json
+from datetime import datetime, timezone
+
+from flask import Flask, jsonify
+
+from app.middleware.compression import configure_compression
+from config.config import Config
+from utils.helpers import TimestampFormatter, dumps_json
+
+
+def test_timestamp_formatter_matches_strftime_and_epoch():
+    values = [datetime(2024, 2, 29, 23, 59, 59, 999), datetime(1999, 12, 5, 0, 0, 1),
+              datetime(2024, 6, 1, 8, 0, tzinfo=timezone.utc)]
+    rfc = TimestampFormatter()
+    epoch = TimestampFormatter(epoch=True)
+    for value in values:
+        assert rfc(value) == value.strftime('%a, %d %b %Y %H:%M:%S -0000')
+        assert epoch(value) == int(value.replace(tzinfo=value.tzinfo or timezone.utc).timestamp())
+    assert rfc(None) is None
+    assert json.loads(dumps_json({'message': '你好', 'id': 2 ** 60})) == {'message': '你好', 'id': 2 ** 60}
+
+
+def test_large_responses_are_compressed_when_accepted(monkeypatch):
+    monkeypatch.setattr(Config, 'RESPONSE_COMPRESS_MIN_SIZE', 1024)
+    app = Flask(__name__)
+    configure_compression(app)
+
+    @app.route('/page/<int:size>')
+    def page(size):
+        return jsonify({'messages': ['interaction'] * size})
+
+    client = app.test_client()
+    large = client.get('/page/500', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert large.headers['Content-Encoding'] == 'gzip' and large.headers['Vary'] == 'Accept-Encoding'
+    assert int(large.headers['Content-Length']) == len(large.data)
+    assert json.loads(gzip.decompress(large.data)) == {'messages': ['interaction'] * 500}
+
+    assert 'Content-Encoding' not in client.get('/page/500').headers
+    assert 'Content-Encoding' not in client.get('/page/5', headers={'Accept-Encoding': 'gzip'}).headers
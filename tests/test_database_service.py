@@ -0,0 +1,103 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app.models.models import Channel, Interaction, NostrOutbox, NostrRelayDelivery, User, UserNameHistory
+from app.services import database_service
+from app.services.database_service import DatabaseService
+from tests.factories import make_interaction
+from tests.sqlite_compat import create_session
+from utils.helpers import LRUCache
+
+
+@pytest.fixture
+def db():
+    session = create_session(Channel, Interaction, NostrOutbox, NostrRelayDelivery)
+    yield session
+    session.close()
+
+
+def count_queries(db):
+    statements = []
+    event.listen(db.get_bind(), 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    return statements
+
+
+@pytest.mark.parametrize('count', [0, 1, 9, 10, 11, 30])
+def test_iter_chunks_boundaries(db, count):
+    db.add_all([Channel(id=i + 1, channel_id=1000 + i) for i in range(count)])
+    db.commit()
+    statements = count_queries(db)
+
+    chunks = list(DatabaseService.iter_chunks(db.query(Channel), Channel.id, 10))
+
+    assert [channel.id for chunk in chunks for channel in chunk] == list(range(1, count + 1))
+    assert all(len(chunk) == 10 for chunk in chunks[:-1]) and all(chunks)
+    # 最后一块恰好满时多一次空查询确认结束, 不满时不再查询
+    assert len(statements) == len(chunks) + (count % 10 == 0)
+
+
+def test_iter_chunks_with_filter_and_gaps(db):
+    db.add_all([Channel(id=i, channel_id=i % 2) for i in range(1, 41)])
+    db.commit()
+
+    chunks = list(DatabaseService.iter_chunks(db.query(Channel).filter(Channel.channel_id == 1), Channel.id, 5))
+
+    assert [[channel.id for channel in chunk] for chunk in chunks] == [
+        list(range(start, start + 10, 2)) for start in (1, 11, 21, 31)
+    ]
+
+
+def test_mark_interactions_published_respects_worker_lease(db):
+    now = datetime.utcnow()
+    db.add_all([
+        Interaction(interaction_id=interaction_id, message_id=interaction_id, channel_id=1, user_id=1,
+                    interaction_content='', interaction_time=now, post_time=now, type=1)
+        for interaction_id in (1, 2, 3)
+    ])
+    db.add_all([NostrOutbox(interaction_id=1, lease_owner='worker'), NostrOutbox(interaction_id=2, lease_owner='other'),
+                NostrOutbox(interaction_id=3, lease_owner='other')])
+    db.commit()
+
+    published = {1: 'aa' * 32, 2: 'bb' * 32}
+    deliveries = {(1, 'ws://relay-a'): 'aa' * 32, (2, 'ws://relay-b'): 'bb' * 32}
+    assert DatabaseService.mark_interactions_published(db, 'worker', published, deliveries) == 2
+
+    db.expire_all()
+    rows = {row.interaction_id: row for row in db.query(Interaction).all()}
+    assert {key: (row.is_published, row.nostr_event_id) for key, row in rows.items()} == {
+        1: (True, 'aa' * 32), 2: (True, 'bb' * 32), 3: (False, None)
+    }
+    # 发布进程只删除自己持有租约的 outbox 记录, 其他进程的租约到期后重新发布得到相同事件ID
+    assert [entry.interaction_id for entry in db.query(NostrOutbox).order_by(NostrOutbox.interaction_id)] == [2, 3]
+    assert {(row.interaction_id, row.relay_url): row.nostr_event_id
+            for row in db.query(NostrRelayDelivery).all()} == deliveries
+
+    # worker_id 为 None (对账) 时不论租约全部删除; 重复的投递记录更新事件ID
+    assert DatabaseService.mark_interactions_published(db, None, {2: 'cc' * 32}, {(2, 'ws://relay-b'): 'cc' * 32}) == 1
+    assert [entry.interaction_id for entry in db.query(NostrOutbox)] == [3]
+    assert db.query(NostrRelayDelivery.nostr_event_id).filter(NostrRelayDelivery.interaction_id == 2).scalar() \
+        == 'cc' * 32
+    assert DatabaseService.mark_interactions_published(db, None, {}) == 0
+
+
+def test_attach_usernames_keeps_case_and_accent_variants(monkeypatch):
+    monkeypatch.setattr(database_service, '_username_id_cache', LRUCache(100))
+    db = create_session(User, UserNameHistory)
+    try:
+        first = [make_interaction(1, username='Alice'), make_interaction(2, username='jose')]
+        DatabaseService.attach_usernames(db, first)
+        db.commit()
+        # 仅大小写或重音不同的改名是新的用户名记录, 不能解析到已有记录上
+        renamed = [make_interaction(3, username='alice'), make_interaction(4, username='josé'),
+                   make_interaction(5, username='Alice')]
+        DatabaseService.attach_usernames(db, renamed)
+        db.commit()
+        names = dict(db.query(UserNameHistory.id, UserNameHistory.username).all())
+    finally:
+        db.close()
+
+    assert sorted(names.values()) == ['Alice', 'alice', 'jose', 'josé']
+    assert [names[interaction.username_id] for interaction in first + renamed] \
+        == ['Alice', 'jose', 'alice', 'josé', 'Alice']
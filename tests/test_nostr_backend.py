@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+from pynostr.key import PrivateKey
+
+from app.services.nostr_backend import create_backend
+from app.services.nostr_serializer import EventSerializer
+from tests.local_relay import LocalRelay
+
+
+@pytest.mark.parametrize('backend_name', ['asyncio', 'pynostr'])
+def test_backend_publish_and_query(backend_name):
+    serializer = EventSerializer(PrivateKey().hex())
+    frames = [serializer.sign(1700000000 + i, 1, [['t', 'discord']], f'content {i}') for i in range(20)]
+
+    async def run():
+        async with LocalRelay() as relay:
+            backend = create_backend([relay.url], backend_name)
+            try:
+                await backend.start()
+                results = await backend.publish_events(frames)
+                events = await backend.query({'authors': [serializer.pubkey], 'limit': 5})
+            finally:
+                await backend.close()
+        return results, events
+
+    results, events = asyncio.run(run())
+
+    assert set(results) == {event_id for event_id, _ in frames}
+    assert all(result.accepted for relay_results in results.values() for result in relay_results)
+    assert sorted(event['created_at'] for event in events) == [1700000015 + i for i in range(5)]
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_backend(['ws://127.0.0.1:9'], 'nostr-sdk')
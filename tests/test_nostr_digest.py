@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+from pynostr.key import PrivateKey
+
+from app.services.nostr_digest import DigestBuilder
+from config.config import Config
+from tests.factories import CHANNEL_ID, MemoryNostrSync, make_interactions
+from tests.local_relay import LocalRelay
+
+
+def test_digest_chunks_are_content_addressed():
+    builder = DigestBuilder(window_seconds=3600, chunk_bytes=2048, kind=30078)
+    interactions = make_interactions(300, likes=True)
+    windows = builder.build_chunks(interactions)
+    assert list(windows) == [(CHANNEL_ID, builder.window_start(interactions[0]))]
+    chunks = windows[(CHANNEL_ID, builder.window_start(interactions[0]))]
+
+    assert len(chunks) > 1
+    assert sorted(i for chunk in chunks for i in chunk.interaction_ids) == list(range(1, 301))
+    for chunk in chunks:
+        assert len(chunk.event['content'].encode()) <= 2048 + 100
+        assert chunk.event['tags'][0][0] == 'd' and chunk.event['tags'][0][1].endswith(chunk.chunk_hash)
+        assert len(json.loads(chunk.event['content'])['rows']) == len(chunk.interaction_ids)
+
+    # 输入顺序不影响结果; 去掉最前面几行后, 后面的块保持不变
+    assert [c.chunk_hash for c in builder.build_chunks(interactions[::-1])[(CHANNEL_ID, 1717243200)]] \
+        == [c.chunk_hash for c in chunks]
+    shifted = builder.build_chunks(interactions[5:])[(CHANNEL_ID, 1717243200)]
+    assert chunks[-1].chunk_hash == shifted[-1].chunk_hash
+
+    index = builder.build_index(CHANNEL_ID, 1717243200, ['b' * 64, 'a' * 64, 'b' * 64], 1717250000)
+    assert index['tags'][0] == ['d', f'discord-digest:{CHANNEL_ID}:1717243200']
+    assert [tag for tag in index['tags'] if tag[0] == 'e'] == [['e', 'a' * 64], ['e', 'b' * 64]]
+
+
+def test_sync_publishes_digest_events(monkeypatch):
+    monkeypatch.setattr(Config, 'NOSTR_DIGEST_CHANNELS', {CHANNEL_ID})
+    monkeypatch.setattr(Config, 'NOSTR_SIGN_WORKERS', 0)
+
+    async def run():
+        async with LocalRelay(verify_ids=True) as relay:
+            nostr_sync = MemoryNostrSync([relay.url], PrivateKey().bech32())
+            try:
+                first, _ = await nostr_sync.sync_interactions(None, make_interactions(100, likes=True))
+                second, _ = await nostr_sync.sync_interactions(None, make_interactions(50, offset=100, likes=True))
+            finally:
+                await nostr_sync.close()
+        return relay, first, second
+
+    relay, first, second = asyncio.run(run())
+
+    assert len(first) == 100 and len(second) == 50
+    kinds = [event['kind'] for event in relay.events.values()]
+    assert set(kinds) == {Config.NOSTR_DIGEST_KIND}
+    assert len(kinds) < 10
+    # 第二版索引同时列出两批的汇总块
+    indexes = sorted((event for event in relay.events.values() if len(event['tags'][0][1].split(':')) == 3),
+                     key=lambda event: event['created_at'])
+    assert len(indexes) == 2
+    assert {tag[1] for tag in indexes[-1]['tags'] if tag[0] == 'e'} == set(first.values()) | set(second.values())
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.models import Interaction, NostrDeadLetter, NostrOutbox
+from app.services.database_service import DatabaseService
+from config.config import Config
+from tests.sqlite_compat import create_session
+
+
+@pytest.fixture
+def db():
+    session = create_session(Interaction, NostrOutbox, NostrDeadLetter)
+    now = datetime.utcnow()
+    session.add_all([
+        Interaction(interaction_id=interaction_id, message_id=interaction_id, channel_id=1, user_id=1,
+                    interaction_content='', interaction_time=now, post_time=now, type=1)
+        for interaction_id in (1, 2, 3)
+    ])
+    # 互动 99 已被保留策略清理, 只剩 outbox 记录
+    session.add_all([NostrOutbox(interaction_id=interaction_id) for interaction_id in (1, 2, 3, 99)])
+    session.commit()
+    yield session
+    session.close()
+
+
+def outbox(db):
+    db.expire_all()
+    return {entry.interaction_id: entry for entry in db.query(NostrOutbox).all()}
+
+
+def lease(db, interaction_id: int, owner: str, expires_at: datetime):
+    db.query(NostrOutbox).filter(NostrOutbox.interaction_id == interaction_id) \
+        .update({NostrOutbox.lease_owner: owner, NostrOutbox.lease_expires_at: expires_at})
+    db.commit()
+
+
+def test_claim_skips_leased_rows_and_acks_orphans(db):
+    lease(db, 2, 'other', datetime.utcnow() + timedelta(hours=1))
+
+    claimed = DatabaseService.claim_outbox_batch(db, 'worker', 10, 60)
+
+    assert [interaction.interaction_id for interaction in claimed] == [1, 3]
+    entries = outbox(db)
+    # 孤立的 outbox 记录直接确认删除
+    assert set(entries) == {1, 2, 3}
+    assert entries[1].lease_owner == entries[3].lease_owner == 'worker'
+    assert entries[1].attempts == 1 and entries[1].lease_expires_at > datetime.utcnow()
+    assert entries[2].lease_owner == 'other' and entries[2].attempts == 0
+
+    # 租约过期后可被其他进程重新领取
+    lease(db, 2, 'other', datetime.utcnow() - timedelta(seconds=1))
+    assert [interaction.interaction_id for interaction in DatabaseService.claim_outbox_batch(db, 'worker', 10, 60)] \
+        == [2]
+
+
+def test_ack_and_release_only_touch_own_leases(db):
+    DatabaseService.claim_outbox_batch(db, 'worker', 10, 60)
+    lease(db, 2, 'other', datetime.utcnow() + timedelta(hours=1))
+
+    assert DatabaseService.ack_outbox_entries(db, 'worker', [1, 2]) == 1
+    assert set(outbox(db)) == {2, 3}
+
+    assert DatabaseService.release_outbox_entries(db, 'worker', {2: 'timeout', 3: 'timeout'}) == (1, 0)
+    entries = outbox(db)
+    assert entries[2].lease_owner == 'other'
+    # 释放租约并延后重试
+    assert entries[3].lease_owner is None and entries[3].lease_expires_at is None
+    assert entries[3].available_at > datetime.utcnow()
+    assert DatabaseService.claim_outbox_batch(db, 'worker', 10, 60) == []
+
+
+def test_dead_letter_at_max_attempts_or_permanent_reject(db, monkeypatch):
+    monkeypatch.setattr(Config, 'NOSTR_MAX_ATTEMPTS', 2)
+    DatabaseService.claim_outbox_batch(db, 'worker', 10, 60)
+    lease(db, 3, 'other', datetime.utcnow() + timedelta(hours=1))
+
+    # 第一次失败: 1 延迟重试, 2 被中继永久拒绝, 3 的租约属于其他进程
+    assert DatabaseService.release_outbox_entries(
+        db, 'worker', {1: 'ws://relay: timeout', 2: 'ws://relay: blocked: spam', 3: 'timeout'}, permanent=[2]
+    ) == (1, 1)
+    assert set(outbox(db)) == {1, 3}
+
+    # 第二次领取后失败, 达到 NOSTR_MAX_ATTEMPTS
+    db.query(NostrOutbox).filter(NostrOutbox.interaction_id == 1) \
+        .update({NostrOutbox.available_at: datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    assert [interaction.interaction_id for interaction in DatabaseService.claim_outbox_batch(db, 'worker', 10, 60)] \
+        == [1]
+    assert DatabaseService.release_outbox_entries(db, 'worker', {1: 'ws://relay: timeout'}) == (0, 1)
+
+    assert set(outbox(db)) == {3}
+    dead = {row.interaction_id: (row.attempts, row.last_error) for row in db.query(NostrDeadLetter).all()}
+    assert dead == {1: (2, 'ws://relay: timeout'), 2: (1, 'ws://relay: blocked: spam')}
@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+from app.services.nostr_publisher import AimdController, AsyncNostrPublisher
+from tests.local_relay import LocalRelay
+
+
+def make_frames(count: int):
+    return [('%064x' % i, json.dumps(['EVENT', {'id': '%064x' % i}])) for i in range(count)]
+
+
+def test_publish_to_local_relays():
+    async def run():
+        async with LocalRelay() as fast, LocalRelay(reject_rate=1.0, reject_message='invalid: bad event') as rejecting:
+            publisher = AsyncNostrPublisher([fast.url, rejecting.url, 'ws://127.0.0.1:9'], ok_timeout=2)
+            try:
+                results = await publisher.publish_events(make_frames(100))
+                await asyncio.sleep(0.1)
+                health = {item['url']: item for item in publisher.relay_health()}
+            finally:
+                await publisher.close()
+        return fast, rejecting, results, health
+
+    fast, rejecting, results, health = asyncio.run(run())
+
+    assert len(results) == 100
+    assert all(any(result.accepted for result in relay_results) for relay_results in results.values())
+    assert len(fast.events) == 100
+    assert health[fast.url]['state'] == 'connected'
+    assert health[rejecting.url]['rejections'] == {'invalid': 100}
+    # 连接失败的中继进入退避, 不会为每个事件重连
+    assert health['ws://127.0.0.1:9']['state'] == 'down'
+    assert health['ws://127.0.0.1:9']['connect_failures'] == 1
+
+
+def test_unconfirmed_events_report_permanent_rejections():
+    async def run():
+        async with LocalRelay(reject_rate=1.0, reject_message='blocked: not allowed') as relay:
+            publisher = AsyncNostrPublisher([relay.url], ok_timeout=2)
+            try:
+                return await publisher.publish_events(make_frames(10))
+            finally:
+                await publisher.close()
+
+    results = asyncio.run(run())
+    assert all(not result.accepted and result.permanent
+               for relay_results in results.values() for result in relay_results)
+
+
+def test_aimd_controller_grows_and_backs_off():
+    async def run():
+        control = AimdController(100, initial_window=10, min_window=2, target_latency=1, max_rate=0)
+        for _ in range(10):
+            await control.acquire()
+        # 窗口已满, 第 11 个需要等待释放
+        waiter = asyncio.ensure_future(control.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        control.release()
+        control.on_ok(0.01)
+        await asyncio.sleep(0)
+        assert waiter.done()
+        return control
+
+    control = asyncio.run(run())
+    # 慢启动: 每个 OK 加 1
+    assert control.window == 11
+    assert control.on_rate_limited()
+    assert control.window == 5.5 and control.bucket.rate >= 5
+    # 同一轮在途事件的限流回复不重复降速
+    assert not control.on_rate_limited()
+    assert control.window == 5.5 and control.rate_limited == 2
+
+
+def test_publisher_slows_down_on_rate_limited_relay():
+    async def run():
+        async with LocalRelay(rate_limit=50) as relay:
+            publisher = AsyncNostrPublisher([relay.url], ok_timeout=2)
+            try:
+                await publisher.publish_events(make_frames(200))
+                return relay, publisher.relay_health()[0]
+            finally:
+                await publisher.close()
+
+    relay, health = asyncio.run(run())
+    assert relay.rate_limited > 0
+    assert health['rate_limited'] == health['rejections']['rate-limited']
+    # 收到限流后令牌桶开始限速
+    assert health['rate'] is not None
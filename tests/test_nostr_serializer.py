@@ -0,0 +1,44 @@
+import json
+
+from pynostr.event import Event
+from pynostr.key import PrivateKey
+
+from app.services.nostr_serializer import EventSerializer
+
+TAGS = [
+    ['t', 'discord'],
+    ['channel_id', '1234567890123456789'],
+    ['user_id', '987654321098765432'],
+    ['username', 'ユーザー "quoted" \\ name'],
+    ['created_at', '1704067200'],
+    ['message_id', '1190000000000000001']
+]
+
+CASES = [
+    (1, TAGS, 'hello 世界 👍\n"quotes" \\ backslash \t tab \u0001 control'),
+    (6, TAGS + [['e', 'ab' * 32]], ''),
+    (7, TAGS + [['e', 'cd' * 32], ['reaction', '<:custom:1234>']], ''),
+    (7, TAGS + [['reaction', '👍🏽']], ''),
+]
+
+
+def test_event_ids_match_pynostr():
+    private_key = PrivateKey()
+    serializer = EventSerializer(private_key.hex())
+    assert serializer.pubkey == private_key.public_key.hex()
+
+    for kind, tags, content in CASES:
+        expected = Event(content=content, kind=kind, tags=tags, created_at=1704067200)
+        expected.sign(private_key.hex())
+
+        preimage, _, _ = serializer.serialize(1704067200, kind, tags, content)
+        assert preimage == expected.serialize()
+
+        event_id, frame = serializer.sign(1704067200, kind, tags, content)
+        assert event_id == expected.id
+
+        message = json.loads(frame)
+        assert message[0] == 'EVENT'
+        signed = Event.from_dict(message[1])
+        assert signed.id == event_id
+        assert signed.verify()
@@ -0,0 +1,165 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from pynostr.key import PrivateKey
+
+from app.models.models import Interaction, InteractionType, NostrOutbox, NostrRelayDelivery, UserNameHistory
+from app.services.nostr_backend import NostrBackend, PublishResult
+from app.services.pynostr_sync import NostrSync
+from config.config import Config
+from tests.factories import FIRST_MESSAGE_ID, make_interaction, make_interactions
+from tests.local_relay import LocalRelay
+from tests.sqlite_compat import create_session
+
+
+def make_like(ref_message_id: int):
+    return SimpleNamespace(interaction_id=1, message_id=ref_message_id, channel_id=42, user_id=7, username='user',
+                           interaction_content='', interaction_time=datetime(2024, 6, 1, tzinfo=timezone.utc),
+                           type=InteractionType.LIKE.value, ref_message_id=ref_message_id, ref_channel_id=None,
+                           reaction_emoji='👍')
+
+
+def test_signed_events_are_reused_until_reference_changes(monkeypatch):
+    monkeypatch.setattr(Config, 'NOSTR_SIGN_WORKERS', 0)
+    nostr_sync = NostrSync(['ws://127.0.0.1:9'], PrivateKey().bech32())
+    like = make_like(1000)
+
+    async def sign():
+        return (await nostr_sync.sign_cached([(nostr_sync._signed_key(like), like)], nostr_sync.build_nostr_event))[0]
+
+    try:
+        first = asyncio.run(sign())
+        # 重试: 同样的字节, 不再签名
+        assert asyncio.run(sign()) == first
+        assert nostr_sync.sign_stats == {'signed': 1, 'reused': 1}
+
+        # 父消息稍后才入库, 点赞事件带上 e 标签, 需要重新签名
+        nostr_sync.ref_event_ids.put((42, 1000), 'ab' * 32)
+        second = asyncio.run(sign())
+        assert second[0] != first[0] and '"e","' + 'ab' * 32 in second[1]
+        assert nostr_sync.sign_stats == {'signed': 2, 'reused': 1}
+    finally:
+        nostr_sync.signer.close()
+
+
+class RecordingBackend(NostrBackend):
+    """按发送顺序记录事件, 全部确认"""
+
+    def __init__(self, relay_urls):
+        super().__init__(relay_urls)
+        self.events = []
+
+    async def close(self) -> None:
+        pass
+
+    async def publish_events(self, events):
+        self.events.extend(json.loads(frame)[1] for _, frame in events)
+        return {event_id: [PublishResult(event_id, url, True) for url in self.relay_urls] for event_id, _ in events}
+
+    async def query(self, filters, timeout=None):
+        return []
+
+
+def test_parent_in_same_batch_is_signed_first(monkeypatch):
+    monkeypatch.setattr(Config, 'NOSTR_SIGN_WORKERS', 0)
+    backend = RecordingBackend(['ws://relay'])
+    nostr_sync = NostrSync(['ws://relay'], PrivateKey().bech32(), backend=backend)
+    # 回复和点赞排在被引用的消息之前
+    reply = make_interaction(1, message_id=FIRST_MESSAGE_ID + 1, type=InteractionType.REPLY.value,
+                             ref_message_id=FIRST_MESSAGE_ID)
+    like = make_interaction(2, message_id=FIRST_MESSAGE_ID, type=InteractionType.LIKE.value,
+                            ref_message_id=FIRST_MESSAGE_ID, reaction_emoji='👍')
+    parent = make_interaction(3, message_id=FIRST_MESSAGE_ID)
+    db = create_session(Interaction)
+
+    try:
+        confirmed, failed = asyncio.run(nostr_sync.sync_events(db, [reply, like, parent]))
+    finally:
+        nostr_sync.signer.close()
+        db.close()
+
+    assert not failed and len(confirmed) == 3
+    parent_id = confirmed[3]
+    assert backend.events[0]['id'] == parent_id
+    for interaction_id in (1, 2):
+        event = next(event for event in backend.events if event['id'] == confirmed[interaction_id])
+        assert ['e', parent_id] in event['tags']
+
+
+def test_reference_tag_does_not_depend_on_parent_publish_time(monkeypatch):
+    monkeypatch.setattr(Config, 'NOSTR_SIGN_WORKERS', 0)
+    db = create_session(UserNameHistory, Interaction)
+    now = datetime(2024, 6, 1, 12, 0)
+    parent = Interaction(interaction_id=1, message_id=FIRST_MESSAGE_ID, channel_id=42, user_id=7,
+                         interaction_content='原消息', interaction_time=now, post_time=now,
+                         type=InteractionType.MESSAGE.value)
+    reply = Interaction(interaction_id=2, message_id=FIRST_MESSAGE_ID + 1, channel_id=42, user_id=8,
+                        interaction_content='回复', interaction_time=now, post_time=now,
+                        type=InteractionType.REPLY.value, ref_message_id=FIRST_MESSAGE_ID)
+    db.add_all([parent, reply])
+    db.commit()
+
+    def sign(nostr_sync, interaction):
+        return asyncio.run(nostr_sync.sign_cached([(nostr_sync._signed_key(interaction), interaction)],
+                                                  nostr_sync.build_nostr_event))[0]
+
+    private_key = PrivateKey().bech32()
+    first = NostrSync(['ws://relay'], private_key)
+    second = NostrSync(['ws://relay'], private_key)
+    try:
+        # 父消息尚未发布: 按库中的记录计算它的事件ID, 与父消息签名得到的ID相同
+        first.prefetch_ref_event_ids(db, [reply])
+        before = sign(first, reply)
+        parent_id, _ = sign(first, parent)
+        assert first.ref_event_ids.get((42, FIRST_MESSAGE_ID)) == parent_id
+
+        # 父消息发布后由另一个进程构造
+        parent.is_published = True
+        parent.nostr_event_id = parent_id
+        db.commit()
+        second.prefetch_ref_event_ids(db, [reply])
+        after = sign(second, reply)
+    finally:
+        first.signer.close()
+        second.signer.close()
+        db.close()
+
+    # 签名带随机数, 只比较事件ID
+    assert after[0] == before[0]
+    assert ['e', parent_id] in json.loads(before[1])[1]['tags']
+
+
+def test_late_relay_confirmations_are_recorded(monkeypatch):
+    monkeypatch.setattr(Config, 'NOSTR_SIGN_WORKERS', 0)
+    db = create_session(Interaction, NostrOutbox, NostrRelayDelivery)
+    interactions = make_interactions(5)
+
+    def deliveries():
+        return {(row.interaction_id, row.relay_url) for row in db.query(NostrRelayDelivery).all()}
+
+    async def run():
+        async with LocalRelay() as fast, LocalRelay(latency=0.3) as slow:
+            nostr_sync = NostrSync([fast.url, slow.url], PrivateKey().bech32())
+            try:
+                confirmed, _ = await nostr_sync.sync_interactions(db, interactions)
+                await asyncio.to_thread(nostr_sync.flush_acks, db)
+                first = deliveries()
+                # 慢中继的 OK 在发布返回后到达, 下一次 flush_acks 写入
+                while nostr_sync.publisher._background:
+                    await asyncio.sleep(0.05)
+                nostr_sync.collect_late_deliveries()
+                await asyncio.to_thread(nostr_sync.flush_acks, db)
+                return fast.url, slow.url, confirmed, first, deliveries()
+            finally:
+                await nostr_sync.close()
+
+    try:
+        fast_url, slow_url, confirmed, first, second = asyncio.run(run())
+    finally:
+        db.close()
+
+    assert len(confirmed) == 5
+    assert first == {(interaction_id, fast_url) for interaction_id in confirmed}
+    assert second == first | {(interaction_id, slow_url) for interaction_id in confirmed}
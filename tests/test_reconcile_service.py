@@ -0,0 +1,104 @@
+import asyncio
+from datetime import timedelta
+
+from pynostr.key import PrivateKey
+
+from app.models.models import Interaction, InteractionType, NostrOutbox, UserNameHistory
+from app.services import reconcile_service
+from app.services.pynostr_sync import NostrSync
+from app.services.reconcile_service import ReconcileService
+from config.config import Config
+from tests.factories import START_TIME, make_interaction, make_interactions
+from tests.local_relay import LocalRelay
+from tests.sqlite_compat import create_session
+
+
+def run_with_relay(interactions, callback, db=None):
+    """把互动发布到本地中继, 再用同一公钥调用 callback(service)"""
+    async def run():
+        async with LocalRelay() as relay:
+            nostr_sync = NostrSync([relay.url], PrivateKey().bech32())
+            try:
+                confirmed, failed = await nostr_sync.sync_events(db, interactions)
+                assert not failed and len(confirmed) == len(interactions)
+                return await callback(ReconcileService(nostr_sync, page_size=5))
+            finally:
+                await nostr_sync.close()
+
+    return asyncio.run(run())
+
+
+def epoch(seconds: int) -> int:
+    return int((START_TIME + timedelta(seconds=seconds)).timestamp())
+
+
+def test_fetch_window_pages_across_shared_seconds(monkeypatch):
+    monkeypatch.setattr(Config, 'NOSTR_SIGN_WORKERS', 0)
+    # 每秒 3 条, 每页 5 条: 每页的边界都落在某一秒中间
+    interactions = make_interactions(20)
+    for interaction in interactions:
+        interaction.interaction_time = START_TIME + timedelta(seconds=interaction.interaction_id // 3)
+
+    async def fetch(service):
+        return service, await service.fetch_window(epoch(0), epoch(10))
+
+    service, events = run_with_relay(interactions, fetch)
+
+    assert len(events) == 20 and service.skipped_seconds == 0
+    assert {ReconcileService.event_key(event) for event in events} \
+        == {ReconcileService.interaction_key(interaction) for interaction in interactions}
+
+
+def test_fetch_window_skips_rest_of_overfull_second(monkeypatch):
+    monkeypatch.setattr(Config, 'NOSTR_SIGN_WORKERS', 0)
+    # 最新的一秒有 7 条, 超过一页; 更早的 3 条各占一秒
+    interactions = make_interactions(10)
+    for interaction in interactions:
+        interaction.interaction_time = START_TIME + timedelta(seconds=min(interaction.interaction_id, 4))
+
+    async def fetch(service):
+        return service, await service.fetch_window(epoch(0), epoch(10))
+
+    service, events = run_with_relay(interactions, fetch)
+
+    # 该秒只取到一页, 之后继续翻页取到更早的事件
+    assert service.skipped_seconds == 1
+    assert sorted(event['created_at'] for event in events) == [epoch(1), epoch(2), epoch(3)] + [epoch(4)] * 5
+
+
+def test_mark_matches_only_reads_matching_messages(monkeypatch):
+    monkeypatch.setattr(Config, 'NOSTR_SIGN_WORKERS', 0)
+    published = make_interactions(12, likes=True)
+    db = create_session(UserNameHistory, Interaction, NostrOutbox)
+    columns = ('interaction_id', 'message_id', 'channel_id', 'user_id', 'interaction_content', 'interaction_time',
+               'type', 'ref_message_id', 'ref_channel_id', 'reaction_emoji')
+
+    def row(interaction):
+        values = {column: getattr(interaction, column) for column in columns}
+        values['interaction_time'] = values['interaction_time'].replace(tzinfo=None)
+        return Interaction(post_time=values['interaction_time'], **values)
+
+    db.add_all(row(interaction) for interaction in published)
+    # 同一消息的其他用户点赞和无关消息都没有对应事件, 不能被标记
+    db.add(row(make_interaction(13, message_id=published[0].message_id, user_id=2000, type=InteractionType.LIKE.value,
+                                ref_message_id=published[0].message_id, reaction_emoji='👍')))
+    db.add(row(make_interaction(14, message_id=1)))
+    db.add_all(NostrOutbox(interaction_id=interaction_id) for interaction_id in range(1, 15))
+    db.commit()
+    monkeypatch.setattr(reconcile_service, 'get_db', lambda: iter([db]))
+
+    async def reconcile(service):
+        return await service.run(START_TIME, START_TIME + timedelta(minutes=1))
+
+    try:
+        result = run_with_relay(published, reconcile, db)
+        rows = {row.interaction_id: row for row in db.query(Interaction).all()}
+        outbox = [entry.interaction_id for entry in db.query(NostrOutbox).order_by(NostrOutbox.interaction_id)]
+    finally:
+        db.close()
+
+    # 只扫描与事件 (channel_id, message_id) 相同的未发布互动
+    assert result == {'fetched': 12, 'scanned': 13, 'marked': 12, 'skipped_seconds': 0}
+    assert [key for key, row in rows.items() if row.is_published] == list(range(1, 13))
+    assert all(rows[key].nostr_event_id for key in range(1, 13))
+    assert outbox == [13, 14]
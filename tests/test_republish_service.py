@@ -0,0 +1,114 @@
+import asyncio
+import random
+
+from pynostr.key import PrivateKey
+
+from app.services.pynostr_sync import NostrSync
+from app.services.republish_service import RepublishService
+from config.config import Config
+from tests.factories import CHANNEL_ID, make_interactions
+from tests.local_relay import LocalRelay
+
+
+class MemoryRepublishService(RepublishService):
+    """数据库读写替换为内存, 中继使用本地替身"""
+
+    def __init__(self, nostr_sync, relay_url, interactions, **kwargs):
+        super().__init__(nostr_sync, relay_url, **kwargs)
+        self.interactions = interactions
+        self.saved = []
+        self.db_service.iter_undelivered_interactions = self.iter_undelivered
+
+    def iter_undelivered(self, db, relay_url, after_id, chunk_size):
+        delivered = {key[0] for saved in self.saved for key in saved[1]}
+        rows = [interaction for interaction in self.interactions
+                if interaction.interaction_id > after_id and interaction.interaction_id not in delivered]
+        for start in range(0, len(rows), chunk_size):
+            yield rows[start:start + chunk_size]
+
+    def load_checkpoint(self) -> int:
+        return self.saved[-1][0] if self.saved else 0
+
+    def count_total(self, after_id: int) -> int:
+        return sum(1 for interaction in self.interactions if interaction.interaction_id > after_id)
+
+    def save_progress(self, last_interaction_id, deliveries, failed) -> None:
+        self.saved.append((last_interaction_id, dict(deliveries), failed))
+
+
+def test_republish_streams_chunks_and_advances_checkpoint(monkeypatch):
+    monkeypatch.setattr(Config, 'NOSTR_SIGN_WORKERS', 0)
+    interactions = make_interactions(230)
+
+    async def run():
+        async with LocalRelay(latency=0.001) as relay:
+            nostr_sync = NostrSync([relay.url], PrivateKey().bech32())
+            try:
+                service = MemoryRepublishService(nostr_sync, relay.url, interactions, chunk_size=50, concurrency=3)
+                result = await service.run()
+                # 从检查点继续时没有剩余数据
+                resumed = await service.run()
+            finally:
+                await nostr_sync.close()
+        return relay, service, result, resumed
+
+    relay, service, result, resumed = asyncio.run(run())
+
+    assert result == {'delivered': 230, 'failed': 0, 'skipped': 0, 'checkpoint': 230}
+    assert len(relay.events) == 230
+    # 检查点按块顺序单调推进, 每块的投递记录都带中继地址
+    assert [saved[0] for saved in service.saved] == [50, 100, 150, 200, 230]
+    assert all(key[1] == relay.url for saved in service.saved for key in saved[1])
+    assert resumed['checkpoint'] == 230
+    assert not service.nostr_sync.delivery_buffer
+
+
+def test_republish_resumes_from_first_failure(monkeypatch):
+    monkeypatch.setattr(Config, 'NOSTR_SIGN_WORKERS', 0)
+    random.seed(7)
+    interactions = make_interactions(230)
+
+    async def run():
+        async with LocalRelay(reject_rate=0.1) as relay:
+            nostr_sync = NostrSync([relay.url], PrivateKey().bech32())
+            try:
+                service = MemoryRepublishService(nostr_sync, relay.url, interactions, chunk_size=50, concurrency=3)
+                first = await service.run()
+                first_delivered = {key[0] for saved in service.saved for key in saved[1]}
+                # 中继恢复后重新执行, 从检查点继续
+                relay.reject_rate = 0
+                resumed = await service.run()
+            finally:
+                await nostr_sync.close()
+        return relay, first, first_delivered, resumed
+
+    relay, first, first_delivered, resumed = asyncio.run(run())
+
+    rejected = set(range(1, 231)) - first_delivered
+    assert rejected and first['failed'] == len(rejected)
+    # 检查点停在最早被拒绝的互动之前
+    assert first['checkpoint'] == min(rejected) - 1
+    # 只重新读取未投递的记录, 检查点推进到最后补发的一条
+    assert resumed == {'delivered': len(rejected), 'failed': 0, 'skipped': 0, 'checkpoint': max(rejected)}
+    assert len(relay.events) == 230
+
+
+def test_republish_skips_digest_channels(monkeypatch):
+    monkeypatch.setattr(Config, 'NOSTR_SIGN_WORKERS', 0)
+    monkeypatch.setattr(Config, 'NOSTR_DIGEST_CHANNELS', {CHANNEL_ID})
+    interactions = make_interactions(20, channel_id=CHANNEL_ID) + make_interactions(20, offset=20, channel_id=42)
+
+    async def run():
+        async with LocalRelay() as relay:
+            nostr_sync = NostrSync([relay.url], PrivateKey().bech32())
+            try:
+                service = MemoryRepublishService(nostr_sync, relay.url, interactions, chunk_size=15)
+                return relay, await service.run()
+            finally:
+                await nostr_sync.close()
+
+    relay, result = asyncio.run(run())
+
+    # 汇总频道不发布块和索引, 其余频道照常补发
+    assert result == {'delivered': 20, 'failed': 0, 'skipped': 20, 'checkpoint': 40}
+    assert len(relay.events) == 20 and all(event['kind'] == 1 for event in relay.events.values())
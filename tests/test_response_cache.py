@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+
+from flask import Flask, jsonify, request
+
+from app.middleware import cache as cache_middleware
+from app.middleware.cache import cached_response, conditional_response
+from app.models.models import DataScope
+from app.services import cache_service
+from app.services.cache_service import CHANNELS_SCOPE, response_cache
+from app.services.database_service import DatabaseService
+from config.config import Config
+
+
+def make_app(calls):
+    app = Flask(__name__)
+
+    @app.route('/users/<user_id>/interactions')
+    @cached_response(lambda user_id: [CHANNELS_SCOPE, f'user:{user_id}'], params={'start_time': int})
+    def user_stats(user_id):
+        calls.append(user_id)
+        if user_id == 'missing':
+            return jsonify({'error': 'No interactions found'}), 404
+        return jsonify({'user_id': user_id, 'start_time': request.args.get('start_time'), 'calls': len(calls)})
+
+    return app
+
+
+def setup_cache(monkeypatch, ttl=5):
+    monkeypatch.setattr(Config, 'RESPONSE_CACHE_TTL', ttl)
+    monkeypatch.setattr(Config, 'REDIS_URL', '')
+    response_cache.reset()
+
+
+def test_cache_hits_on_normalized_params_and_invalidates_by_scope(monkeypatch):
+    setup_cache(monkeypatch)
+    calls = []
+    client = make_app(calls).test_client()
+
+    first = client.get('/users/7/interactions?start_time=100')
+    assert first.headers['X-Cache'] == 'MISS'
+    # 参数写法不同、带无关参数时命中同一缓存
+    second = client.get('/users/7/interactions?_=123&start_time=0100')
+    assert second.headers['X-Cache'] == 'HIT' and second.get_json() == first.get_json()
+    assert client.get('/users/7/interactions?start_time=200').headers['X-Cache'] == 'MISS'
+    assert client.get('/users/missing/interactions').status_code == 404
+    assert client.get('/users/missing/interactions').headers['X-Cache'] == 'HIT'
+    assert len(calls) == 3
+
+    # 其他用户的写入不影响, 该用户的写入和频道配置变化使缓存失效
+    response_cache.invalidate(channel_ids=[1], user_ids=[8])
+    assert client.get('/users/7/interactions?start_time=100').headers['X-Cache'] == 'HIT'
+    response_cache.invalidate(channel_ids=[1], user_ids=[7])
+    assert client.get('/users/7/interactions?start_time=100').headers['X-Cache'] == 'MISS'
+    response_cache.invalidate(channels=True)
+    assert client.get('/users/7/interactions?start_time=100').headers['X-Cache'] == 'MISS'
+    assert len(calls) == 5
+
+
+def test_cache_entries_and_generations_expire(monkeypatch):
+    setup_cache(monkeypatch)
+    now = [1000.0]
+    monkeypatch.setattr(cache_service.time, 'monotonic', lambda: now[0])
+    calls = []
+    client = make_app(calls).test_client()
+
+    client.get('/users/7/interactions')
+    now[0] += 6
+    assert client.get('/users/7/interactions').headers['X-Cache'] == 'MISS'
+
+    # 代数过期后重新提升, 取到的是新代数, 不会命中用旧代数写入的缓存
+    response_cache.invalidate(user_ids=[7])
+    client.get('/users/7/interactions')
+    now[0] += 6
+    response_cache.invalidate(user_ids=[8])
+    response_cache.invalidate(user_ids=[7])
+    assert client.get('/users/7/interactions').headers['X-Cache'] == 'MISS'
+    assert len(response_cache.backend.generations) == 2
+
+
+def test_cache_disabled(monkeypatch):
+    setup_cache(monkeypatch, ttl=0)
+    calls = []
+    client = make_app(calls).test_client()
+    client.get('/users/7/interactions')
+    assert 'X-Cache' not in client.get('/users/7/interactions').headers
+    assert len(calls) == 2
+
+
+def test_conditional_response_returns_304_without_running_view(monkeypatch):
+    setup_cache(monkeypatch, ttl=0)
+    versions = {('user', 7): 3}
+    monkeypatch.setattr(cache_middleware, 'get_db', lambda: iter([SimpleNamespace(close=lambda: None)]))
+    monkeypatch.setattr(DatabaseService, 'get_data_versions', staticmethod(lambda db, keys: dict(versions)))
+    calls = []
+    app = Flask(__name__)
+
+    @app.route('/users/<user_id>/interactions_history')
+    @conditional_response(lambda user_id: [(DataScope.USER, user_id), (DataScope.RETENTION, 0)])
+    def history(user_id):
+        calls.append(user_id)
+        if user_id == '8':
+            return jsonify({'error': 'No interactions found'}), 404
+        return jsonify({'user_id': user_id})
+
+    client = app.test_client()
+    first = client.get('/users/7/interactions_history?limit=10')
+    etag = first.headers['ETag']
+    assert etag.startswith('W/"') and first.headers['Cache-Control'] == 'no-cache'
+
+    assert client.get('/users/7/interactions_history?limit=10', headers={'If-None-Match': etag}).status_code == 304
+    # 不同的查询参数是不同的表示
+    assert client.get('/users/7/interactions_history?limit=20', headers={'If-None-Match': etag}).status_code == 200
+    assert len(calls) == 2
+
+    versions[('retention', 0)] = 1
+    refreshed = client.get('/users/7/interactions_history?limit=10', headers={'If-None-Match': etag})
+    assert refreshed.status_code == 200 and refreshed.headers['ETag'] != etag
+
+    assert 'ETag' not in client.get('/users/8/interactions_history').headers
+    assert 'ETag' not in client.get('/users/abc/interactions_history').headers
+    assert len(calls) == 5
@@ -0,0 +1,97 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from app.models.models import Interaction, NostrDeadLetter, NostrRelayDelivery
+from app.services import retention_service
+from app.services.retention_service import MAXVALUE_PARTITION, RetentionService
+from tests.sqlite_compat import create_session
+
+
+def test_plan_future_partitions():
+    now = datetime(2024, 11, 15, 8, 30)
+    planned = RetentionService.plan_future_partitions(['p202410', MAXVALUE_PARTITION], now, 2)
+    # 跨年, 上界为下个月第一天零点
+    assert planned == [('p202411', datetime(2024, 12, 1)), ('p202412', datetime(2025, 1, 1)),
+                       ('p202501', datetime(2025, 2, 1))]
+
+    # 已存在的月份不重复创建, 落后的月份不会插到已有分区之前
+    assert RetentionService.plan_future_partitions(['p202412', MAXVALUE_PARTITION], now, 2) \
+        == [('p202501', datetime(2025, 2, 1))]
+    assert RetentionService.plan_future_partitions(['p202501', MAXVALUE_PARTITION], now, 2) == []
+    assert RetentionService.plan_future_partitions([MAXVALUE_PARTITION], now, 0) \
+        == [('p202411', datetime(2024, 12, 1))]
+
+
+def test_future_partition_bounds_use_utc(monkeypatch):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime(2024, 11, 30, 23, 30)
+
+    # 东八区本地时间已是 12 月, 按 UTC 仍应建 11 月分区, 上界为 2024-12-01 00:00:00 UTC
+    monkeypatch.setattr(retention_service, 'datetime', FrozenDatetime)
+    monkeypatch.setattr(RetentionService, 'get_partitions', staticmethod(
+        lambda db: [('p202410', 1730419200), (MAXVALUE_PARTITION, None)]))
+    statements = []
+    db = SimpleNamespace(execute=lambda statement: statements.append(str(statement)), commit=lambda: None)
+
+    assert RetentionService(months_ahead=1).ensure_future_partitions(db) == 2
+    assert statements == [
+        f"ALTER TABLE discord_interaction REORGANIZE PARTITION {MAXVALUE_PARTITION} INTO ("
+        f"PARTITION p202411 VALUES LESS THAN (1733011200), PARTITION p202412 VALUES LESS THAN (1735689600), "
+        f"PARTITION {MAXVALUE_PARTITION} VALUES LESS THAN MAXVALUE)"
+    ]
+
+
+def test_partition_dropped_only_when_ended_and_all_channels_expired():
+    upper_bound = int(datetime(2024, 2, 1, tzinfo=timezone.utc).timestamp())
+    now = datetime(2024, 6, 1, tzinfo=timezone.utc).timestamp()
+    cutoffs = {1: datetime(2024, 3, 1), 2: datetime(2024, 1, 20)}
+    rows = [(1, datetime(2024, 1, 31, 23, 59)), (2, datetime(2024, 1, 10))]
+
+    assert RetentionService.is_partition_expired(upper_bound, now, rows, cutoffs)
+    # 分区尚未结束, 或是 MAXVALUE 分区
+    assert not RetentionService.is_partition_expired(upper_bound, upper_bound - 1, rows, cutoffs)
+    assert not RetentionService.is_partition_expired(None, now, rows, cutoffs)
+    # 有一个频道的最新数据未过期
+    assert not RetentionService.is_partition_expired(
+        upper_bound, now, rows + [(2, datetime(2024, 1, 25))], cutoffs)
+    assert not RetentionService.is_partition_expired(
+        upper_bound, now, [(2, datetime(2024, 1, 20))], cutoffs)
+
+
+def test_channel_without_cutoff_blocks_drop():
+    upper_bound = int(datetime(2024, 2, 1, tzinfo=timezone.utc).timestamp())
+    now = datetime(2024, 6, 1, tzinfo=timezone.utc).timestamp()
+    cutoffs = {1: datetime(2024, 3, 1)}
+    # 频道 3 未配置过期时间 (或已删除), 数据永久保留
+    rows = [(1, datetime(2024, 1, 10)), (3, datetime(2024, 1, 1))]
+    assert not RetentionService.is_partition_expired(upper_bound, now, rows, cutoffs)
+    assert not RetentionService.is_partition_expired(upper_bound, now, rows, {})
+
+
+def test_delete_expired_rows_removes_dependents():
+    db = create_session(Interaction, NostrRelayDelivery, NostrDeadLetter)
+    old, new = datetime(2024, 1, 1), datetime(2024, 6, 1)
+    # 频道 1: 1-5 过期, 6 未过期; 频道 2 没有截止时间
+    rows = [(interaction_id, 1, old) for interaction_id in range(1, 6)] + [(6, 1, new), (7, 2, old)]
+    db.add_all(Interaction(interaction_id=interaction_id, message_id=interaction_id, channel_id=channel_id, user_id=1,
+                           interaction_content='', interaction_time=collect_time, post_time=collect_time,
+                           collect_time=collect_time, type=1)
+               for interaction_id, channel_id, collect_time in rows)
+    db.add_all(NostrRelayDelivery(relay_url=relay_url, interaction_id=interaction_id)
+               for interaction_id in range(1, 8) for relay_url in ('ws://relay-a', 'ws://relay-b'))
+    db.add_all(NostrDeadLetter(interaction_id=interaction_id) for interaction_id in (2, 6))
+    db.commit()
+
+    try:
+        deleted = RetentionService(delete_batch_size=2).delete_expired_rows(db, {1: datetime(2024, 3, 1)})
+        interactions = sorted(row.interaction_id for row in db.query(Interaction))
+        deliveries = sorted({row.interaction_id for row in db.query(NostrRelayDelivery)})
+        dead = [row.interaction_id for row in db.query(NostrDeadLetter)]
+    finally:
+        db.close()
+
+    assert deleted == 5
+    assert interactions == deliveries == [6, 7]
+    assert dead == [6]
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+import pytest
+from marshmallow import ValidationError
+
+from app.models.models import Channel, Interaction
+from app.services.database_service import DatabaseService
+from app.validators.schemas import StatsBatchSchema
+from config.config import Config
+from tests.sqlite_compat import create_session
+
+
+@pytest.fixture
+def db():
+    session = create_session(Channel, Interaction)
+    now = datetime.now()
+    session.add_all([Channel(channel_id=1), Channel(channel_id=2, expiration_time='7d')])
+    rows = [
+        # (channel_id, user_id, 采集时间距今天数)
+        (1, 10, 1), (1, 10, 1), (1, 11, 1), (2, 10, 1), (2, 10, 30), (3, 10, 1)
+    ]
+    session.add_all([
+        Interaction(message_id=i, channel_id=channel_id, user_id=user_id, interaction_content='',
+                    interaction_time=now, post_time=now, collect_time=now - timedelta(days=days), type=1)
+        for i, (channel_id, user_id, days) in enumerate(rows)
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_batch_stats_match_single_entity_queries(db):
+    user_stats, channel_counts = DatabaseService.get_batch_interaction_stats(db, [10, 11, 12], [1, 2, 3])
+
+    # 用户统计不含未配置的频道 3, 频道 2 过期的数据只在用户统计中计入
+    assert user_stats[10] == {'total_interactions': 4, 'per_channel': [{'channel_id': 1, 'count': 2},
+                                                                      {'channel_id': 2, 'count': 2}]}
+    assert user_stats[11]['total_interactions'] == 1
+    assert user_stats[12] == {'total_interactions': 0, 'per_channel': []}
+    assert channel_counts == {1: 3, 2: 1, 3: None}
+    for channel_id in (1, 2):
+        assert channel_counts[channel_id] == DatabaseService.get_channel_interaction_count(db, channel_id)
+
+    start_time = int((datetime.now() - timedelta(days=2)).timestamp())
+    user_stats, channel_counts = DatabaseService.get_batch_interaction_stats(db, [10], [1], start_time=start_time)
+    assert user_stats[10]['total_interactions'] == 3 and channel_counts == {1: 3}
+
+
+def test_batch_schema_validation(monkeypatch):
+    monkeypatch.setattr(Config, 'STATS_BATCH_MAX_IDS', 3)
+    schema = StatsBatchSchema()
+    data = schema.load({'user_ids': ['1234567890123456789', 42], 'start_time': 1})
+    assert data == {'user_ids': [1234567890123456789, 42], 'channel_ids': [], 'start_time': 1, 'end_time': None}
+
+    for payload in ({}, {'user_ids': ['abc']}, {'user_ids': [1, 2], 'channel_ids': [3, 4]},
+                    {'channel_ids': [1], 'start_time': 10, 'end_time': 5}):
+        with pytest.raises(ValidationError):
+            schema.load(payload)
@@ -0,0 +1,111 @@
+import json
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Any, Dict, Hashable, Iterable, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # 可选依赖, 没有安装时使用标准库
+    orjson = None
+
+RFC_WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+RFC_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
+
+
+class LRUCache:
+    """线程安全的定长 LRU 缓存"""
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("LRU cache capacity must be greater than 0")
+        self.capacity = capacity
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """批量读取, 只返回命中的键"""
+        result = {}
+        with self._lock:
+            for key in keys:
+                if key in self._data:
+                    self._data.move_to_end(key)
+                    result[key] = self._data[key]
+        return result
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+
+    def put_many(self, items: Dict[Hashable, Any]) -> None:
+        for key, value in items.items():
+            self.put(key, value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+def dumps_json(value: Any) -> bytes:
+    """紧凑的 UTF-8 JSON, 安装了 orjson 时使用 orjson"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+class TimestampFormatter:
+    """
+    批量格式化时间 (数据库中的时间均为 UTC)
+
+    同一批数据中相同的时间 (如同一次采集写入的 collect_time) 只格式化一次;
+    默认输出 'Sat, 01 Jun 2024 12:03:04 -0000', epoch=True 时输出秒级时间戳.
+    """
+
+    def __init__(self, epoch: bool = False):
+        self.epoch = epoch
+        self._formatted: Dict[datetime, Union[int, str]] = {}
+
+    @staticmethod
+    def _utc(value: datetime) -> datetime:
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    def __call__(self, value: Optional[datetime]) -> Union[int, str, None]:
+        if value is None:
+            return None
+        result = self._formatted.get(value)
+        if result is None:
+            utc = self._utc(value)
+            if self.epoch:
+                result = (utc - EPOCH) // SECOND
+            else:
+                result = '%s, %02d %s %d %02d:%02d:%02d -0000' % (
+                    RFC_WEEKDAYS[utc.weekday()], utc.day, RFC_MONTHS[utc.month - 1], utc.year,
+                    utc.hour, utc.minute, utc.second)
+            self._formatted[value] = result
+        return result
@@ -0,0 +1,77 @@
+"""
+gunicorn master, 由 main.py 在全新的解释器中启动: python -m wsgi_server
+
+master 不导入 app 包, 只在 load_config 中重新加载 config.config; worker 在 fork 后按字符串导入
+app.wsgi_entry:app, 因此 SIGHUP 后新 worker 加载新代码和新配置.
+"""
+import importlib
+from typing import Any, Dict
+
+from gunicorn import util
+from gunicorn.app.base import BaseApplication
+
+from utils.logger import Logger
+
+logger = Logger('wsgi')
+
+WSGI_APP = 'app.wsgi_entry:app'
+
+
+def post_fork(server, worker):
+    """worker 不能复用父进程 (preload 时) 建立的数据库连接, fork 后丢弃连接池, 由 worker 按需重新建立"""
+    from app.models.database import engine
+    engine.dispose()
+    logger.info(f"Worker {worker.pid} started, database pool reset")
+
+
+def worker_exit(server, worker):
+    from app.models.database import engine
+    engine.dispose()
+
+
+def load_config_class():
+    """重新执行 config.config, 返回最新的 Config; 之后 fork 的 worker 继承新模块"""
+    return importlib.reload(importlib.import_module('config.config')).Config
+
+
+def gunicorn_options(config) -> Dict[str, Any]:
+    return {
+        'bind': f"{config.API_HOST}:{config.API_PORT}",
+        'workers': config.API_WORKERS,
+        'threads': config.API_THREADS,
+        'worker_class': 'gthread' if config.API_THREADS > 1 else 'sync',
+        'timeout': config.API_TIMEOUT,
+        'graceful_timeout': config.API_GRACEFUL_TIMEOUT,
+        'keepalive': config.API_KEEPALIVE,
+        'max_requests': config.API_MAX_REQUESTS,
+        'max_requests_jitter': config.API_MAX_REQUESTS_JITTER,
+        'preload_app': config.API_PRELOAD_APP,
+        'pidfile': config.API_PID_FILE,
+        'post_fork': post_fork,
+        'worker_exit': worker_exit
+    }
+
+
+class GunicornApplication(BaseApplication):
+    """
+    gunicorn 多进程服务
+
+    master 只负责管理 worker, 每个 worker 各自导入 Flask 应用并创建数据库连接池. 收到 SIGHUP 时 master
+    重新加载配置并启动新 worker (新 worker 重新导入代码), 旧 worker 处理完在途请求 (最长 API_GRACEFUL_TIMEOUT 秒)
+    后退出, 不中断服务; API_PRELOAD_APP 开启时应用在 master 中导入, HUP 不再加载新代码. SIGTERM 同样等待在途请求后退出.
+    """
+
+    def load_config(self):
+        options = gunicorn_options(load_config_class())
+        for key, value in options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+        logger.info(f"Loaded gunicorn config: bind {options['bind']}, {options['workers']} workers "
+                    f"x {options['threads']} threads")
+
+    def load(self):
+        return util.import_app(WSGI_APP)
+
+
+if __name__ == '__main__':
+    GunicornApplication().run()